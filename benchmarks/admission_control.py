@@ -0,0 +1,205 @@
+"""Latency of cheap routes under a TTS flood, with and without admission control.
+
+Runs the app in-process against a temporary progress store. Synthesis is
+replaced by a blocking sleep so the benchmark does not need Kokoro. Run from
+the project root:
+
+    python -m benchmarks.admission_control --seconds 5 --tts-clients 120
+
+Two scenarios run with admission off and then on:
+
+- ``flood``: many learners request TTS while others read progress and submit
+  quizzes. This measures the per-class concurrency limits, priority shares
+  and queue-time shedding.
+- ``burst``: a single client sends requests as fast as it can. This measures
+  the token bucket.
+
+Limits are taken from the ``RMF_ADMISSION_*`` and ``RMF_RATE_LIMIT_*``
+environment variables, as in the server.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+from benchmarks.scratch import use_scratch_stores
+
+
+class _SlowSynthesis:
+    mode = "benchmark"
+
+    def __init__(self, seconds: float) -> None:
+        self._seconds = seconds
+
+    def synthesize_wav(self, text: str, voice: str, speed: float) -> bytes:
+        time.sleep(self._seconds)
+        return b"RIFF"
+
+
+async def _request(
+    app: Any, method: str, path: str, learner_id: str, body: Any = None, address: str = "127.0.0.1"
+) -> tuple[int, float]:
+    payload = b"" if body is None else json.dumps(body).encode("utf-8")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"x-learner-id", learner_id.encode("ascii")),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode("ascii")),
+        ],
+        "client": (address, 0),
+        "server": ("benchmark", 80),
+    }
+    status = 0
+    finished = asyncio.Event()
+    body_sent = False
+
+    async def receive() -> dict[str, Any]:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            finished.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    finished.set()
+    return status, (time.perf_counter() - started) * 1000
+
+
+def _address(group: int, index: int) -> str:
+    # Flood clients each get an address, so only the class limits apply.
+    return f"10.{group}.{index // 256}.{index % 256}"
+
+
+_QUIZ_BODY = {"moduleId": "module-1", "answers": {"q1-1": 0}}
+
+
+async def flood(app: Any, seconds: float, tts_clients: int, learners: int) -> dict[str, list[tuple[int, float]]]:
+    results: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    deadline = time.perf_counter() + seconds
+
+    async def tts_client(index: int) -> None:
+        while time.perf_counter() < deadline:
+            status, elapsed = await _request(
+                app, "POST", "/api/tts", f"tts-{index}", {"text": "Hello there."}, _address(1, index)
+            )
+            results["POST /api/tts"].append((status, elapsed))
+            if status in (429, 503):
+                await asyncio.sleep(0.05)
+
+    async def learner(index: int) -> None:
+        learner_id, address = f"learner-{index}", _address(2, index)
+        while time.perf_counter() < deadline:
+            status, elapsed = await _request(app, "GET", "/api/progress", learner_id, address=address)
+            results["GET /api/progress"].append((status, elapsed))
+            status, elapsed = await _request(
+                app, "POST", "/api/quizzes/quiz-module-1/submit", learner_id, _QUIZ_BODY, address
+            )
+            results["POST /api/quizzes/{id}/submit"].append((status, elapsed))
+            await asyncio.sleep(0.2)
+
+    await asyncio.gather(
+        *(tts_client(index) for index in range(tts_clients)),
+        *(learner(index) for index in range(learners)),
+    )
+    return results
+
+
+async def burst(app: Any, seconds: float) -> dict[str, list[tuple[int, float]]]:
+    results: dict[str, list[tuple[int, float]]] = defaultdict(list)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        status, elapsed = await _request(app, "GET", "/api/modules", "burst-client")
+        results["GET /api/modules"].append((status, elapsed))
+    return results
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def report(title: str, results: dict[str, list[tuple[int, float]]], seconds: float) -> None:
+    print(f"\n{title}")
+    print(f"{'route':<32} {'n':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for route, samples in sorted(results.items()):
+        ok = [elapsed for status, elapsed in samples if status < 400]
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(Counter(s for s, _ in samples).items()))
+        print(
+            f"{route:<32} {len(samples):>6} {len(ok) / seconds:>7.1f} {statistics.median(ok) if ok else 0:>8.1f} "
+            f"{_percentile(ok, 0.95):>8.1f} {_percentile(ok, 0.99):>8.1f}  {statuses}"
+        )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    # Imported here, after the environment is set up in main().
+    from server import main as server_main
+    from server.routers import tts
+    from server.routers.dependencies import LEARNER_ID_COOKIE, LEARNER_ID_HEADER
+    from server.services.admission import AdmissionMiddleware, admission_controller_from_env
+
+    tts.tts_service = _SlowSynthesis(args.synthesis_ms / 1000)
+    plain_app = server_main.app
+    os.environ["RMF_ADMISSION"] = "on"
+    controller = admission_controller_from_env()
+    guarded_app = AdmissionMiddleware(
+        plain_app,
+        controller=controller,
+        learner_header=LEARNER_ID_HEADER,
+        learner_cookie=LEARNER_ID_COOKIE,
+    )
+    print(json.dumps(controller.describe(), indent=2))
+
+    async with plain_app.router.lifespan_context(plain_app):
+        for label, app in (("off", plain_app), ("on", guarded_app)):
+            results = await flood(app, args.seconds, args.tts_clients, args.learners)
+            report(f"flood, admission {label}", results, args.seconds)
+            results = await burst(app, args.seconds)
+            report(f"burst, admission {label}", results, args.seconds)
+        print(f"\nadmission counters: {json.dumps(controller.stats)}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each scenario")
+    parser.add_argument("--tts-clients", type=int, default=120, help="learners requesting TTS in a loop")
+    parser.add_argument("--learners", type=int, default=20, help="learners reading progress and submitting quizzes")
+    parser.add_argument("--synthesis-ms", type=float, default=200.0, help="simulated synthesis time")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rmf-admission-") as scratch:
+        # Must be set before the app is imported; stores read them at construction.
+        use_scratch_stores(Path(scratch))
+        # The benchmark wraps the app itself so both modes share one process.
+        os.environ["RMF_ADMISSION"] = "off"
+        asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Per-worker memory held by parsed course content.
+
+Compares plain ``json.loads`` output with the compact read-only form that
+``ContentPack.get_json`` caches, measured with ``tracemalloc``. Each variant
+runs in a fresh interpreter, so strings and key tables interned by an
+earlier measurement are not reused and every figure is what a newly started
+worker would hold. Run from the project root:
+
+    python -m benchmarks.content_memory --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from server.services.compact_content import compact
+from server.services.content_pack import load_content_pack
+
+# Key prefixes parsed by request handlers (grading, scenario choices,
+# analytics); everything else is served from the mapped bytes.
+WORKING_SET_PREFIXES = ("quiz/", "scenario/", "module/", "modules")
+ALL_PREFIXES = (*WORKING_SET_PREFIXES, "lessons/", "glossary", "capstone")
+CONTENT_SETS = {"working set": WORKING_SET_PREFIXES, "all": ALL_PREFIXES}
+PARSERS: dict[str, Callable[[bytes], Any]] = {
+    "dicts": json.loads,
+    "compact": lambda raw: compact(json.loads(raw)),
+}
+
+
+def measure(raw_blobs: list[bytes], parse: Callable[[bytes], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        parsed = [parse(raw) for raw in raw_blobs]
+        gc.collect()
+        size, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del parsed
+    return size
+
+
+def measure_variant(content: str, variant: str) -> dict[str, int]:
+    pack = load_content_pack()
+    keys = [key for key in pack.keys() if key.startswith(CONTENT_SETS[content])]
+    raw_blobs = [pack.get_bytes(key) or b"" for key in keys]
+    return {"entries": len(keys), "jsonBytes": sum(map(len, raw_blobs)), "bytes": measure(raw_blobs, PARSERS[variant])}
+
+
+def _measure_in_subprocess(content: str, variant: str) -> dict[str, int]:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.content_memory", "--variant", content, variant],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="worker processes to extrapolate to")
+    parser.add_argument(
+        "--variant",
+        nargs=2,
+        metavar=("CONTENT", "PARSER"),
+        help="measure one variant in this process and print it as JSON (used internally)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        print(json.dumps(measure_variant(*args.variant)))
+        return
+
+    print(f"{'content':<12} {'entries':>7} {'json bytes':>11} {'dicts':>10} {'compact':>10} {'saved':>7} {f'x{args.workers} saved':>11}")
+    for label in CONTENT_SETS:
+        plain = _measure_in_subprocess(label, "dicts")
+        compacted = _measure_in_subprocess(label, "compact")
+        saved = plain["bytes"] - compacted["bytes"]
+        print(
+            f"{label:<12} {plain['entries']:>7} {plain['jsonBytes']:>11} {plain['bytes']:>10} {compacted['bytes']:>10} "
+            f"{saved / plain['bytes']:>6.0%} {saved * args.workers:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
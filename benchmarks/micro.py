@@ -0,0 +1,307 @@
+"""Micro-benchmarks for the hot service functions, with saved baselines.
+
+Each case times one call of a function on real course content, so changes to
+grading, progress writes, scenario resolution, content encoding or WAV
+packing can be measured in isolation. Run from the project root:
+
+    python -m benchmarks.micro run --save benchmarks/baselines/main.json
+    python -m benchmarks.micro run --compare benchmarks/baselines/main.json
+    python -m benchmarks.micro compare before.json after.json --threshold 0.15
+
+``run`` prints per-call times and can save them as JSON. ``compare`` (or
+``run --compare``) reports each case against a baseline and exits with status
+1 when any case's median slowed down by more than the threshold. ``--filter``
+selects cases by glob, for example ``--filter 'progress/*'``.
+
+Cases:
+
+- ``grade/<quiz>``: ``QuizGrader.grade_quiz`` with all answers correct.
+- ``module_status/<module>``: ``ProgressStore._apply_module_status`` on a
+  fully completed module.
+- ``progress/<mutation>/review-<n>``: a ``ProgressStore`` mutation end to end
+  (read, change, badge rules, atomic write, cohort rollup) for learners with
+  ``n`` scheduled review items, which live outside the progress document.
+- ``scenario/<scenario>``: resolving every choice of every step, plus the
+  final grade, as the choice route does.
+- ``encode/<key>`` and ``serve/<key>``: encoding each content endpoint's
+  document as the content pack does, and reading the pre-encoded bytes that
+  the endpoint actually serves.
+- ``wav/<seconds>s``: ``KokoroService.pack_wav`` for 16-bit mono PCM.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable, Iterator, Mapping
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from benchmarks.scratch import use_scratch_stores
+
+RESULTS_FORMAT = 1
+DEFAULT_THRESHOLD = 0.10
+REVIEW_SIZES = (0, 1_000, 10_000)
+WAV_SECONDS = (5, 60)
+
+Case = tuple[str, Callable[[], Any]]
+
+
+def _correct_answers(questions: Any) -> dict[str, Any]:
+    answers: dict[str, Any] = {}
+    for question in questions:
+        q_type = question.get("type")
+        if q_type == "multiple_choice":
+            answers[question["id"]] = question.get("correctIndex")
+        elif q_type == "true_false":
+            answers[question["id"]] = question.get("correctAnswer")
+        elif q_type == "multi_select":
+            answers[question["id"]] = list(question.get("correctIndices") or ())
+    return answers
+
+
+def grading_cases(pack: Any) -> Iterator[Case]:
+    from server.services.grader import QuizGrader
+
+    grader = QuizGrader()
+    for key in sorted(pack.keys("quiz/")):
+        questions = pack.get_json(key).get("questions") or ()
+        answers = _correct_answers(questions)
+        yield f"grade/{key[len('quiz/'):]}", lambda q=questions, a=answers: grader.grade_quiz(questions=q, answers=a)
+
+
+def _module_ids(pack: Any) -> list[str]:
+    modules = pack.get_json("modules")
+    modules = modules.get("modules", ()) if isinstance(modules, Mapping) else modules
+    return [module["id"] for module in modules]
+
+
+def module_status_cases(pack: Any, store: Any) -> Iterator[Case]:
+    for module_id in _module_ids(pack):
+        lessons = pack.get_json(f"lessons/{module_id.rsplit('-', 1)[-1]}") or {}
+        module_progress = {
+            **store._default_module_progress(),
+            "lessonsCompleted": [lesson["id"] for lesson in lessons.get("lessons", ())],
+            "quizScore": 90,
+            "quizPassed": True,
+        }
+        yield f"module_status/{module_id}", lambda m=module_id, p=module_progress: store._apply_module_status(m, p)
+
+
+def _progress_document(store: Any, module_ids: list[str]) -> dict[str, Any]:
+    progress = store._default_progress()
+    for module_id in module_ids:
+        module_progress = store._default_module_progress()
+        module_progress.update(status="in_progress", lessonsCompleted=[f"{module_id}-lesson-{n}" for n in range(4)])
+        progress["modules"][module_id] = module_progress
+    return progress
+
+
+def progress_cases(pack: Any, store: Any) -> Iterator[Case]:
+    from server.services.review_scheduler import ReviewScheduler
+
+    module_ids = _module_ids(pack)
+    scheduler = ReviewScheduler(store)
+    for size in REVIEW_SIZES:
+        learner_id = f"bench-{size}"
+        store.save_progress(_progress_document(store, module_ids), learner_id=learner_id)
+        scheduler.grade([(f"quiz:bench:q{n}", 2) for n in range(size)], now=1_700_000_000, learner_id=learner_id)
+        yield f"progress/get/review-{size}", lambda l=learner_id: store.get_progress(learner_id=l)
+        yield f"progress/lesson_complete/review-{size}", lambda l=learner_id: store.mark_lesson_complete(
+            module_ids[0], "lesson-bench", learner_id=l
+        )
+        yield f"progress/quiz_result/review-{size}", lambda l=learner_id: store.record_quiz_result(
+            module_ids[0], f"quiz-{module_ids[0]}", 80, True, None, learner_id=l
+        )
+        yield f"progress/scenario_result/review-{size}", lambda l=learner_id: store.record_scenario_result(
+            "bench-scenario", 7, 10, learner_id=l
+        )
+
+
+def scenario_cases(pack: Any) -> Iterator[Case]:
+    from fastapi import HTTPException
+
+    from server.routers.scenarios import _grade_scenario, _max_points_for_scenario, _select_choice
+
+    for key in sorted(pack.keys("scenario/")):
+        scenario = pack.get_json(key)
+        choices = [
+            (step["id"], index)
+            for step in scenario.get("steps", ())
+            for index in range(len(step.get("choices") or ()))
+        ]
+
+        def walk(scenario: Any = scenario, choices: list[tuple[str, int]] = choices) -> dict[str, Any]:
+            total = 0
+            for step_id, index in choices:
+                try:
+                    total += _select_choice(scenario, step_id, index)[0]
+                except HTTPException:
+                    # Broken content is answered with a 4xx; time that path too.
+                    continue
+            return _grade_scenario(total_points=total, max_points=_max_points_for_scenario(scenario))
+
+        yield f"scenario/{key[len('scenario/'):]}", walk
+
+
+def content_cases(pack: Any) -> Iterator[Case]:
+    from server.services.content_pack import _encode
+
+    # The documents the content routes serve.
+    served_prefixes = ("modules", "lessons/", "quiz-public/", "scenario/", "glossary", "capstone")
+    for key in sorted(key for key in pack.keys() if key.startswith(served_prefixes)):
+        document = json.loads(pack.get_bytes(key))
+        yield f"encode/{key}", lambda d=document: _encode(d)
+        yield f"serve/{key}", lambda k=key: pack.get_bytes(k)
+
+
+def wav_cases() -> Iterator[Case]:
+    from server.services.tts_kokoro import KokoroService
+
+    service = KokoroService(speed_variants="synthesize")
+    rng = np.random.default_rng(0)
+    for seconds in WAV_SECONDS:
+        pcm = rng.integers(-20_000, 20_000, size=seconds * service.sample_rate, dtype=np.int16)
+        yield f"wav/{seconds}s", lambda p=pcm: service.pack_wav(p)
+
+
+def all_cases(scratch: Path) -> Iterator[Case]:
+    from server.services.content_pack import load_content_pack
+    from server.services.progress_events import ProgressEventBroker
+    from server.services.progress_store import ProgressStore
+
+    pack = load_content_pack()
+    store = ProgressStore(events=ProgressEventBroker(), progress_dir=scratch / "progress")
+    yield from grading_cases(pack)
+    yield from module_status_cases(pack, store)
+    yield from progress_cases(pack, store)
+    yield from scenario_cases(pack)
+    yield from content_cases(pack)
+    yield from wav_cases()
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    per_call = [elapsed / loops * 1e9 for elapsed in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "median_ns": statistics.median(per_call),
+        "min_ns": min(per_call),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def _format_ns(value: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.2f} {unit}"
+    return f"{value:.0f} ns"
+
+
+def run(patterns: list[str], repeat: int) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="rmf-micro-") as scratch:
+        use_scratch_stores(Path(scratch))
+        for name, fn in all_cases(Path(scratch)):
+            if patterns and not any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+                continue
+            results[name] = measure(fn, repeat)
+            print(f"{name:<48} {_format_ns(results[name]['median_ns']):>12}", flush=True)
+
+    return {
+        "format": RESULTS_FORMAT,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Print a comparison table and return the names of regressed cases."""
+    if baseline.get("platform") != current.get("platform") or baseline.get("python") != current.get("python"):
+        print(
+            f"note: baseline is from {baseline.get('platform')} / Python {baseline.get('python')}; "
+            "timings across machines are not comparable"
+        )
+
+    regressions: list[str] = []
+    print(f"{'case':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            print(f"{name:<48} {'-' if before is None else _format_ns(before['median_ns']):>12} "
+                  f"{'-' if after is None else _format_ns(after['median_ns']):>12}")
+            continue
+
+        change = after["median_ns"] / before["median_ns"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(
+            f"{name:<48} {_format_ns(before['median_ns']):>12} {_format_ns(after['median_ns']):>12} "
+            f"{change:>+8.1%}{flag}"
+        )
+
+    print(f"\n{len(regressions)} case(s) slower than the baseline by more than {threshold:.0%}")
+    return regressions
+
+
+def _load(path: Path) -> dict[str, Any]:
+    with path.open("r", encoding="utf-8") as results_file:
+        data = json.load(results_file)
+    if data.get("format") != RESULTS_FORMAT:
+        raise SystemExit(f"{path}: unsupported results format {data.get('format')!r}")
+    return data
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="time every case")
+    run_parser.add_argument("--filter", action="append", default=[], help="glob over case names; repeatable")
+    run_parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per case")
+    run_parser.add_argument("--save", type=Path, help="write results to this JSON file")
+    run_parser.add_argument("--compare", type=Path, help="baseline JSON to compare against")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.10 = 10%%")
+
+    compare_parser = commands.add_parser("compare", help="compare two saved result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.10 = 10%%")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        regressions = compare(_load(args.baseline), _load(args.current), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    baseline = _load(args.compare) if args.compare else None
+    results = run(args.filter, args.repeat)
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with args.save.open("w", encoding="utf-8") as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+            results_file.write("\n")
+    if baseline is not None:
+        print()
+        sys.exit(1 if compare(baseline, results, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Progress store write throughput under concurrent learners.
+
+Each worker process plays one uvicorn worker and records lesson completions
+for its own set of learners. Run from the project root:
+
+    python -m benchmarks.progress_contention --ops 400
+
+``--shards 1`` reproduces the old single-lock layout for comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from server.services.progress_store import ProgressStore
+
+
+def _worker(progress_dir: str, shard_count: int, worker_index: int, ops: int, learners: int, start_event) -> None:
+    store = ProgressStore(progress_dir=Path(progress_dir), shard_count=shard_count)
+    start_event.wait()
+    for op in range(ops):
+        learner_id = f"w{worker_index}-learner{op % learners}"
+        store.mark_lesson_complete("module-1", f"lesson-{op % 7}", learner_id=learner_id)
+
+
+def run(workers: int, shard_count: int, ops: int, learners: int) -> float:
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="rmf-progress-bench-") as progress_dir:
+        start_event = context.Event()
+        processes = [
+            context.Process(target=_worker, args=(progress_dir, shard_count, index, ops, learners, start_event))
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        # Give the spawned interpreters time to import before the clock starts.
+        time.sleep(1.0)
+        started = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+    return workers * ops / elapsed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=400, help="writes per worker")
+    parser.add_argument("--learners", type=int, default=16, help="distinct learners per worker")
+    parser.add_argument("--shards", type=int, nargs="*", default=[1, 64])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    worker_counts = sorted({1, *(2**power for power in range(1, 8) if 2**power <= args.max_workers), args.max_workers})
+    print(f"{'shards':>6} {'workers':>7} {'writes/s':>10} {'speedup':>8}")
+    for shard_count in args.shards:
+        baseline = None
+        for workers in worker_counts:
+            throughput = run(workers, shard_count, args.ops, args.learners)
+            baseline = baseline or throughput
+            print(f"{shard_count:>6} {workers:>7} {throughput:>10.0f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Point the app's stores at a scratch directory, so benchmarks never touch real data."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+# Environment variable and subdirectory for every store that writes to disk.
+SCRATCH_DIRS = {
+    "RMF_PROGRESS_DIR": "progress",
+    "RMF_ANALYTICS_DIR": "analytics",
+    "RMF_PHONEME_CACHE_DIR": "phonemes",
+}
+
+
+def use_scratch_stores(scratch: Path) -> None:
+    """Must run before the app is imported; stores read these at construction."""
+    for name, subdirectory in SCRATCH_DIRS.items():
+        os.environ[name] = str(scratch / subdirectory)
+    # A configured Redis would take progress writes instead of the scratch
+    # directory, and a trace directory would record the benchmark's traffic.
+    os.environ.pop("RMF_PROGRESS_BACKEND", None)
+    os.environ.pop("RMF_TRACE_DIR", None)
@@ -0,0 +1,224 @@
+"""Replay recorded API traffic against an isolated copy of the app.
+
+Record traffic by starting the server with ``RMF_TRACE_DIR`` set, then run
+from the project root:
+
+    python -m benchmarks.trace_replay server/data/traces --speed 4
+
+The progress store is copied into a temporary directory first, so replayed
+writes never touch real learner data. Learner hashes are matched to the
+copied learners with the trace directory's salt, so replayed requests read
+and write the state those learners had; unmatched hashes replay as new
+learners. Each learner gets its own client address, as in production.
+``--speed 0`` replays as fast as the concurrency limit allows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+from benchmarks.scratch import use_scratch_stores
+from server.services.progress_store import DEFAULT_LEARNER_ID, is_valid_learner_id
+from server.services.request_trace import TRACE_FILENAME, body_from_shape, learner_hash, trace_salt
+
+DEFAULT_EXCLUDES = [r"/progress/events$"]
+
+
+def _trace_files(paths: list[Path]) -> list[Path]:
+    files: list[Path] = []
+    for path in paths:
+        if path.is_dir():
+            # Rotated files hold older traffic: requests.ndjson.5 ... .1, then the live file.
+            rotated = sorted(path.glob(f"{TRACE_FILENAME}.*"), key=lambda item: int(item.suffix[1:]), reverse=True)
+            files.extend([*rotated, *path.glob(TRACE_FILENAME)])
+        else:
+            files.append(path)
+    return files
+
+
+def load_traces(paths: list[Path], excludes: list[str]) -> list[dict[str, Any]]:
+    patterns = [re.compile(pattern) for pattern in excludes]
+    records: list[dict[str, Any]] = []
+    for path in _trace_files(paths):
+        with path.open("r", encoding="utf-8") as trace_file:
+            for line in trace_file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not any(pattern.search(record["path"]) for pattern in patterns):
+                    records.append(record)
+    records.sort(key=lambda record: record["at"])
+    return records
+
+
+def _trace_salts(paths: list[Path]) -> set[bytes]:
+    directories = {path if path.is_dir() else path.parent for path in paths}
+    return {salt for salt in (trace_salt(directory) for directory in directories) if salt is not None}
+
+
+def learners_by_hash(progress_dir: Path, salts: set[bytes]) -> dict[str, str]:
+    """Learner ids in ``progress_dir``, keyed by their hash under each salt."""
+    learner_ids = {DEFAULT_LEARNER_ID}
+    for path in progress_dir.glob("shard-*/*.json"):
+        if is_valid_learner_id(path.stem):
+            learner_ids.add(path.stem)
+    return {learner_hash(learner_id, salt): learner_id for salt in salts for learner_id in learner_ids}
+
+
+async def _send_request(app: Any, record: dict[str, Any], learners: dict[str, str]) -> tuple[int, float]:
+    body = b""
+    if "body" in record:
+        body = json.dumps(body_from_shape(record["body"])).encode("utf-8")
+
+    hashed = record["learner"]
+    learner_id = learners.get(hashed, f"trace-{hashed}")
+    # An address per learner, so one learner's traffic cannot drain another's rate limit.
+    address = "10." + ".".join(str(part) for part in bytes.fromhex(hashed)[:3])
+    headers = [
+        (b"x-learner-id", learner_id.encode("ascii")),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("ascii")),
+    ]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": record["method"],
+        "scheme": "http",
+        "path": record["path"],
+        "raw_path": record["path"].encode("utf-8"),
+        "query_string": record.get("query", "").encode("latin-1"),
+        "root_path": "",
+        "headers": headers,
+        "client": (address, 0),
+        "server": ("replay", 80),
+    }
+
+    status = 0
+    finished = asyncio.Event()
+    body_sent = False
+
+    async def receive() -> dict[str, Any]:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            finished.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    finished.set()
+    return status, (time.perf_counter() - started) * 1000
+
+
+async def replay(
+    app: Any,
+    records: list[dict[str, Any]],
+    speed: float,
+    concurrency: int,
+    learners: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[tuple[dict[str, Any], int, float, float]] = []
+    first_at = records[0]["at"] if records else 0.0
+    started = time.perf_counter()
+
+    async def run_one(record: dict[str, Any]) -> None:
+        if speed > 0:
+            delay = (record["at"] - first_at) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with semaphore:
+            lag = max(0.0, time.perf_counter() - started - (record["at"] - first_at) / speed) if speed > 0 else 0.0
+            status, elapsed_ms = await _send_request(app, record, learners or {})
+        results.append((record, status, elapsed_ms, lag))
+
+    await asyncio.gather(*(run_one(record) for record in records))
+    return {"results": results, "wall": time.perf_counter() - started}
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def report(summary: dict[str, Any]) -> None:
+    by_route: dict[str, list[tuple[dict[str, Any], int, float, float]]] = defaultdict(list)
+    for result in summary["results"]:
+        record = result[0]
+        by_route[f"{record['method']} {record.get('route') or record['path']}"].append(result)
+
+    print(f"{'route':<48} {'n':>6} {'status!=':>8} {'rec p50':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, results in sorted(by_route.items(), key=lambda item: -len(item[1])):
+        replayed = [elapsed for _, _, elapsed, _ in results]
+        recorded = [record.get("ms", 0.0) for record, _, _, _ in results]
+        mismatched = sum(1 for record, status, _, _ in results if status != record.get("status"))
+        print(
+            f"{route[:48]:<48} {len(results):>6} {mismatched:>8} {statistics.median(recorded):>8.2f} "
+            f"{statistics.median(replayed):>8.2f} {_percentile(replayed, 0.95):>8.2f} {_percentile(replayed, 0.99):>8.2f}"
+        )
+
+    total = len(summary["results"])
+    lags = [lag for _, _, _, lag in summary["results"]]
+    throughput = total / summary["wall"] if summary["wall"] else 0.0
+    print(f"\n{total} requests in {summary['wall']:.2f}s ({throughput:.0f} req/s), max schedule lag {max(lags, default=0) * 1000:.1f} ms")
+
+
+async def _run(args: argparse.Namespace, records: list[dict[str, Any]], learners: dict[str, str]) -> dict[str, Any]:
+    from server.main import app
+
+    async with app.router.lifespan_context(app):
+        return await replay(app, records, args.speed, args.concurrency, learners)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", type=Path, nargs="+", help="trace files or RMF_TRACE_DIR directories")
+    parser.add_argument("--speed", type=float, default=1.0, help="time multiplier; 0 replays without pacing")
+    parser.add_argument("--concurrency", type=int, default=64, help="maximum requests in flight")
+    parser.add_argument(
+        "--progress-dir",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent / "server" / "data" / "progress",
+        help="progress store to copy as the starting state",
+    )
+    parser.add_argument("--exclude", action="append", default=None, help="regex of paths to skip (repeatable)")
+    args = parser.parse_args(argv)
+
+    records = load_traces(args.traces, DEFAULT_EXCLUDES if args.exclude is None else args.exclude)
+    if not records:
+        parser.error("no trace records found")
+
+    with tempfile.TemporaryDirectory(prefix="rmf-replay-") as scratch:
+        progress_dir = Path(scratch) / "progress"
+        if args.progress_dir.is_dir():
+            shutil.copytree(args.progress_dir, progress_dir)
+        use_scratch_stores(Path(scratch))
+
+        salts = _trace_salts(args.traces)
+        learners = learners_by_hash(progress_dir, salts)
+        matched = len({record["learner"] for record in records} & learners.keys())
+        print(f"{matched} traced learners matched to copied progress" + ("" if salts else " (no salt file found)"))
+        report(asyncio.run(_run(args, records, learners)))
+
+
+if __name__ == "__main__":
+    main()
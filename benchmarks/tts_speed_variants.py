@@ -0,0 +1,110 @@
+"""CPU cost of speed variants: full re-synthesis against time-stretching a 1.0x rendition.
+
+Run from the project root:
+
+    python -m benchmarks.tts_speed_variants --speeds 0.7 0.85 1.15 1.25 1.4
+
+With Kokoro installed, each speed is synthesized by the model and also
+derived from one 1.0x rendition with each stretch quality. For every
+variant the report gives CPU time, duration relative to the model's own
+rendition at that speed, and the distance between their long-term average
+spectra in dB. A pitch shift or phasing shows up as a larger distance.
+
+Without Kokoro, a synthetic voiced signal stands in for the 1.0x rendition
+and only the stretch side is measured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from server.services.time_stretch import STRETCH_QUALITIES, stretch_pcm
+from server.services.tts_kokoro import KokoroService, KokoroSynthesisError
+
+TEXT = (
+    "The Govern function cultivates a culture of risk management. "
+    "It connects technical work on AI systems to organizational values, "
+    "so that mapping, measuring and managing risk have clear owners and "
+    "are revisited as the system and its context change."
+)
+
+
+def _synthetic_voice(seconds: float, sample_rate: int) -> np.ndarray:
+    """Harmonic signal with a gliding pitch and syllable-rate envelope."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    signal = voiced * envelope
+    return (signal / np.abs(signal).max() * 20000).astype(np.int16)
+
+
+def _spectrum_db(pcm: np.ndarray, size: int = 1024) -> np.ndarray:
+    frames = pcm[: len(pcm) // size * size].astype(np.float32).reshape(-1, size) * np.hanning(size)
+    power = (np.abs(np.fft.rfft(frames, axis=1)) ** 2).mean(axis=0)
+    return 10 * np.log10(power / power.sum() + 1e-12)
+
+
+def _spectral_distance(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((_spectrum_db(a) - _spectrum_db(b)) ** 2)))
+
+
+def _cpu(fn, *args) -> tuple[float, object]:
+    started = time.process_time()
+    result = fn(*args)
+    return (time.process_time() - started) * 1000, result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speeds", type=float, nargs="+", default=[0.7, 0.85, 1.15, 1.25, 1.4])
+    parser.add_argument("--voice", default="af_heart")
+    parser.add_argument("--synthetic", action="store_true", help="skip Kokoro and use a synthetic base signal")
+    args = parser.parse_args(argv)
+
+    service = KokoroService(speed_variants="synthesize")
+    sample_rate = service.sample_rate
+    reference: dict[float, np.ndarray] = {}
+    try:
+        if args.synthetic:
+            raise KokoroSynthesisError("synthetic signal requested")
+        base_ms, base = _cpu(service._render_pcm, TEXT, args.voice, 1.0)
+        for speed in args.speeds:
+            reference[speed] = _cpu(service._render_pcm, TEXT, args.voice, speed)
+    except KokoroSynthesisError as error:
+        print(f"Re-synthesis not measured ({error}); using a synthetic 1.0x rendition.")
+        base_ms, base = 0.0, _synthetic_voice(12.0, sample_rate)
+
+    print(f"1.0x rendition: {len(base) / sample_rate:.2f}s of audio, {base_ms:.0f} ms CPU\n")
+    print(f"{'speed':>6} {'method':<18} {'cpu ms':>9} {'duration':>9} {'LTAS dB':>8}")
+    totals: dict[str, float] = {"synthesize": 0.0, **{f"stretch/{quality}": base_ms for quality in STRETCH_QUALITIES}}
+    for speed in args.speeds:
+        target = reference.get(speed)
+        if target is not None:
+            cpu_ms, pcm = target
+            totals["synthesize"] += cpu_ms
+            print(f"{speed:>6.2f} {'synthesize':<18} {cpu_ms:>9.1f} {1.0:>9.3f} {0.0:>8.2f}")
+        for quality in STRETCH_QUALITIES:
+            cpu_ms, stretched = _cpu(stretch_pcm, base, speed, sample_rate, quality)
+            totals[f"stretch/{quality}"] += cpu_ms
+            if target is not None:
+                duration = len(stretched) / len(target[1])
+                distance = _spectral_distance(stretched, target[1])
+            else:
+                duration = len(stretched) * speed / len(base)
+                distance = _spectral_distance(stretched, base)
+            print(f"{speed:>6.2f} {'stretch/' + quality:<18} {cpu_ms:>9.1f} {duration:>9.3f} {distance:>8.2f}")
+
+    print("\nCPU for all speeds (stretch totals include the 1.0x rendition):")
+    for method, total in totals.items():
+        if method == "synthesize" and not reference:
+            continue
+        print(f"  {method:<18} {total:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
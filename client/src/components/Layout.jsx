@@ -1,6 +1,7 @@
 import { useEffect } from 'react';
-import { Link, Outlet } from 'react-router-dom';
+import { Link, Outlet, useLocation } from 'react-router-dom';
 
+import { useActivityHeartbeat } from '../hooks/useActivityHeartbeat';
 import { useCourseModules } from '../hooks/useCourse';
 import { useProgress } from '../hooks/useProgress';
 import { overallProgressPercent } from '../utils/progress';
@@ -12,6 +13,9 @@ const MAIN_BACKGROUND = '#f1f1f1';
 
 export default function Layout() {
   const { modules } = useCourseModules();
+  const location = useLocation();
+  const activeModuleId = /^\/module\/([^/]+)/.exec(location.pathname)?.[1] || null;
+  useActivityHeartbeat(activeModuleId);
   const {
     progress,
     loading: progressLoading,
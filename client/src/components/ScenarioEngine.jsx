@@ -1,5 +1,6 @@
 import { useEffect, useMemo, useState } from 'react';
 
+import { useProgress } from '../hooks/useProgress';
 import { submitScenarioChoice } from '../utils/api';
 
 const GRADE_TITLES = {
@@ -38,6 +39,7 @@ function normalizeMaxPoints(scenario, fallback) {
 }
 
 export default function ScenarioEngine({ scenario, onComplete }) {
+  const { showBadgeNotification } = useProgress();
   const title = scenario?.title || 'Scenario';
   const context = scenario?.context || '';
   const grading = scenario?.grading || {};
@@ -109,6 +111,9 @@ export default function ScenarioEngine({ scenario, onComplete }) {
         };
         setResult(finalResult);
         onComplete?.(finalResult);
+        if (Array.isArray(response.newBadges) && response.newBadges.length > 0) {
+          showBadgeNotification(response.newBadges[0]);
+        }
         return;
       }
 
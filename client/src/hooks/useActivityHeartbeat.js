@@ -0,0 +1,65 @@
+import { useEffect } from 'react';
+import { sendActivityHeartbeat } from '../utils/api';
+
+const DEFAULT_INTERVAL_MS = 15000;
+
+// Reports time the page is visible while the learner is on a module. The
+// server aggregates heartbeats in memory, so a beat every few seconds is cheap.
+export function useActivityHeartbeat(moduleId) {
+  useEffect(() => {
+    if (typeof document === 'undefined') return undefined;
+
+    let intervalMs = DEFAULT_INTERVAL_MS;
+    let visibleSince = document.visibilityState === 'visible' ? Date.now() : null;
+    let activeMs = 0;
+    let timer = null;
+    let stopped = false;
+
+    const collect = () => {
+      if (visibleSince === null) return;
+      const now = Date.now();
+      activeMs += now - visibleSince;
+      visibleSince = now;
+    };
+
+    const beat = () => {
+      collect();
+      // Hidden tabs stay quiet, so a long absence reads as a session gap.
+      if (visibleSince !== null || activeMs > 0) {
+        const activeSeconds = Math.round(activeMs / 100) / 10;
+        activeMs = 0;
+        sendActivityHeartbeat(moduleId || null, activeSeconds)
+          .then((data) => {
+            if (typeof data?.intervalSeconds === 'number' && data.intervalSeconds > 0) {
+              intervalMs = data.intervalSeconds * 1000;
+            }
+          })
+          .catch(() => {});
+      }
+      if (!stopped) timer = window.setTimeout(beat, intervalMs);
+    };
+
+    const handleVisibility = () => {
+      if (document.visibilityState === 'visible') {
+        visibleSince = Date.now();
+      } else {
+        collect();
+        visibleSince = null;
+      }
+    };
+
+    document.addEventListener('visibilitychange', handleVisibility);
+    beat();
+
+    return () => {
+      stopped = true;
+      window.clearTimeout(timer);
+      document.removeEventListener('visibilitychange', handleVisibility);
+      // Credit the partial interval to the module being left.
+      collect();
+      if (activeMs > 0) {
+        sendActivityHeartbeat(moduleId || null, Math.round(activeMs / 100) / 10).catch(() => {});
+      }
+    };
+  }, [moduleId]);
+}
@@ -1,5 +1,10 @@
 import { useState, useEffect, useCallback, createContext, useContext } from 'react';
-import { getProgress, markLessonComplete as apiMarkComplete, resetProgress as apiReset } from '../utils/api';
+import {
+  getProgress,
+  markLessonComplete as apiMarkComplete,
+  resetProgress as apiReset,
+  subscribeProgressEvents,
+} from '../utils/api';
 
 const ProgressContext = createContext(null);
 
@@ -25,11 +30,41 @@ export function ProgressProvider({ children }) {
     refresh();
   }, [refresh]);
 
+  useEffect(() => {
+    // Changes made in another tab or device arrive as push notifications;
+    // re-read the document quietly instead of polling.
+    let pending = null;
+    const unsubscribe = subscribeProgressEvents(() => {
+      clearTimeout(pending);
+      pending = setTimeout(() => {
+        getProgress()
+          .then(setProgress)
+          .catch((err) => console.error('Failed to refresh progress:', err));
+      }, 250);
+    });
+    return () => {
+      clearTimeout(pending);
+      unsubscribe();
+    };
+  }, []);
+
+  const showBadgeNotification = useCallback((badge) => {
+    if (!badge || typeof badge !== 'object' || !badge.id) return;
+    setBadgeNotification({
+      id: badge.id,
+      name: badge.name || badge.id,
+      emoji: badge.emoji || '🏅',
+    });
+  }, []);
+
   const completeLesson = useCallback(async (moduleId, lessonId) => {
-    const data = await apiMarkComplete(moduleId, lessonId);
+    const { newBadges, ...data } = await apiMarkComplete(moduleId, lessonId);
     setProgress(data);
+    if (Array.isArray(newBadges) && newBadges.length > 0) {
+      showBadgeNotification(newBadges[0]);
+    }
     return data;
-  }, []);
+  }, [showBadgeNotification]);
 
   const reset = useCallback(async () => {
     const data = await apiReset();
@@ -49,15 +84,6 @@ export function ProgressProvider({ children }) {
     setConfettiActive(false);
   }, []);
 
-  const showBadgeNotification = useCallback((badge) => {
-    if (!badge || typeof badge !== 'object' || !badge.id) return;
-    setBadgeNotification({
-      id: badge.id,
-      name: badge.name || badge.id,
-      emoji: badge.emoji || '🏅',
-    });
-  }, []);
-
   const dismissBadgeNotification = useCallback(() => {
     setBadgeNotification(null);
   }, []);
@@ -1,23 +1,30 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 
 import CapstoneProject from '../components/CapstoneProject';
-import { getCapstone, getProgress, saveCapstone } from '../utils/api';
+import { getCapstone, getCapstoneDraft, patchCapstoneDraft } from '../utils/api';
+import { createPatch } from '../utils/jsonPatch';
 
 export default function CapstonePage() {
   const [definition, setDefinition] = useState(null);
   const [progressData, setProgressData] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const [loadError, setLoadError] = useState('');
+  // The last draft the server acknowledged; autosaves send only the diff
+  // against it, one request at a time so base versions stay in order.
+  const savedDraftRef = useRef({ version: 0, capstone: {} });
+  const saveQueueRef = useRef(Promise.resolve());
 
   useEffect(() => {
     let active = true;
 
     setIsLoading(true);
-    Promise.all([getCapstone(), getProgress()])
-      .then(([capstoneResult, progressResult]) => {
+    Promise.all([getCapstone(), getCapstoneDraft()])
+      .then(([capstoneResult, draftResult]) => {
         if (!active) return;
+        const capstone = (draftResult && draftResult.capstone) || {};
+        savedDraftRef.current = { version: draftResult?.version || 0, capstone };
         setDefinition(capstoneResult || {});
-        setProgressData((progressResult && progressResult.capstone) || {});
+        setProgressData(capstone);
       })
       .catch((error) => {
         if (!active) return;
@@ -32,6 +39,30 @@ export default function CapstonePage() {
     };
   }, []);
 
+  const handleSave = useCallback((payload) => {
+    const sendPatch = async (retryOnConflict) => {
+      const { version, capstone } = savedDraftRef.current;
+      const next = { ...capstone, ...payload };
+      const operations = createPatch(capstone, next);
+      if (operations.length === 0) return;
+
+      try {
+        const result = await patchCapstoneDraft(version, operations);
+        savedDraftRef.current = { version: result.version, capstone: next };
+      } catch (error) {
+        if (error?.status !== 409 || !retryOnConflict) throw error;
+        // Another tab saved first; rebase onto its draft and send ours again.
+        const latest = await getCapstoneDraft();
+        savedDraftRef.current = { version: latest.version, capstone: latest.capstone || {} };
+        await sendPatch(false);
+      }
+    };
+
+    const queued = saveQueueRef.current.then(() => sendPatch(true));
+    saveQueueRef.current = queued.catch(() => {});
+    return queued;
+  }, []);
+
   if (isLoading) {
     return (
       <section className="space-y-4">
@@ -65,10 +96,7 @@ export default function CapstonePage() {
       <CapstoneProject
         definition={definition || {}}
         savedProgress={progressData || {}}
-        onSave={async (payload) => {
-          const updated = await saveCapstone(payload);
-          setProgressData((updated && updated.capstone) || payload);
-        }}
+        onSave={handleSave}
       />
     </div>
   );
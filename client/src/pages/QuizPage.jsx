@@ -113,6 +113,8 @@ export default function QuizPage() {
 
     if (result?.badgeEarned?.isNew) {
       showBadgeNotification(result.badgeEarned);
+    } else if (Array.isArray(result?.newBadges) && result.newBadges.length > 0) {
+      showBadgeNotification(result.newBadges[0]);
     }
 
     return result;
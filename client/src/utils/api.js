@@ -1,9 +1,21 @@
 const BASE = '/api';
 
+const PROGRESS_EVENT_TYPES = [
+  'lesson.completed',
+  'quiz.recorded',
+  'badge.earned',
+  'module.status',
+  'scenario.recorded',
+  'capstone.saved',
+  'progress.reset',
+  'progress.imported',
+  'resync',
+];
+
 async function fetchJSON(url, options = {}) {
   const res = await fetch(`${BASE}${url}`, {
-    headers: { 'Content-Type': 'application/json', ...options.headers },
     ...options,
+    headers: { 'Content-Type': 'application/json', ...options.headers },
   });
   if (!res.ok) {
     let message = `API error: ${res.status} ${res.statusText}`;
@@ -15,7 +27,9 @@ async function fetchJSON(url, options = {}) {
     } catch (error) {
       // Ignore JSON parsing errors and keep status text message.
     }
-    throw new Error(message);
+    const error = new Error(message);
+    error.status = res.status;
+    throw error;
   }
   return res.json();
 }
@@ -37,6 +51,26 @@ async function fetchBinary(url, options = {}) {
   return res.blob();
 }
 
+const newIdempotencyKey = () =>
+  globalThis.crypto?.randomUUID?.() ?? `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+// Graded submissions carry an Idempotency-Key and are retried once with the
+// same key if the response is lost, so the server answers the retry from its
+// cache instead of counting another attempt.
+async function submitJSON(url, body) {
+  const options = {
+    method: 'POST',
+    headers: { 'Idempotency-Key': newIdempotencyKey() },
+    body: JSON.stringify(body),
+  };
+  try {
+    return await fetchJSON(url, options);
+  } catch (error) {
+    if (error.status !== undefined && error.status !== 502 && error.status !== 504) throw error;
+    return fetchJSON(url, options);
+  }
+}
+
 // Modules & Lessons
 export const getModules = () => fetchJSON('/modules');
 export const getLessons = (moduleId) => fetchJSON(`/modules/${moduleId}/lessons`);
@@ -49,30 +83,65 @@ export const markLessonComplete = (moduleId, lessonId) =>
     body: JSON.stringify({ moduleId, lessonId }),
   });
 export const resetProgress = () => fetchJSON('/progress/reset', { method: 'POST' });
+export const subscribeProgressEvents = (onEvent) => {
+  if (typeof EventSource === 'undefined') return () => {};
+  const source = new EventSource(`${BASE}/progress/events`);
+  const handler = (event) => {
+    let data = null;
+    try {
+      data = JSON.parse(event.data);
+    } catch (error) {
+      // Ignore malformed payloads; the event type alone is enough to refresh.
+    }
+    onEvent(event.type, data);
+  };
+  PROGRESS_EVENT_TYPES.forEach((type) => source.addEventListener(type, handler));
+  return () => source.close();
+};
+
+export const sendActivityHeartbeat = (moduleId, activeSeconds) =>
+  fetchJSON('/activity/heartbeat', {
+    method: 'POST',
+    body: JSON.stringify({ moduleId, activeSeconds }),
+  });
 
 // Quizzes
 export const getQuiz = (quizId) => fetchJSON(`/quizzes/${quizId}`);
 export const submitQuiz = (quizId, answers, moduleId) =>
-  fetchJSON(`/quizzes/${quizId}/submit`, {
+  submitJSON(`/quizzes/${quizId}/submit`, { answers, moduleId });
+
+// Review
+export const getReviewItems = (limit = 10) => fetchJSON(`/review/next?limit=${limit}`);
+export const gradeReviewItem = (itemId, quality) =>
+  fetchJSON('/review/grade', {
     method: 'POST',
-    body: JSON.stringify({ answers, moduleId }),
+    body: JSON.stringify({ itemId, quality }),
   });
 
 // Scenarios
 export const getScenario = (scenarioId) => fetchJSON(`/scenarios/${scenarioId}`);
 export const submitScenarioChoice = (scenarioId, stepId, choiceIndex) =>
-  fetchJSON(`/scenarios/${scenarioId}/choice`, {
-    method: 'POST',
-    body: JSON.stringify({ stepId, choiceIndex }),
-  });
+  submitJSON(`/scenarios/${scenarioId}/choice`, { stepId, choiceIndex });
 
 // Glossary
 export const getGlossary = () => fetchJSON('/glossary');
 
+// Search
+export const searchContent = (query, { limit = 10, kind } = {}) => {
+  const params = new URLSearchParams({ q: query, limit: String(limit) });
+  if (kind) params.set('kind', kind);
+  return fetchJSON(`/search?${params}`);
+};
+export const suggestSearchTerms = (query) =>
+  fetchJSON(`/search/suggest?${new URLSearchParams({ q: query })}`);
+
 // Capstone
 export const getCapstone = () => fetchJSON('/capstone');
 export const saveCapstone = (data) =>
   fetchJSON('/capstone/save', { method: 'POST', body: JSON.stringify(data) });
+export const getCapstoneDraft = () => fetchJSON('/capstone/draft');
+export const patchCapstoneDraft = (baseVersion, operations) =>
+  fetchJSON('/capstone/draft', { method: 'PATCH', body: JSON.stringify({ baseVersion, operations }) });
 
 // TTS
 export const getTtsVoices = () => fetchJSON('/tts/voices');
@@ -0,0 +1,37 @@
+function escapePointerToken(token) {
+  return String(token).replace(/~/g, '~0').replace(/\//g, '~1');
+}
+
+function isPlainObject(value) {
+  return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+// JSON.stringify drops undefined members, so they count as absent here too.
+function definedKeys(object) {
+  return Object.keys(object).filter((key) => object[key] !== undefined);
+}
+
+// Builds RFC 6902 operations that turn `before` into `after`. Objects are
+// diffed key by key; arrays and scalars are replaced whole.
+export function createPatch(before, after, path = '') {
+  if (isPlainObject(before) && isPlainObject(after)) {
+    const operations = [];
+    definedKeys(before).forEach((key) => {
+      if (after[key] === undefined) {
+        operations.push({ op: 'remove', path: `${path}/${escapePointerToken(key)}` });
+      }
+    });
+    definedKeys(after).forEach((key) => {
+      const childPath = `${path}/${escapePointerToken(key)}`;
+      if (before[key] === undefined) {
+        operations.push({ op: 'add', path: childPath, value: after[key] });
+      } else {
+        operations.push(...createPatch(before[key], after[key], childPath));
+      }
+    });
+    return operations;
+  }
+
+  if (JSON.stringify(before) === JSON.stringify(after)) return [];
+  return [{ op: 'replace', path, value: after }];
+}
@@ -15,6 +15,10 @@ echo "Installing Python dependencies..."
 cd "$PROJECT_DIR"
 pip install -r requirements.txt
 
+echo ""
+echo "Compiling course content pack..."
+python3 -m server.services.content_pack
+
 echo ""
 echo "Installing Node.js dependencies..."
 cd "$PROJECT_DIR/client"
@@ -1,16 +1,59 @@
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 try:
-    from .routers import progress, quiz, scenarios, tts
+    from .routers import activity, admin, analytics, progress, quiz, review, scenarios, search, tts
+    from .routers.dependencies import LEARNER_ID_COOKIE, LEARNER_ID_HEADER
+    from .services.activity_tracker import activity_tracker
+    from .services.admission import AdmissionMiddleware, admission_controller_from_env, trusted_proxies_from_env
+    from .services.progress_store import DEFAULT_LEARNER_ID
+    from .services.quiz_analytics import quiz_analytics
+    from .services.request_trace import RequestTraceMiddleware, trace_writer_from_env
+    from .services.scenario_analytics import scenario_analytics
+    from .services.static_assets import StaticAssets
 except ImportError:
-    from routers import progress, quiz, scenarios, tts
+    from routers import activity, admin, analytics, progress, quiz, review, scenarios, search, tts
+    from routers.dependencies import LEARNER_ID_COOKIE, LEARNER_ID_HEADER
+    from services.activity_tracker import activity_tracker
+    from services.admission import AdmissionMiddleware, admission_controller_from_env, trusted_proxies_from_env
+    from services.progress_store import DEFAULT_LEARNER_ID
+    from services.quiz_analytics import quiz_analytics
+    from services.request_trace import RequestTraceMiddleware, trace_writer_from_env
+    from services.scenario_analytics import scenario_analytics
+    from services.static_assets import StaticAssets
 
 
-app = FastAPI(title="NIST AI RMF Course API")
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    static_assets.load()
+    yield
+    # Persist in-memory counters and heartbeats that have not reached their
+    # flush threshold.
+    activity_tracker.close()
+    quiz_analytics.flush()
+    scenario_analytics.flush()
+    if trace_writer is not None:
+        trace_writer.close()
+
+
+app = FastAPI(title="NIST AI RMF Course API", lifespan=lifespan)
+
+# Added first so it sits inside CORS: rejections still carry CORS headers.
+# Set RMF_ADMISSION=on to enable.
+admission_controller = admission_controller_from_env()
+if admission_controller is not None:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission_controller,
+        learner_header=LEARNER_ID_HEADER,
+        learner_cookie=LEARNER_ID_COOKIE,
+        trusted_proxies=trusted_proxies_from_env(),
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,12 +61,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "Idempotent-Replayed"],
 )
 
+# Opt-in: set RMF_TRACE_DIR to record API traffic for benchmarks.trace_replay.
+trace_writer = trace_writer_from_env()
+if trace_writer is not None:
+    app.add_middleware(
+        RequestTraceMiddleware,
+        writer=trace_writer,
+        learner_header=LEARNER_ID_HEADER,
+        learner_cookie=LEARNER_ID_COOKIE,
+        default_learner=DEFAULT_LEARNER_ID,
+        sample_rate=float(os.environ.get("RMF_TRACE_SAMPLE", "1.0")),
+    )
+
 
+app.include_router(activity.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
 app.include_router(progress.router, prefix="/api")
 app.include_router(quiz.router, prefix="/api")
+app.include_router(review.router, prefix="/api")
 app.include_router(scenarios.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
 app.include_router(tts.router, prefix="/api")
 
 
@@ -33,4 +94,5 @@ def health_check() -> dict[str, str]:
 
 
 client_dist = Path(__file__).resolve().parent.parent / "client" / "dist"
-app.mount("/", StaticFiles(directory=client_dist, html=True, check_dir=False), name="static")
+static_assets = StaticAssets(client_dist)
+app.mount("/", static_assets, name="static")
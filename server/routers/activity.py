@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+try:
+    from ..services.activity_tracker import HEARTBEAT_INTERVAL_SECONDS, activity_tracker
+    from ..services.content_pack import ContentLoadError, load_content_pack
+    from .dependencies import get_learner_id
+except ImportError:
+    from routers.dependencies import get_learner_id
+    from services.activity_tracker import HEARTBEAT_INTERVAL_SECONDS, activity_tracker
+    from services.content_pack import ContentLoadError, load_content_pack
+
+
+router = APIRouter()
+
+
+class HeartbeatRequest(BaseModel):
+    moduleId: str | None = Field(default=None, max_length=64)
+    activeSeconds: float = Field(default=HEARTBEAT_INTERVAL_SECONDS, ge=0, le=3600)
+
+
+@router.post("/activity/heartbeat")
+def heartbeat(payload: HeartbeatRequest, learner_id: str = Depends(get_learner_id)) -> dict[str, Any]:
+    module_id = payload.moduleId
+    if module_id is not None:
+        try:
+            known = load_content_pack().has(f"module/{module_id}")
+        except ContentLoadError as error:
+            raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+        if not known:
+            raise HTTPException(status_code=404, detail="Module not found")
+
+    activity_tracker.record(learner_id, module_id, payload.activeSeconds)
+    return {"intervalSeconds": HEARTBEAT_INTERVAL_SECONDS}
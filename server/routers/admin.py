@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+try:
+    from ..services.progress_store import ProgressStore
+    from ..services.progress_transfer import EXPORT_FORMATS, ProgressImportError, export_chunks, import_ndjson
+    from .dependencies import require_admin
+except ImportError:
+    from services.progress_store import ProgressStore
+    from services.progress_transfer import EXPORT_FORMATS, ProgressImportError, export_chunks, import_ndjson
+    from routers.dependencies import require_admin
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+progress_store = ProgressStore()
+
+
+@router.get("/admin/progress/export")
+def export_progress(request: Request, format: str = Query(default="ndjson")) -> StreamingResponse:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    activity_base = f"{str(request.base_url).rstrip('/')}/activities"
+    return StreamingResponse(
+        export_chunks(progress_store, format, activity_base),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="progress-{format}.ndjson"'},
+    )
+
+
+@router.post("/admin/progress/import")
+async def import_progress(request: Request, overwrite: bool = Query(default=True)) -> dict[str, Any]:
+    try:
+        return await import_ndjson(progress_store, request.stream(), overwrite=overwrite)
+    except ProgressImportError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+try:
+    from ..services.cohort_aggregates import CohortAggregates
+    from ..services.content_pack import ContentLoadError, load_content_pack
+    from ..services.progress_store import ProgressStore
+    from ..services.quiz_analytics import quiz_analytics
+    from ..services.scenario_analytics import scenario_analytics
+    from .dependencies import require_admin
+except ImportError:
+    from routers.dependencies import require_admin
+    from services.cohort_aggregates import CohortAggregates
+    from services.content_pack import ContentLoadError, load_content_pack
+    from services.progress_store import ProgressStore
+    from services.quiz_analytics import quiz_analytics
+    from services.scenario_analytics import scenario_analytics
+
+
+router = APIRouter()
+_store = ProgressStore()
+cohort = CohortAggregates(_store.backend)
+
+
+def _content(group: str, key: str) -> Any:
+    try:
+        pack = load_content_pack()
+        pack.check(group)
+    except ContentLoadError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+
+    return pack.get_json(key)
+
+
+# Item analysis flags the correct options, so it is for instructors only.
+@router.get("/analytics/quizzes/{quiz_id}", dependencies=[Depends(require_admin)])
+def get_quiz_item_analysis(quiz_id: str) -> dict[str, Any]:
+    quiz = _content("quizzes", f"quiz/{quiz_id}")
+    if not isinstance(quiz, Mapping):
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    questions = quiz.get("questions")
+    return quiz_analytics.statistics(quiz_id, questions if isinstance(questions, (list, tuple)) else [])
+
+
+@router.get("/analytics/scenarios/{scenario_id}", dependencies=[Depends(require_admin)])
+def get_scenario_path_analysis(scenario_id: str) -> dict[str, Any]:
+    scenario = _content("scenarios", f"scenario/{scenario_id}")
+    if not isinstance(scenario, Mapping):
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+    return scenario_analytics.heatmap(scenario_id, scenario)
+
+
+def _module_ids() -> list[str]:
+    modules_data = _content("modules", "modules")
+    modules = modules_data.get("modules") if isinstance(modules_data, Mapping) else None
+    if not isinstance(modules, (list, tuple)):
+        return []
+    return [str(module["id"]) for module in modules if isinstance(module, Mapping) and module.get("id")]
+
+
+# Cohort views list every learner id with their progress, so they are admin-only.
+@router.get("/analytics/cohort", dependencies=[Depends(require_admin)])
+def get_cohort_summary() -> dict[str, Any]:
+    return cohort.summary(_module_ids())
+
+
+@router.get("/analytics/cohort/learners", dependencies=[Depends(require_admin)])
+def get_cohort_learners(
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=500),
+) -> dict[str, Any]:
+    return cohort.learners(_module_ids(), offset, limit)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import hmac
+import os
+import re
+
+from fastapi import HTTPException, Request
+
+try:
+    from ..services.progress_store import DEFAULT_LEARNER_ID, is_valid_learner_id
+except ImportError:
+    from services.progress_store import DEFAULT_LEARNER_ID, is_valid_learner_id
+
+
+LEARNER_ID_HEADER = "X-Learner-Id"
+LEARNER_ID_COOKIE = "rmf_learner"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+
+_IDEMPOTENCY_KEY_PATTERN = re.compile(r"[\x21-\x7e]{1,255}")
+
+
+def get_learner_id(request: Request) -> str:
+    # Header first (API clients, multi-learner tools), then the session cookie,
+    # then the single local learner so a stock install keeps working unchanged.
+    learner_id = (
+        request.headers.get(LEARNER_ID_HEADER)
+        or request.cookies.get(LEARNER_ID_COOKIE)
+        or DEFAULT_LEARNER_ID
+    )
+    if not is_valid_learner_id(learner_id):
+        raise HTTPException(status_code=400, detail="Invalid learner id")
+
+    return learner_id
+
+
+def get_idempotency_key(request: Request) -> str | None:
+    key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if key is None:
+        return None
+    if _IDEMPOTENCY_KEY_PATTERN.fullmatch(key) is None:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+    return key
+
+
+def require_admin(request: Request) -> None:
+    # Admin routes do not exist unless a token is configured.
+    expected = os.environ.get("RMF_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    supplied = request.headers.get(ADMIN_TOKEN_HEADER, "")
+    if not hmac.compare_digest(supplied.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
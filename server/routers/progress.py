@@ -1,17 +1,37 @@
+import json
+from collections.abc import AsyncIterator
 from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 try:
+    from server.routers.dependencies import get_learner_id
+    from server.services.activity_tracker import activity_tracker
+    from server.services.badge_rules import describe_badges
+    from server.services.capstone_store import capstone_drafts
+    from server.services.content_pack import ContentLoadError
+    from server.services.progress_events import progress_events
     from server.services.progress_store import ProgressStore
+    from server.services.review_scheduler import module_term_ids, review_scheduler
 except ImportError:
+    from routers.dependencies import get_learner_id
+    from services.activity_tracker import activity_tracker
+    from services.badge_rules import describe_badges
+    from services.capstone_store import capstone_drafts
+    from services.content_pack import ContentLoadError
+    from services.progress_events import progress_events
     from services.progress_store import ProgressStore
+    from services.review_scheduler import module_term_ids, review_scheduler
 
 
 router = APIRouter()
 progress_store = ProgressStore()
 
+EVENT_STREAM_KEEPALIVE_SECONDS = 15.0
+EVENT_STREAM_RETRY_MS = 3000
+
 
 class LessonCompleteRequest(BaseModel):
     moduleId: str
@@ -19,18 +39,74 @@ class LessonCompleteRequest(BaseModel):
 
 
 @router.get("/progress")
-def get_progress() -> dict[str, Any]:
-    return progress_store.get_progress()
+def get_progress(learner_id: str = Depends(get_learner_id)) -> dict[str, Any]:
+    return progress_store.get_progress(learner_id=learner_id)
+
+
+def _format_sse(event: dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def _progress_event_stream(request: Request, learner_id: str) -> AsyncIterator[str]:
+    subscription = progress_events.subscribe(learner_id)
+    dropped_reported = 0
+
+    try:
+        yield f"retry: {EVENT_STREAM_RETRY_MS}\n\n"
+        while not await request.is_disconnected():
+            events = await subscription.next_events(timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+
+            if subscription.dropped > dropped_reported:
+                # Older events were discarded for this slow consumer; tell the
+                # client to re-fetch /api/progress instead of trusting deltas.
+                dropped_reported = subscription.dropped
+                yield f"event: resync\ndata: {json.dumps({'dropped': dropped_reported})}\n\n"
+
+            for event in events:
+                yield _format_sse(event)
+    finally:
+        progress_events.unsubscribe(learner_id, subscription)
+
+
+@router.get("/progress/events")
+async def stream_progress_events(
+    request: Request,
+    learner_id: str = Depends(get_learner_id),
+) -> StreamingResponse:
+    return StreamingResponse(
+        _progress_event_stream(request, learner_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @router.post("/progress/lesson-complete")
 def mark_lesson_complete(
     payload: LessonCompleteRequest,
+    learner_id: str = Depends(get_learner_id),
 ) -> dict[str, Any]:
-    progress_store.set_user_start()
-    return progress_store.mark_lesson_complete(payload.moduleId, payload.lessonId)
+    progress_store.set_user_start(learner_id=learner_id)
+    try:
+        # A module's glossary terms join the review queue once the learner starts it.
+        review_scheduler.introduce(module_term_ids(payload.moduleId), learner_id=learner_id)
+    except ContentLoadError:
+        pass
+    update = progress_store.mark_lesson_complete(payload.moduleId, payload.lessonId, learner_id=learner_id)
+    # The response stays the progress document; badges earned by this lesson
+    # ride along so the client can announce them without re-deriving.
+    return {**update["progress"], "newBadges": describe_badges(update["newBadges"])}
 
 
 @router.post("/progress/reset")
-def reset_progress() -> dict[str, Any]:
-    return progress_store.reset_progress()
+def reset_progress(learner_id: str = Depends(get_learner_id)) -> dict[str, Any]:
+    activity_tracker.discard(learner_id)
+    progress = progress_store.reset_progress(learner_id=learner_id)
+    capstone_drafts.reset(learner_id=learner_id)
+    review_scheduler.reset(learner_id=learner_id)
+    return progress
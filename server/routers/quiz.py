@@ -1,18 +1,29 @@
 from __future__ import annotations
 
-import json
-from pathlib import Path
+from collections.abc import Mapping
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel, Field
 
 try:
+    from ..services.badge_rules import describe_badges
+    from ..services.content_pack import ContentLoadError, load_content_pack
     from ..services.grader import QuizGrader
+    from ..services.idempotency import IdempotencyError, submissions
     from ..services.progress_store import ProgressStore
+    from ..services.quiz_analytics import quiz_analytics
+    from ..services.review_scheduler import review_scheduler
+    from .dependencies import IDEMPOTENT_REPLAYED_HEADER, get_idempotency_key, get_learner_id
 except ImportError:
+    from routers.dependencies import IDEMPOTENT_REPLAYED_HEADER, get_idempotency_key, get_learner_id
+    from services.badge_rules import describe_badges
+    from services.content_pack import ContentLoadError, load_content_pack
     from services.grader import QuizGrader
+    from services.idempotency import IdempotencyError, submissions
     from services.progress_store import ProgressStore
+    from services.quiz_analytics import quiz_analytics
+    from services.review_scheduler import review_scheduler
 
 
 router = APIRouter()
@@ -37,93 +48,32 @@ class QuizSubmitResponse(BaseModel):
     passed: bool = False
     results: list[dict[str, Any]] = Field(default_factory=list)
     badgeEarned: BadgeAward | None = None
+    newBadges: list[BadgeAward] = Field(default_factory=list)
     progress: dict[str, Any] | None = None
 
 
 _progress_store = ProgressStore()
 _quiz_grader = QuizGrader()
 
-_DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "course_content"
-_QUIZZES_PATH = _DATA_DIR / "quizzes.json"
-_MODULES_PATH = _DATA_DIR / "modules.json"
-
-_QUIZZES_CACHE: dict[str, Any] | None = None
-_MODULES_BY_ID_CACHE: dict[str, dict[str, Any]] | None = None
-
 _DEFAULT_PASSING_SCORE = 70
 
 
-class ContentLoadError(Exception):
-    def __init__(self, status_code: int, detail: str) -> None:
-        super().__init__(detail)
-        self.status_code = status_code
-        self.detail = detail
-
-
-def _load_json(path: Path) -> dict[str, Any]:
-    if not path.exists():
-        raise ContentLoadError(status_code=404, detail=f"Content file not found: {path.name}")
-
-    try:
-        with path.open("r", encoding="utf-8") as handle:
-            data = json.load(handle)
-    except json.JSONDecodeError as error:
-        raise ContentLoadError(status_code=500, detail=f"Invalid JSON in content file: {path.name}") from error
-    except OSError as error:
-        raise ContentLoadError(status_code=500, detail=f"Unable to read content file: {path.name}") from error
-
-    if not isinstance(data, dict):
-        raise ContentLoadError(status_code=500, detail=f"Invalid content format in file: {path.name}")
-
-    return data
-
-
-def _load_quizzes() -> dict[str, Any]:
-    global _QUIZZES_CACHE
-
-    if _QUIZZES_CACHE is None:
-        _QUIZZES_CACHE = _load_json(_QUIZZES_PATH)
-
-    return _QUIZZES_CACHE
-
-
-def _load_modules() -> dict[str, dict[str, Any]]:
-    global _MODULES_BY_ID_CACHE
-
-    if _MODULES_BY_ID_CACHE is None:
-        modules_data = _load_json(_MODULES_PATH)
-        modules_list = modules_data.get("modules", [])
-        modules_by_id: dict[str, dict[str, Any]] = {}
-
-        if isinstance(modules_list, list):
-            for module in modules_list:
-                if not isinstance(module, dict):
-                    continue
-
-                module_id = module.get("id")
-                if isinstance(module_id, str):
-                    modules_by_id[module_id] = module
+def _find_quiz(quiz_id: str) -> Mapping[str, Any] | None:
+    pack = load_content_pack()
+    pack.check("quizzes")
+    quiz = pack.get_json(f"quiz/{quiz_id}")
 
-        _MODULES_BY_ID_CACHE = modules_by_id
-
-    return _MODULES_BY_ID_CACHE
-
-
-def _find_quiz(quiz_id: str) -> dict[str, Any] | None:
-    quizzes_data = _load_quizzes()
-    quizzes = quizzes_data.get("quizzes") if isinstance(quizzes_data, dict) else None
-    quiz = quizzes.get(quiz_id) if isinstance(quizzes, dict) else None
-
-    return quiz if isinstance(quiz, dict) else None
+    return quiz if isinstance(quiz, Mapping) else None
 
 
 def _find_badge(module_id: str) -> dict[str, Any] | None:
-    modules = _load_modules()
-    module = modules.get(module_id)
-    if not isinstance(module, dict):
+    pack = load_content_pack()
+    pack.check("modules")
+    module = pack.get_json(f"module/{module_id}")
+    if not isinstance(module, Mapping):
         return None
 
-    badge = module.get("badge", {}) if isinstance(module.get("badge", {}), dict) else {}
+    badge = module.get("badge", {}) if isinstance(module.get("badge", {}), Mapping) else {}
     badge_id = badge.get("id")
 
     if not isinstance(badge_id, str):
@@ -136,25 +86,6 @@ def _find_badge(module_id: str) -> dict[str, Any] | None:
     }
 
 
-def _sanitize_quiz(quiz: dict[str, Any]) -> dict[str, Any]:
-    sanitized_quiz: dict[str, Any] = dict(quiz)
-    sanitized_questions: list[dict[str, Any]] = []
-
-    for question in quiz.get("questions", []):
-        if not isinstance(question, dict):
-            continue
-
-        sanitized_question = dict(question)
-        sanitized_question.pop("correctIndex", None)
-        sanitized_question.pop("correctAnswer", None)
-        sanitized_question.pop("correctIndices", None)
-        sanitized_question.pop("explanation", None)
-        sanitized_questions.append(sanitized_question)
-
-    sanitized_quiz["questions"] = sanitized_questions
-    return sanitized_quiz
-
-
 def _normalize_passing_score(value: Any) -> int:
     if isinstance(value, bool):
         return _DEFAULT_PASSING_SCORE
@@ -169,20 +100,46 @@ def _normalize_passing_score(value: Any) -> int:
 
 
 @router.get("/quizzes/{quiz_id}")
-def get_quiz(quiz_id: str) -> dict[str, Any]:
+def get_quiz(quiz_id: str) -> Response:
     try:
-        quiz = _find_quiz(quiz_id)
+        pack = load_content_pack()
+        pack.check("quizzes")
     except ContentLoadError as error:
         raise HTTPException(status_code=error.status_code, detail=error.detail) from error
 
-    if quiz is None:
+    sanitized_quiz = pack.get_bytes(f"quiz-public/{quiz_id}")
+    if sanitized_quiz is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
-    return _sanitize_quiz(quiz)
+    return Response(content=sanitized_quiz, media_type="application/json")
 
 
 @router.post("/quizzes/{quiz_id}/submit", response_model=QuizSubmitResponse)
-def submit_quiz(quiz_id: str, payload: QuizSubmitRequest) -> QuizSubmitResponse:
+def submit_quiz(
+    quiz_id: str,
+    payload: QuizSubmitRequest,
+    response: Response,
+    learner_id: str = Depends(get_learner_id),
+    idempotency_key: str | None = Depends(get_idempotency_key),
+) -> QuizSubmitResponse:
+    # A retried submission is answered from cache instead of being graded
+    # and counted as another attempt.
+    try:
+        result, replayed = submissions.run(
+            learner_id,
+            idempotency_key,
+            f"quiz:{quiz_id}:{payload.model_dump_json()}",
+            lambda: _grade_and_record(quiz_id, payload, learner_id),
+        )
+    except IdempotencyError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+
+    if replayed:
+        response.headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    return result
+
+
+def _grade_and_record(quiz_id: str, payload: QuizSubmitRequest, learner_id: str) -> QuizSubmitResponse:
     try:
         quiz = _find_quiz(quiz_id)
         badge = _find_badge(payload.moduleId)
@@ -192,12 +149,14 @@ def submit_quiz(quiz_id: str, payload: QuizSubmitRequest) -> QuizSubmitResponse:
     if quiz is None:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
-    questions = quiz.get("questions", []) if isinstance(quiz, dict) else []
-    if not isinstance(questions, list):
+    questions = quiz.get("questions", []) if isinstance(quiz, Mapping) else []
+    if not isinstance(questions, (list, tuple)):
         questions = []
 
     passing_score = _normalize_passing_score(quiz.get("passingScore"))
     grading = _quiz_grader.grade_quiz(questions=questions, answers=payload.answers, passing_score=passing_score)
+    quiz_analytics.record(quiz_id, questions, payload.answers, grading["results"])
+    review_scheduler.record_quiz(quiz_id, grading["results"], learner_id=learner_id)
 
     progress_update = _progress_store.record_quiz_result(
         module_id=payload.moduleId,
@@ -205,6 +164,7 @@ def submit_quiz(quiz_id: str, payload: QuizSubmitRequest) -> QuizSubmitResponse:
         score=grading["score"],
         passed=grading["passed"],
         badge_id=badge["id"] if isinstance(badge, dict) else None,
+        learner_id=learner_id,
     )
 
     badge_earned = None
@@ -217,6 +177,7 @@ def submit_quiz(quiz_id: str, payload: QuizSubmitRequest) -> QuizSubmitResponse:
         }
 
     grading["badgeEarned"] = badge_earned
+    grading["newBadges"] = describe_badges(progress_update.get("newBadges", []))
     grading["progress"] = progress_update.get("progress")
 
     return QuizSubmitResponse(**grading)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+
+try:
+    from ..services.content_pack import ContentLoadError
+    from ..services.review_scheduler import describe_item, review_scheduler
+    from ..services.spaced_repetition import DUE, INTERVAL, REPS
+    from .dependencies import get_learner_id
+except ImportError:
+    from routers.dependencies import get_learner_id
+    from services.content_pack import ContentLoadError
+    from services.review_scheduler import describe_item, review_scheduler
+    from services.spaced_repetition import DUE, INTERVAL, REPS
+
+
+router = APIRouter()
+
+MAX_REVIEW_BATCH = 50
+
+
+class ReviewGradeRequest(BaseModel):
+    itemId: str = Field(min_length=1, max_length=160)
+    quality: int = Field(ge=0, le=5)
+
+
+def _iso(epoch_seconds: int | None) -> str | None:
+    if epoch_seconds is None:
+        return None
+    return datetime.fromtimestamp(epoch_seconds, timezone.utc).isoformat()
+
+
+@router.get("/review/next")
+def next_review_items(
+    limit: int = Query(default=10, ge=1, le=MAX_REVIEW_BATCH),
+    learner_id: str = Depends(get_learner_id),
+) -> dict[str, Any]:
+    due, next_due = review_scheduler.next_due(limit, learner_id=learner_id)
+
+    items = []
+    try:
+        for due_at, item_id in due:
+            item = describe_item(item_id)
+            # Items whose question or term left the course are skipped, not failed.
+            if item is not None:
+                items.append({**item, "dueAt": _iso(due_at)})
+    except ContentLoadError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+
+    return {"items": items, "nextDueAt": _iso(next_due)}
+
+
+@router.post("/review/grade")
+def grade_review_item(payload: ReviewGradeRequest, learner_id: str = Depends(get_learner_id)) -> dict[str, Any]:
+    try:
+        known = describe_item(payload.itemId) is not None
+    except ContentLoadError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+    if not known:
+        raise HTTPException(status_code=404, detail="Review item not found")
+
+    state = review_scheduler.grade([(payload.itemId, payload.quality)], learner_id=learner_id)[payload.itemId]
+    return {
+        "itemId": payload.itemId,
+        "dueAt": _iso(state[DUE]),
+        "intervalDays": state[INTERVAL],
+        "repetitions": state[REPS],
+    }
@@ -1,175 +1,67 @@
 from __future__ import annotations
 
-import json
 import re
-from pathlib import Path
+from collections.abc import Mapping
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import BaseModel, Field
 
 try:
+    from ..services.badge_rules import describe_badges
+    from ..services.capstone_store import CapstoneDraftError, capstone_drafts
+    from ..services.content_pack import ContentLoadError, load_content_pack
+    from ..services.idempotency import IdempotencyError, submissions
     from ..services.progress_store import ProgressStore
+    from ..services.scenario_analytics import scenario_analytics
+    from .dependencies import IDEMPOTENT_REPLAYED_HEADER, get_idempotency_key, get_learner_id
 except ImportError:
+    from routers.dependencies import IDEMPOTENT_REPLAYED_HEADER, get_idempotency_key, get_learner_id
+    from services.badge_rules import describe_badges
+    from services.capstone_store import CapstoneDraftError, capstone_drafts
+    from services.content_pack import ContentLoadError, load_content_pack
+    from services.idempotency import IdempotencyError, submissions
     from services.progress_store import ProgressStore
+    from services.scenario_analytics import scenario_analytics
 
 
 router = APIRouter()
 _progress_store = ProgressStore()
 
-_DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "course_content"
-_SCENARIOS_PATH = _DATA_DIR / "scenarios.json"
-_MODULES_PATH = _DATA_DIR / "modules.json"
-_GLOSSARY_PATH = _DATA_DIR / "glossary.json"
-_CAPSTONE_PATH = _DATA_DIR / "capstone.json"
-
-_SCENARIOS_CACHE: Any | None = None
-_MODULES_CACHE: Any | None = None
-_GLOSSARY_CACHE: dict[str, Any] | None = None
-_CAPSTONE_CACHE: dict[str, Any] | None = None
-_MODULE_LESSONS_CACHE: dict[int, dict[str, Any]] = {}
-
-
-class ContentLoadError(Exception):
-    def __init__(self, status_code: int, detail: str) -> None:
-        super().__init__(detail)
-        self.status_code = status_code
-        self.detail = detail
-
 
 def _raise_http_for_content(error: ContentLoadError) -> None:
     raise HTTPException(status_code=error.status_code, detail=error.detail) from error
 
 
-def _load_json(path: Path, label: str) -> Any:
-    if not path.exists():
-        raise ContentLoadError(status_code=404, detail=f"{label} content file not found: {path.name}")
-
+def _content_response(group: str, key: str, not_found_detail: str) -> Response:
     try:
-        with path.open("r", encoding="utf-8") as handle:
-            content = json.load(handle)
-    except json.JSONDecodeError as error:
-        raise ContentLoadError(status_code=500, detail=f"Invalid JSON in {label} content file") from error
-    except OSError as error:
-        raise ContentLoadError(status_code=500, detail=f"Unable to read {label} content file") from error
-
-    if not isinstance(content, (dict, list)):
-        raise ContentLoadError(status_code=500, detail=f"Unexpected format in {label} content file")
-
-    return content
-
-
-def _load_scenarios() -> Any:
-    global _SCENARIOS_CACHE
-
-    if _SCENARIOS_CACHE is None:
-        _SCENARIOS_CACHE = _load_json(_SCENARIOS_PATH, "scenarios")
-
-    return _SCENARIOS_CACHE
-
-
-def _load_modules() -> dict[str, Any]:
-    global _MODULES_CACHE
-
-    if _MODULES_CACHE is None:
-        loaded = _load_json(_MODULES_PATH, "modules")
-        if not isinstance(loaded, dict):
-            raise ContentLoadError(status_code=500, detail="Modules content is not an object")
-
-        modules = loaded.get("modules")
-        if not isinstance(modules, list):
-            raise ContentLoadError(status_code=500, detail="Modules content must include a modules array")
-
-        _MODULES_CACHE = loaded
-
-    return _MODULES_CACHE
-
-
-def _load_glossary() -> dict[str, Any]:
-    global _GLOSSARY_CACHE
-
-    if _GLOSSARY_CACHE is None:
-        glossary = _load_json(_GLOSSARY_PATH, "glossary")
-        if not isinstance(glossary, dict):
-            raise ContentLoadError(status_code=500, detail="Glossary content is not an object")
-        if not isinstance(glossary.get("terms"), list):
-            raise ContentLoadError(status_code=500, detail="Glossary content must include a terms array")
-        _GLOSSARY_CACHE = glossary
-
-    return _GLOSSARY_CACHE
-
-
-def _load_capstone() -> dict[str, Any]:
-    global _CAPSTONE_CACHE
-
-    if _CAPSTONE_CACHE is None:
-        loaded = _load_json(_CAPSTONE_PATH, "capstone")
-        if not isinstance(loaded, dict):
-            raise ContentLoadError(status_code=500, detail="Capstone content is not an object")
-        _CAPSTONE_CACHE = loaded
-
-    return _CAPSTONE_CACHE
-
-
-def _load_module_lessons(module_number: int) -> dict[str, Any] | None:
-    if module_number in _MODULE_LESSONS_CACHE:
-        return _MODULE_LESSONS_CACHE[module_number]
-
-    lessons_path = _DATA_DIR / f"module{module_number}_lessons.json"
-    if not lessons_path.exists():
-        return None
-
-    lessons_data = _load_json(lessons_path, f"module {module_number} lessons")
-    if not isinstance(lessons_data, dict):
-        raise ContentLoadError(status_code=500, detail=f"Invalid lessons format for module {module_number}")
-    if not isinstance(lessons_data.get("lessons"), list):
-        raise ContentLoadError(
-            status_code=500,
-            detail=f"Module {module_number} lessons content must include a lessons array",
-        )
-
-    _MODULE_LESSONS_CACHE[module_number] = lessons_data
-    return lessons_data
-
-
-def _find_scenario_by_id(scenarios_data: Any, scenario_id: str) -> dict[str, Any] | None:
-    if isinstance(scenarios_data, list):
-        for scenario in scenarios_data:
-            if isinstance(scenario, dict) and scenario.get("id") == scenario_id:
-                return scenario
-        return None
+        pack = load_content_pack()
+        pack.check(group)
+    except ContentLoadError as error:
+        _raise_http_for_content(error)
 
-    if not isinstance(scenarios_data, dict):
-        return None
+    content = pack.get_bytes(key)
+    if content is None:
+        raise HTTPException(status_code=404, detail=not_found_detail)
 
-    direct_lookup = scenarios_data.get(scenario_id)
-    if isinstance(direct_lookup, dict):
-        return direct_lookup
+    return Response(content=content, media_type="application/json")
 
-    scenarios_list = scenarios_data.get("scenarios")
-    if isinstance(scenarios_list, dict):
-        scenario_from_map = scenarios_list.get(scenario_id)
-        if isinstance(scenario_from_map, dict):
-            return scenario_from_map
-    if isinstance(scenarios_list, list):
-        for scenario in scenarios_list:
-            if isinstance(scenario, dict) and scenario.get("id") == scenario_id:
-                return scenario
 
-    top_level_id = scenarios_data.get("id")
-    if isinstance(top_level_id, str) and top_level_id == scenario_id:
-        return scenarios_data
+def _find_scenario(scenario_id: str) -> Mapping[str, Any] | None:
+    pack = load_content_pack()
+    pack.check("scenarios")
+    scenario = pack.get_json(f"scenario/{scenario_id}")
 
-    return None
+    return scenario if isinstance(scenario, Mapping) else None
 
 
-def _find_scenario_step(scenario: dict[str, Any], step_id: str) -> dict[str, Any] | None:
+def _find_scenario_step(scenario: Mapping[str, Any], step_id: str) -> Mapping[str, Any] | None:
     steps = scenario.get("steps")
-    if not isinstance(steps, list):
+    if not isinstance(steps, (list, tuple)):
         return None
 
     for step in steps:
-        if not isinstance(step, dict):
+        if not isinstance(step, Mapping):
             continue
         if step.get("id") == step_id:
             return step
@@ -188,27 +80,27 @@ def _validate_points(value: Any, field_name: str = "points") -> int:
     raise ValueError(f"{field_name} must be an integer")
 
 
-def _max_points_for_scenario(scenario: dict[str, Any]) -> int:
+def _max_points_for_scenario(scenario: Mapping[str, Any]) -> int:
     configured_max = scenario.get("maxPoints")
     if _is_int_like(configured_max):
         return int(configured_max)
 
     steps = scenario.get("steps")
-    if not isinstance(steps, list):
+    if not isinstance(steps, (list, tuple)):
         return 0
 
     max_points = 0
     for step in steps:
-        if not isinstance(step, dict):
+        if not isinstance(step, Mapping):
             continue
 
         choices = step.get("choices")
-        if not isinstance(choices, list) or not choices:
+        if not isinstance(choices, (list, tuple)) or not choices:
             continue
 
         best_for_step = None
         for choice in choices:
-            if not isinstance(choice, dict):
+            if not isinstance(choice, Mapping):
                 continue
             try:
                 choice_points = _validate_points(choice.get("points"), "choice points")
@@ -273,46 +165,52 @@ class ScenarioChoiceResponse(BaseModel):
     nextStepId: str | None = None
     isComplete: bool = False
     finalResult: ScenarioFinalResult | None = None
+    newBadges: list[dict[str, Any]] = Field(default_factory=list)
 
 
 @router.get("/scenarios/{scenario_id}")
-def get_scenario(scenario_id: str) -> dict[str, Any]:
-    try:
-        scenarios_data = _load_scenarios()
-    except ContentLoadError as error:
-        _raise_http_for_content(error)
-
-    scenario = _find_scenario_by_id(scenarios_data, scenario_id)
-    if scenario is None:
-        raise HTTPException(status_code=404, detail="Scenario not found")
-
-    return scenario
+def get_scenario(scenario_id: str) -> Response:
+    return _content_response("scenarios", f"scenario/{scenario_id}", "Scenario not found")
 
 
 @router.post("/scenarios/{scenario_id}/choice", response_model=ScenarioChoiceResponse)
-def submit_choice(scenario_id: str, payload: ScenarioChoiceRequest) -> ScenarioChoiceResponse:
+def submit_choice(
+    scenario_id: str,
+    payload: ScenarioChoiceRequest,
+    response: Response,
+    learner_id: str = Depends(get_learner_id),
+    idempotency_key: str | None = Depends(get_idempotency_key),
+) -> ScenarioChoiceResponse:
     try:
-        scenarios_data = _load_scenarios()
-    except ContentLoadError as error:
-        _raise_http_for_content(error)
+        result, replayed = submissions.run(
+            learner_id,
+            idempotency_key,
+            f"scenario:{scenario_id}:{payload.model_dump_json()}",
+            lambda: _resolve_choice(scenario_id, payload, learner_id),
+        )
+    except IdempotencyError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+
+    if replayed:
+        response.headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    return result
 
-    scenario = _find_scenario_by_id(scenarios_data, scenario_id)
-    if scenario is None:
-        raise HTTPException(status_code=404, detail="Scenario not found")
 
-    step = _find_scenario_step(scenario, payload.stepId)
+def _select_choice(scenario: Mapping[str, Any], step_id: str, choice_index: int) -> tuple[int, Any, str | None]:
+    """Points, feedback and next step id (None when the scenario ends) for one choice."""
+    step = _find_scenario_step(scenario, step_id)
     if step is None:
         raise HTTPException(status_code=404, detail="Step not found")
 
     choices = step.get("choices")
-    if not isinstance(choices, list):
+    if not isinstance(choices, (list, tuple)):
         raise HTTPException(status_code=400, detail="No choices available for this step")
 
-    if payload.choiceIndex < 0 or payload.choiceIndex >= len(choices):
+    if choice_index < 0 or choice_index >= len(choices):
         raise HTTPException(status_code=400, detail="Invalid choice index")
 
-    selected_choice = choices[payload.choiceIndex]
-    if not isinstance(selected_choice, dict):
+    selected_choice = choices[choice_index]
+    if not isinstance(selected_choice, Mapping):
         raise HTTPException(status_code=400, detail="Invalid choice data")
 
     try:
@@ -332,19 +230,38 @@ def submit_choice(scenario_id: str, payload: ScenarioChoiceRequest) -> ScenarioC
                 detail=f"Invalid scenario configuration: next step '{next_step}' does not exist",
             )
 
+    return points, feedback, next_step
+
+
+def _resolve_choice(scenario_id: str, payload: ScenarioChoiceRequest, learner_id: str) -> ScenarioChoiceResponse:
+    try:
+        scenario = _find_scenario(scenario_id)
+    except ContentLoadError as error:
+        _raise_http_for_content(error)
+
+    if scenario is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+
+    points, feedback, next_step = _select_choice(scenario, payload.stepId, payload.choiceIndex)
+
+    scenario_analytics.record(scenario_id, scenario, payload.stepId, payload.choiceIndex, next_step)
+
     is_complete = next_step is None
     final_result = None
+    new_badges: list[dict[str, Any]] = []
 
     if is_complete:
         total_points = payload.accumulatedPoints + points
         max_points = _max_points_for_scenario(scenario)
         final_result = _grade_scenario(total_points=total_points, max_points=max_points)
 
-        _progress_store.record_scenario_result(
+        scenario_update = _progress_store.record_scenario_result(
             scenario_id=scenario_id,
             score=total_points,
             max_score=max_points,
+            learner_id=learner_id,
         )
+        new_badges = describe_badges(scenario_update["newBadges"])
 
     return ScenarioChoiceResponse(
         feedback=feedback if isinstance(feedback, str) else "",
@@ -352,55 +269,86 @@ def submit_choice(scenario_id: str, payload: ScenarioChoiceRequest) -> ScenarioC
         nextStepId=next_step,
         isComplete=is_complete,
         finalResult=ScenarioFinalResult(**final_result) if final_result else None,
+        newBadges=new_badges,
     )
 
 
 @router.get("/glossary")
-def get_glossary() -> dict[str, Any]:
-    try:
-        glossary = _load_glossary()
-    except ContentLoadError as error:
-        _raise_http_for_content(error)
-    return glossary
+def get_glossary() -> Response:
+    return _content_response("glossary", "glossary", "Glossary not found")
 
 
 @router.get("/capstone")
-def get_capstone() -> dict[str, Any]:
+def get_capstone() -> Response:
+    return _content_response("capstone", "capstone", "Capstone not found")
+
+
+class CapstonePatchRequest(BaseModel):
+    baseVersion: int | None = None
+    operations: list[dict[str, Any]] | None = None
+    fields: dict[str, Any] | None = None
+
+
+def _check_capstone_body_size(request: Request) -> None:
+    content_length = request.headers.get("content-length")
+    # Operations carry their own JSON overhead, so allow some headroom over
+    # the stored draft limit before rejecting the raw request.
+    if content_length and content_length.isdigit() and int(content_length) > 2 * capstone_drafts.max_bytes:
+        raise HTTPException(status_code=413, detail="Capstone request is too large")
+
+
+@router.get("/capstone/draft")
+def get_capstone_draft(learner_id: str = Depends(get_learner_id)) -> dict[str, Any]:
+    return capstone_drafts.get(learner_id=learner_id)
+
+
+@router.patch("/capstone/draft", dependencies=[Depends(_check_capstone_body_size)])
+def patch_capstone_draft(
+    payload: CapstonePatchRequest,
+    learner_id: str = Depends(get_learner_id),
+) -> dict[str, Any]:
     try:
-        capstone = _load_capstone()
-    except ContentLoadError as error:
-        _raise_http_for_content(error)
-    return capstone
+        return capstone_drafts.patch(
+            learner_id=learner_id,
+            base_version=payload.baseVersion,
+            operations=payload.operations,
+            fields=payload.fields,
+        )
+    except CapstoneDraftError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
 
 
-@router.post("/capstone/save")
-def save_capstone_progress(payload: dict[str, Any]) -> dict[str, Any]:
+@router.post("/capstone/save", dependencies=[Depends(_check_capstone_body_size)])
+def save_capstone_progress(
+    payload: dict[str, Any],
+    learner_id: str = Depends(get_learner_id),
+) -> dict[str, Any]:
     if not isinstance(payload, dict):
         raise HTTPException(status_code=400, detail="Payload must be an object")
-    return _progress_store.save_capstone(payload)
+
+    # Kept for older clients: a shallow update of top-level capstone fields.
+    fields = {"/" + key.replace("~", "~0").replace("/", "~1"): value for key, value in payload.items()}
+    try:
+        capstone_drafts.patch(learner_id=learner_id, base_version=None, fields=fields)
+    except CapstoneDraftError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+
+    progress = _progress_store.get_progress(learner_id=learner_id)
+    progress["capstone"] = capstone_drafts.get(learner_id=learner_id)["capstone"]
+    return progress
 
 
 @router.get("/modules")
-def get_modules() -> dict[str, Any]:
-    try:
-        return _load_modules()
-    except ContentLoadError as error:
-        _raise_http_for_content(error)
+def get_modules() -> Response:
+    return _content_response("modules", "modules", "Modules not found")
 
 
 @router.get("/modules/{module_id}/lessons")
-def get_module_lessons(module_id: str) -> dict[str, Any]:
+def get_module_lessons(module_id: str) -> Response:
     match = re.fullmatch(r"module-(\d+)", module_id)
     if match is None:
         raise HTTPException(status_code=404, detail="Invalid module id")
 
     module_number = int(match.group(1))
-    try:
-        lessons = _load_module_lessons(module_number)
-    except ContentLoadError as error:
-        _raise_http_for_content(error)
-
-    if lessons is None:
-        raise HTTPException(status_code=404, detail="Module lessons not found")
-
-    return lessons
+    group = f"lessons/{module_number}"
+    return _content_response(group, group, "Module lessons not found")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any, Literal
+
+from fastapi import APIRouter, HTTPException, Query
+
+try:
+    from ..services.content_pack import ContentLoadError, load_content_pack
+    from ..services.search_index import SearchIndex, get_search_index
+except ImportError:
+    from services.content_pack import ContentLoadError, load_content_pack
+    from services.search_index import SearchIndex, get_search_index
+
+
+router = APIRouter()
+
+
+def _search_index() -> SearchIndex:
+    try:
+        return get_search_index(load_content_pack())
+    except ContentLoadError as error:
+        raise HTTPException(status_code=error.status_code, detail=error.detail) from error
+
+
+@router.get("/search")
+def search_content(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=10, ge=1, le=50),
+    kind: Literal["lesson", "glossary", "scenario"] | None = None,
+    prefix: bool = True,
+) -> dict[str, Any]:
+    return _search_index().search(q, limit=limit, kind=kind, prefix=prefix)
+
+
+@router.get("/search/suggest")
+def suggest_terms(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=8, ge=1, le=20),
+) -> dict[str, Any]:
+    return {"query": q, "suggestions": _search_index().suggest(q, limit=limit)}
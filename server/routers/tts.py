@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import os
+
 from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel, Field
 
 try:
-    from ..services.tts_kokoro import KokoroService, KokoroSynthesisError
+    from ..services.tts_kokoro import KokoroService, KokoroSynthesisError, KokoroUnavailableError
+    from ..services.tts_sidecar import sidecar_client_from_env
 except ImportError:
-    from services.tts_kokoro import KokoroService, KokoroSynthesisError
+    from services.tts_kokoro import KokoroService, KokoroSynthesisError, KokoroUnavailableError
+    from services.tts_sidecar import sidecar_client_from_env
 
 
 router = APIRouter()
-tts_service = KokoroService()
+# With RMF_TTS_SIDECAR set, synthesis runs in the shared sidecar process and
+# this worker only loads Kokoro itself if the sidecar is unreachable.
+tts_service = KokoroService(
+    sidecar=sidecar_client_from_env(),
+    local_fallback=os.environ.get("RMF_TTS_SIDECAR_FALLBACK", "local") != "none",
+)
 
 DEFAULT_VOICE = "af_heart"
 MIN_SPEED = 0.7
@@ -43,6 +52,7 @@ def get_tts_voices() -> dict[str, object]:
         "minSpeed": MIN_SPEED,
         "maxSpeed": MAX_SPEED,
         "engine": "kokoro-82m",
+        "mode": tts_service.mode,
     }
 
 
@@ -58,6 +68,8 @@ def synthesize_tts(payload: TtsRequest) -> Response:
             voice=payload.voice,
             speed=payload.speed,
         )
+    except KokoroUnavailableError as error:
+        raise HTTPException(status_code=error.status_code, detail=str(error)) from error
     except KokoroSynthesisError as error:
         raise HTTPException(status_code=500, detail=str(error)) from error
 
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+try:
+    from .progress_store import ProgressStore
+except ImportError:
+    from services.progress_store import ProgressStore
+
+HEARTBEAT_INTERVAL_SECONDS = 15.0
+# One heartbeat never credits more than this, whatever the client reports.
+MAX_CREDIT_SECONDS = 2 * HEARTBEAT_INTERVAL_SECONDS
+SESSION_GAP_SECONDS = 10 * 60.0
+FLUSH_INTERVAL_SECONDS = 30.0
+
+
+class _LearnerActivity:
+    __slots__ = ("last_beat", "first_at", "last_at", "seconds", "modules", "session_starts")
+
+    def __init__(self) -> None:
+        self.last_beat: float | None = None
+        self.first_at: str | None = None
+        self.last_at: str | None = None
+        self.seconds = 0.0
+        self.modules: dict[str, float] = {}
+        self.session_starts = 0
+
+    def has_pending(self) -> bool:
+        return self.first_at is not None
+
+    def snapshot(self, learner_id: str) -> dict[str, Any]:
+        return {
+            "learnerId": learner_id,
+            "seconds": self.seconds,
+            "modules": dict(self.modules),
+            "firstAt": self.first_at,
+            "lastAt": self.last_at,
+            "sessionStarts": self.session_starts,
+        }
+
+    def clear_pending(self) -> None:
+        self.first_at = None
+        self.last_at = None
+        self.seconds = 0.0
+        self.modules = {}
+        self.session_starts = 0
+
+    def restore(self, entry: dict[str, Any]) -> None:
+        # Put back a batch that failed to flush, ahead of anything newer.
+        self.first_at = entry["firstAt"]
+        self.last_at = self.last_at or entry["lastAt"]
+        self.seconds += entry["seconds"]
+        for module_id, seconds in entry["modules"].items():
+            self.modules[module_id] = self.modules.get(module_id, 0.0) + seconds
+        self.session_starts += entry["sessionStarts"]
+
+
+class ActivityTracker:
+    """Aggregates activity heartbeats in memory and flushes them in batches.
+
+    Each heartbeat credits the time since the learner's previous one, capped
+    by what the client reports as active and by ``MAX_CREDIT_SECONDS``; a gap
+    longer than ``session_gap`` starts a new session and credits nothing. A
+    background thread flushes every ``flush_interval`` seconds, so heartbeats
+    never touch disk themselves.
+    """
+
+    def __init__(
+        self,
+        store: ProgressStore | None = None,
+        session_gap: float = SESSION_GAP_SECONDS,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self._store = store if store is not None else ProgressStore()
+        self._session_gap = session_gap
+        self._flush_interval = flush_interval
+        self._learners: dict[str, _LearnerActivity] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # The batch was put back; it is retried on the next tick.
+                pass
+
+    def record(self, learner_id: str, module_id: str | None, active_seconds: float) -> None:
+        now = time.monotonic()
+        now_iso = datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            activity = self._learners.get(learner_id)
+            if activity is None:
+                activity = self._learners[learner_id] = _LearnerActivity()
+
+            gap = None if activity.last_beat is None else now - activity.last_beat
+            if gap is not None and gap > self._session_gap:
+                # A break at the start of a batch is detected by the store
+                # against the stored lastActiveAt; only count breaks inside it.
+                if activity.has_pending():
+                    activity.session_starts += 1
+            elif gap is not None:
+                credit = min(max(active_seconds, 0.0), gap, MAX_CREDIT_SECONDS)
+                activity.seconds += credit
+                if module_id is not None:
+                    activity.modules[module_id] = activity.modules.get(module_id, 0.0) + credit
+
+            activity.last_beat = now
+            if activity.first_at is None:
+                activity.first_at = now_iso
+            activity.last_at = now_iso
+
+        self._ensure_thread()
+
+    def discard(self, learner_id: str) -> None:
+        """Forget unflushed activity, e.g. when the learner resets progress."""
+        with self._lock:
+            self._learners.pop(learner_id, None)
+
+    def flush(self) -> None:
+        # One flush at a time, so a retried batch cannot race a newer one.
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                batch = []
+                for learner_id, activity in list(self._learners.items()):
+                    if activity.has_pending():
+                        batch.append(activity.snapshot(learner_id))
+                        activity.clear_pending()
+                    elif activity.last_beat is not None and now - activity.last_beat > self._session_gap:
+                        del self._learners[learner_id]
+
+            if not batch:
+                return
+
+            try:
+                self._store.record_activity(batch, session_gap=self._session_gap)
+            except Exception:
+                with self._lock:
+                    for entry in batch:
+                        self._learners.setdefault(entry["learnerId"], _LearnerActivity()).restore(entry)
+                raise
+
+    def close(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+
+activity_tracker = ActivityTracker()
@@ -0,0 +1,425 @@
+"""Admission control for the API: priority classes, concurrency limits and rate limits.
+
+Every API request is classified by method and path into a route class. A
+class has a priority, an optional concurrency limit of its own, a queue
+bound, a queue-time budget and a token cost. Admitted requests share one
+global capacity, and lower priorities may only fill part of it, so a burst of
+TTS requests cannot occupy every worker thread while quiz submissions wait.
+Requests that cannot start immediately queue per class; a freed slot goes to
+the highest-priority waiter that fits. A request that waits longer than its
+class budget is shed with ``503`` and ``Retry-After``. Each client address
+has a token bucket, and so does each learner id at that address (the id is
+client-supplied, so it only splits an address's allowance and never escapes
+it); an empty bucket yields ``429``. Behind a reverse proxy the address is
+taken from ``X-Forwarded-For`` when the peer is a trusted proxy.
+
+State is per process, like the rest of the in-memory services.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterable
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    from .progress_store import is_valid_learner_id
+except ImportError:
+    from services.progress_store import is_valid_learner_id
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+
+# Kept below the default 40-thread pool that runs sync handlers, so admitted
+# requests never queue again for a thread.
+DEFAULT_CAPACITY = 32
+# Fraction of the global capacity each priority may fill.
+DEFAULT_PRIORITY_SHARES = {PRIORITY_HIGH: 1.0, PRIORITY_NORMAL: 0.8, PRIORITY_LOW: 0.5}
+DEFAULT_RATE_PER_SECOND = 10.0
+DEFAULT_BURST = 40.0
+# Shared by every learner behind one address, e.g. a classroom behind NAT.
+DEFAULT_ADDRESS_RATE_PER_SECOND = 50.0
+DEFAULT_ADDRESS_BURST = 200.0
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class RouteClass:
+    __slots__ = ("name", "priority", "concurrency", "max_queue", "max_wait", "cost")
+
+    def __init__(
+        self,
+        name: str,
+        priority: int,
+        *,
+        concurrency: int | None = None,
+        max_queue: int = 64,
+        max_wait: float = 2.0,
+        cost: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.priority = priority
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.cost = cost
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "priority": self.priority,
+            "concurrency": self.concurrency,
+            "maxQueue": self.max_queue,
+            "maxWait": self.max_wait,
+            "cost": self.cost,
+        }
+
+
+def default_route_classes() -> list[RouteClass]:
+    return [
+        RouteClass("tts", PRIORITY_LOW, concurrency=4, max_queue=16, max_wait=2.0, cost=5.0),
+        RouteClass("admin", PRIORITY_LOW, concurrency=2, max_queue=4, max_wait=5.0),
+        RouteClass("writes", PRIORITY_HIGH, max_queue=128, max_wait=5.0),
+        RouteClass("progress", PRIORITY_HIGH, max_queue=128, max_wait=5.0),
+        RouteClass("default", PRIORITY_NORMAL, max_queue=64, max_wait=2.0),
+    ]
+
+
+# (method or None for any, path pattern, class name or None to bypass admission)
+DEFAULT_ROUTE_RULES: list[tuple[str | None, str, str | None]] = [
+    # Long-lived streams would pin a slot for as long as the page is open.
+    (None, r"/api/progress/events", None),
+    (None, r"/api/health", None),
+    ("POST", r"/api/tts", "tts"),
+    (None, r"/api/tts(/.*)?", "default"),
+    (None, r"/api/admin/.*", "admin"),
+    ("POST", r"/api/quizzes/[^/]+/submit", "writes"),
+    ("POST", r"/api/scenarios/[^/]+/choice", "writes"),
+    ("POST", r"/api/progress/.*", "writes"),
+    ("POST", r"/api/review/grade", "writes"),
+    ("PATCH", r"/api/capstone/draft", "writes"),
+    ("POST", r"/api/capstone/save", "writes"),
+    ("GET", r"/api/progress", "progress"),
+    ("GET", r"/api/review/next", "progress"),
+]
+
+
+class _TokenBuckets:
+    """Per-client token buckets, refilled lazily on each request."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = MAX_TRACKED_CLIENTS) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._max_clients = max_clients
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def take(self, client: str, cost: float, now: float) -> float | None:
+        """Spend ``cost`` tokens, or return the seconds until they would be available."""
+        if self.rate <= 0:
+            return None
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            # A client evicted here comes back with a full bucket, which only
+            # ever errs towards admitting.
+            while len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        cost = min(cost, self.burst)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return None
+        return (cost - bucket[0]) / self.rate
+
+    def refund(self, client: str, cost: float) -> None:
+        bucket = self._buckets.get(client)
+        if bucket is not None:
+            bucket[0] = min(self.burst, bucket[0] + min(cost, self.burst))
+
+
+class _Waiter:
+    __slots__ = ("route_class", "future")
+
+    def __init__(self, route_class: RouteClass, future: asyncio.Future[None]) -> None:
+        self.route_class = route_class
+        self.future = future
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        route_classes: Iterable[RouteClass] | None = None,
+        route_rules: Iterable[tuple[str | None, str, str | None]] | None = None,
+        *,
+        capacity: int = DEFAULT_CAPACITY,
+        priority_shares: dict[int, float] | None = None,
+        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+        burst: float = DEFAULT_BURST,
+        address_rate_per_second: float = DEFAULT_ADDRESS_RATE_PER_SECOND,
+        address_burst: float = DEFAULT_ADDRESS_BURST,
+    ) -> None:
+        self.classes = {route_class.name: route_class for route_class in (route_classes or default_route_classes())}
+        if "default" not in self.classes:
+            raise ValueError("Admission control needs a 'default' route class")
+        self._rules = [
+            (method, re.compile(pattern), name)
+            for method, pattern, name in (DEFAULT_ROUTE_RULES if route_rules is None else route_rules)
+        ]
+        for _, _, name in self._rules:
+            if name is not None and name not in self.classes:
+                raise ValueError(f"Admission rule refers to unknown route class {name!r}")
+
+        shares = {**DEFAULT_PRIORITY_SHARES, **(priority_shares or {})}
+        self.capacity = capacity
+        self._limits = {priority: max(1, math.floor(capacity * share)) for priority, share in shares.items()}
+        self._buckets = _TokenBuckets(rate_per_second, burst)
+        self._address_buckets = _TokenBuckets(address_rate_per_second, address_burst)
+        self._active = 0
+        self._active_by_class = dict.fromkeys(self.classes, 0)
+        # Class queues in priority order; FIFO within a class.
+        self._queues: dict[str, deque[_Waiter]] = {
+            name: deque()
+            for name in sorted(self.classes, key=lambda name: self.classes[name].priority)
+        }
+        self.stats = {
+            name: {"admitted": 0, "queued": 0, "shedQueueFull": 0, "shedTimeout": 0, "rateLimited": 0}
+            for name in self.classes
+        }
+
+    def classify(self, method: str, path: str) -> RouteClass | None:
+        for rule_method, pattern, name in self._rules:
+            if (rule_method is None or rule_method == method) and pattern.fullmatch(path):
+                return self.classes[name] if name is not None else None
+        return self.classes["default"]
+
+    def _fits(self, route_class: RouteClass) -> bool:
+        if self._active >= self._limits.get(route_class.priority, self.capacity):
+            return False
+        return route_class.concurrency is None or self._active_by_class[route_class.name] < route_class.concurrency
+
+    def _start(self, route_class: RouteClass) -> None:
+        self._active += 1
+        self._active_by_class[route_class.name] += 1
+        self.stats[route_class.name]["admitted"] += 1
+
+    def check_rate(self, address: str, learner_id: str | None, route_class: RouteClass) -> None:
+        """Spend the request's tokens from its address's bucket and its client's.
+
+        ``learner_id`` must already be validated; without one the client is
+        the address alone.
+        """
+        now = time.monotonic()
+        retry_after = self._address_buckets.take(address, route_class.cost, now)
+        if retry_after is None:
+            client = f"{address}|{learner_id}" if learner_id else address
+            retry_after = self._buckets.take(client, route_class.cost, now)
+            if retry_after is not None:
+                self._address_buckets.refund(address, route_class.cost)
+        if retry_after is not None:
+            self.stats[route_class.name]["rateLimited"] += 1
+            raise AdmissionRejectedError(429, "Too many requests", retry_after)
+
+    async def acquire(self, route_class: RouteClass) -> None:
+        queue = self._queues[route_class.name]
+        if not queue and self._fits(route_class):
+            self._start(route_class)
+            return
+
+        stats = self.stats[route_class.name]
+        if len(queue) >= route_class.max_queue:
+            stats["shedQueueFull"] += 1
+            raise AdmissionRejectedError(503, "Server is busy", route_class.max_wait)
+
+        waiter = _Waiter(route_class, asyncio.get_running_loop().create_future())
+        queue.append(waiter)
+        stats["queued"] += 1
+        # The queue may only have held waiters that already gave up.
+        self._grant()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), route_class.max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                stats["shedTimeout"] += 1
+                raise AdmissionRejectedError(503, "Server is busy", route_class.max_wait) from None
+            # Granted in the same tick the budget ran out; keep the slot.
+        except asyncio.CancelledError:
+            # The client went away while queued; give back a slot granted meanwhile.
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(route_class)
+            else:
+                waiter.future.cancel()
+            raise
+
+    def release(self, route_class: RouteClass) -> None:
+        self._active -= 1
+        self._active_by_class[route_class.name] -= 1
+        self._grant()
+
+    def _grant(self) -> None:
+        for queue in self._queues.values():
+            while queue:
+                waiter = queue[0]
+                if waiter.future.done():
+                    # Timed out or cancelled while queued.
+                    queue.popleft()
+                    continue
+                if not self._fits(waiter.route_class):
+                    break
+                queue.popleft()
+                self._start(waiter.route_class)
+                waiter.future.set_result(None)
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "priorityLimits": dict(self._limits),
+            "ratePerSecond": self._buckets.rate,
+            "burst": self._buckets.burst,
+            "addressRatePerSecond": self._address_buckets.rate,
+            "addressBurst": self._address_buckets.burst,
+            "classes": {name: route_class.describe() for name, route_class in self.classes.items()},
+        }
+
+
+async def _reject(send: Send, error: AdmissionRejectedError) -> None:
+    body = json.dumps({"detail": error.detail}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(max(1, math.ceil(error.retry_after))).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        learner_header: str,
+        learner_cookie: str,
+        path_prefix: str = "/api/",
+        trusted_proxies: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self._learner_header = learner_header.lower()
+        self._learner_cookie = learner_cookie
+        self._path_prefix = path_prefix
+        self._trusted_proxies = frozenset(trusted_proxies)
+
+    def _client(self, scope: Scope) -> tuple[str, str | None]:
+        """The client address, and the learner id if it is a valid one."""
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        headers = Headers(scope=scope)
+        if address in self._trusted_proxies:
+            # Each proxy appends the address it received from, so the first
+            # untrusted entry from the right is the one nobody could forge.
+            forwarded = [hop.strip() for hop in ",".join(headers.getlist("x-forwarded-for")).split(",")]
+            for hop in reversed([hop for hop in forwarded if hop]):
+                address = hop
+                if hop not in self._trusted_proxies:
+                    break
+        learner_id = headers.get(self._learner_header) or cookie_parser(headers.get("cookie", "")).get(
+            self._learner_cookie
+        )
+        return address, learner_id if is_valid_learner_id(learner_id) else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self._path_prefix):
+            await self.app(scope, receive, send)
+            return
+        route_class = self.controller.classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            self.controller.check_rate(*self._client(scope), route_class)
+            await self.controller.acquire(route_class)
+        except AdmissionRejectedError as error:
+            await _reject(send, error)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+
+def trusted_proxies_from_env() -> frozenset[str]:
+    """Peer addresses whose ``X-Forwarded-For`` is believed, from RMF_TRUSTED_PROXIES."""
+    return frozenset(
+        address.strip() for address in os.environ.get("RMF_TRUSTED_PROXIES", "").split(",") if address.strip()
+    )
+
+
+def admission_controller_from_env() -> AdmissionController | None:
+    """Enabled with RMF_ADMISSION=on; each limit has an RMF_ADMISSION_* override.
+
+    Per-class settings are ``RMF_ADMISSION_<CLASS>_<SETTING>`` with setting one
+    of PRIORITY (high, normal, low), CONCURRENCY (0 for none), QUEUE, WAIT
+    (seconds) or COST (tokens), e.g. ``RMF_ADMISSION_TTS_CONCURRENCY=2``.
+    """
+    # Off by default: a classroom behind one NAT or proxy shares one address
+    # bucket, so the limits need sizing for the deployment first.
+    if os.environ.get("RMF_ADMISSION", "off").lower() not in {"1", "on", "true", "yes"}:
+        return None
+
+    route_classes = default_route_classes()
+    for route_class in route_classes:
+        prefix = f"RMF_ADMISSION_{route_class.name.upper()}_"
+        priority = os.environ.get(prefix + "PRIORITY")
+        if priority is not None:
+            if priority not in PRIORITY_NAMES:
+                raise ValueError(f"{prefix}PRIORITY must be one of {', '.join(PRIORITY_NAMES)}")
+            route_class.priority = PRIORITY_NAMES[priority]
+        concurrency = os.environ.get(prefix + "CONCURRENCY")
+        if concurrency is not None:
+            route_class.concurrency = int(concurrency) or None
+        route_class.max_queue = int(os.environ.get(prefix + "QUEUE", route_class.max_queue))
+        route_class.max_wait = float(os.environ.get(prefix + "WAIT", route_class.max_wait))
+        route_class.cost = float(os.environ.get(prefix + "COST", route_class.cost))
+
+    return AdmissionController(
+        route_classes,
+        capacity=int(os.environ.get("RMF_ADMISSION_CAPACITY", DEFAULT_CAPACITY)),
+        priority_shares={
+            PRIORITY_NORMAL: float(os.environ.get("RMF_ADMISSION_NORMAL_SHARE", DEFAULT_PRIORITY_SHARES[PRIORITY_NORMAL])),
+            PRIORITY_LOW: float(os.environ.get("RMF_ADMISSION_LOW_SHARE", DEFAULT_PRIORITY_SHARES[PRIORITY_LOW])),
+        },
+        rate_per_second=float(os.environ.get("RMF_RATE_LIMIT_RPS", DEFAULT_RATE_PER_SECOND)),
+        burst=float(os.environ.get("RMF_RATE_LIMIT_BURST", DEFAULT_BURST)),
+        address_rate_per_second=float(os.environ.get("RMF_RATE_LIMIT_ADDRESS_RPS", DEFAULT_ADDRESS_RATE_PER_SECOND)),
+        address_burst=float(os.environ.get("RMF_RATE_LIMIT_ADDRESS_BURST", DEFAULT_ADDRESS_BURST)),
+    )
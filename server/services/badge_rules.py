@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import operator
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from threading import Lock
+from typing import Any
+
+try:
+    from .content_pack import ContentLoadError, load_content_pack
+except ImportError:
+    from services.content_pack import ContentLoadError, load_content_pack
+
+
+COUNTERS_KEY = "badgeCounters"
+
+_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+}
+
+
+class BadgeRule:
+    """One badge, awarded when events matching ``where`` have been seen.
+
+    Without ``distinct`` the first matching event earns the badge. With it,
+    the rule keeps a counter of distinct ``data[distinct]`` values whose
+    latest event matched (a later non-matching event for the same value
+    removes it) and awards the badge once ``target`` values are held.
+    ``seed`` fills that counter from the progress document the first time a
+    learner who predates the rule is seen.
+    """
+
+    __slots__ = ("badge_id", "event", "where", "distinct", "target", "seed", "name", "emoji")
+
+    def __init__(
+        self,
+        badge_id: str,
+        event: str,
+        where: Sequence[tuple[str, str, Any]] = (),
+        *,
+        distinct: str | None = None,
+        target: int = 1,
+        seed: Callable[[dict[str, Any]], Iterable[str]] | None = None,
+        name: str | None = None,
+        emoji: str | None = None,
+    ) -> None:
+        for _, op, _ in where:
+            if op not in _OPERATORS:
+                raise ValueError(f"Unsupported badge rule operator: {op!r}")
+        self.badge_id = badge_id
+        self.event = event
+        self.where = tuple(where)
+        self.distinct = distinct
+        self.target = target
+        self.seed = seed
+        self.name = name
+        self.emoji = emoji
+
+    def matches(self, data: Mapping[str, Any]) -> bool:
+        for field, op, expected in self.where:
+            value = data.get(field)
+            if value is None or isinstance(value, bool) is not isinstance(expected, bool):
+                return False
+            if not _OPERATORS[op](value, expected):
+                return False
+        return True
+
+    def module_id(self) -> str | None:
+        for field, op, expected in self.where:
+            if field == "moduleId" and op == "==":
+                return str(expected)
+        return None
+
+    def describe(self) -> dict[str, Any]:
+        return {"id": self.badge_id, "name": self.name, "emoji": self.emoji}
+
+
+def _completed_module_ids(progress: dict[str, Any]) -> list[str]:
+    modules = progress.get("modules")
+    if not isinstance(modules, dict):
+        return []
+    return [
+        str(module_id)
+        for module_id, module_progress in modules.items()
+        if isinstance(module_progress, dict) and module_progress.get("status") == "completed"
+    ]
+
+
+STATIC_RULES = (
+    BadgeRule("perfect-score", "quiz.recorded", (("score", ">=", 100),), name="Perfect Score", emoji="🌟"),
+    BadgeRule("scenario-star", "scenario.recorded", (("scoreRatio", ">=", 0.9),), name="Scenario Star", emoji="⭐"),
+)
+
+
+def course_rules(modules: Sequence[Mapping[str, Any]]) -> list[BadgeRule]:
+    """Per-module quiz badges and the completionist badge for a course outline."""
+    rules: list[BadgeRule] = []
+    module_ids: list[str] = []
+    for module in modules:
+        module_id = module.get("id")
+        if not isinstance(module_id, str):
+            continue
+        module_ids.append(module_id)
+
+        badge = module.get("badge")
+        if isinstance(badge, Mapping) and isinstance(badge.get("id"), str):
+            rules.append(
+                BadgeRule(
+                    badge["id"],
+                    "quiz.recorded",
+                    (("moduleId", "==", module_id), ("passed", "==", True)),
+                    name=badge.get("name") if isinstance(badge.get("name"), str) else None,
+                    emoji=badge.get("emoji") if isinstance(badge.get("emoji"), str) else None,
+                )
+            )
+
+    if module_ids:
+        rules.append(
+            BadgeRule(
+                "completionist",
+                "module.status",
+                (("status", "==", "completed"),),
+                distinct="moduleId",
+                target=len(module_ids),
+                seed=_completed_module_ids,
+                name="Completionist",
+                emoji="🎯",
+            )
+        )
+    return rules
+
+
+class BadgeEngine:
+    """Evaluates badge rules against progress mutation events.
+
+    Rules are indexed by event type and, for module-scoped rules, by module
+    id, so an event only touches the rules that can react to it. Counter
+    state lives in the learner's progress document under ``badgeCounters``
+    and is written with the same progress write, so evaluation never scans
+    the document; ``ProgressStore`` leaves it out of what clients are sent.
+    """
+
+    def __init__(self, rules: Iterable[BadgeRule]) -> None:
+        self._rules: dict[str, BadgeRule] = {}
+        self._index: dict[tuple[str, str | None], list[BadgeRule]] = {}
+        for rule in rules:
+            self._rules[rule.badge_id] = rule
+            self._index.setdefault((rule.event, rule.module_id()), []).append(rule)
+
+    def rule(self, badge_id: str) -> BadgeRule | None:
+        return self._rules.get(badge_id)
+
+    def evaluate(self, progress: dict[str, Any], event_type: str, data: Mapping[str, Any]) -> list[str]:
+        """Apply one event to ``progress`` and return the badges it newly earns."""
+        rules = self._index.get((event_type, None), [])
+        module_id = data.get("moduleId")
+        if module_id is not None:
+            rules = rules + self._index.get((event_type, str(module_id)), [])
+        if not rules:
+            return []
+
+        badges = progress.get("badges")
+        if not isinstance(badges, list):
+            badges = []
+            progress["badges"] = badges
+
+        earned: list[str] = []
+        for rule in rules:
+            if rule.badge_id in badges:
+                continue
+            if rule.distinct is None:
+                if rule.matches(data):
+                    earned.append(rule.badge_id)
+                continue
+
+            counters = progress.get(COUNTERS_KEY)
+            if not isinstance(counters, dict):
+                counters = {}
+                progress[COUNTERS_KEY] = counters
+            held = counters.get(rule.badge_id)
+            if not isinstance(held, list):
+                held = sorted(set(rule.seed(progress))) if rule.seed is not None else []
+                counters[rule.badge_id] = held
+
+            key = data.get(rule.distinct)
+            if key is None:
+                continue
+            key = str(key)
+            if rule.matches(data):
+                if key not in held:
+                    held.append(key)
+            elif key in held:
+                held.remove(key)
+
+            if len(held) >= rule.target:
+                earned.append(rule.badge_id)
+
+        for badge_id in earned:
+            badges.append(badge_id)
+        return earned
+
+
+_engine_lock = Lock()
+_engine: tuple[str, BadgeEngine] | None = None
+
+
+def badge_engine() -> BadgeEngine:
+    """Engine for the current content pack, rebuilt when the outline changes."""
+    global _engine
+    try:
+        pack = load_content_pack()
+        pack.check("modules")
+    except ContentLoadError:
+        return BadgeEngine(STATIC_RULES)
+
+    cached = _engine
+    if cached is not None and cached[0] == pack.version:
+        return cached[1]
+
+    with _engine_lock:
+        if _engine is None or _engine[0] != pack.version:
+            outline = pack.get_json("modules")
+            modules = outline.get("modules") if isinstance(outline, Mapping) else None
+            if not isinstance(modules, (list, tuple)):
+                modules = ()
+            rules = course_rules([module for module in modules if isinstance(module, Mapping)])
+            _engine = (pack.version, BadgeEngine((*STATIC_RULES, *rules)))
+        return _engine[1]
+
+
+def describe_badges(badge_ids: Iterable[str]) -> list[dict[str, Any]]:
+    engine = badge_engine()
+    described = []
+    for badge_id in badge_ids:
+        rule = engine.rule(badge_id)
+        badge = rule.describe() if rule is not None else {"id": badge_id, "name": None, "emoji": None}
+        described.append({**badge, "isNew": True})
+    return described
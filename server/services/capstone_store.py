@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+from typing import Any
+
+try:
+    from .progress_events import ProgressEventBroker, progress_events
+    from .progress_store import ProgressStore
+except ImportError:
+    from services.progress_events import ProgressEventBroker, progress_events
+    from services.progress_store import ProgressStore
+
+
+MAX_DRAFT_BYTES = 256 * 1024
+MAX_TEXT_CHARS = 20_000
+MAX_OPERATIONS = 500
+
+
+class CapstoneDraftError(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def default_capstone() -> dict[str, Any]:
+    return {
+        "started": False,
+        "currentStep": None,
+        "selectedSystem": None,
+        "responses": {},
+    }
+
+
+def _parse_pointer(pointer: Any) -> list[str]:
+    if pointer == "":
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise CapstoneDraftError(400, f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _list_index(container: list[Any], token: str, *, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise CapstoneDraftError(422, f"Invalid array index: {token!r}")
+
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise CapstoneDraftError(422, f"Array index out of range: {token}")
+    return index
+
+
+def _child(container: Any, token: str) -> Any:
+    if isinstance(container, dict):
+        if token not in container:
+            raise CapstoneDraftError(422, f"Path does not exist: {token!r}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_list_index(container, token, allow_end=False)]
+    raise CapstoneDraftError(422, f"Cannot traverse into a scalar at {token!r}")
+
+
+def _get(document: Any, tokens: list[str]) -> Any:
+    for token in tokens:
+        document = _child(document, token)
+    return document
+
+
+def _add(document: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+
+    parent = _get(document, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, token, allow_end=True), value)
+    else:
+        raise CapstoneDraftError(422, f"Cannot add a member to a scalar at {token!r}")
+    return document
+
+
+def _remove(document: Any, tokens: list[str]) -> Any:
+    if not tokens:
+        raise CapstoneDraftError(422, "Cannot remove the document root")
+
+    parent = _get(document, tokens[:-1])
+    token = tokens[-1]
+    if isinstance(parent, dict):
+        if token not in parent:
+            raise CapstoneDraftError(422, f"Path does not exist: {token!r}")
+        return parent.pop(token)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, token, allow_end=False))
+    raise CapstoneDraftError(422, f"Cannot remove a member of a scalar at {token!r}")
+
+
+def apply_patch(document: Any, operations: list[Any]) -> Any:
+    """Apply RFC 6902 operations to a copy of ``document``; all-or-nothing."""
+    document = copy.deepcopy(document)
+
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise CapstoneDraftError(400, "Patch operations must be objects")
+
+        op = operation.get("op")
+        tokens = _parse_pointer(operation.get("path"))
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise CapstoneDraftError(400, f"Operation {op!r} requires a value")
+
+        if op == "add":
+            document = _add(document, tokens, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(document, tokens)
+        elif op == "replace":
+            if tokens:
+                _remove(document, tokens)
+            document = _add(document, tokens, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            from_tokens = _parse_pointer(operation.get("from"))
+            if op == "move":
+                if tokens[: len(from_tokens)] == from_tokens and len(tokens) > len(from_tokens):
+                    raise CapstoneDraftError(422, "Cannot move a value into one of its children")
+                value = _remove(document, from_tokens)
+            else:
+                value = copy.deepcopy(_get(document, from_tokens))
+            document = _add(document, tokens, value)
+        elif op == "test":
+            if _get(document, tokens) != operation["value"]:
+                raise CapstoneDraftError(409, f"Test failed at {operation.get('path')!r}")
+        else:
+            raise CapstoneDraftError(400, f"Unsupported patch operation: {op!r}")
+
+    return document
+
+
+def apply_field_deltas(document: Any, fields: dict[str, Any]) -> Any:
+    """Set each JSON-pointer field, creating intermediate objects as needed."""
+    document = copy.deepcopy(document)
+
+    for pointer, value in fields.items():
+        tokens = _parse_pointer(pointer)
+        if not tokens:
+            raise CapstoneDraftError(400, "Field deltas cannot replace the document root")
+
+        parent = document
+        for token in tokens[:-1]:
+            if not isinstance(parent, dict):
+                raise CapstoneDraftError(422, f"Cannot set a field below a non-object at {pointer!r}")
+            child = parent.get(token)
+            if not isinstance(child, dict):
+                child = {}
+                parent[token] = child
+            parent = child
+
+        if not isinstance(parent, dict):
+            raise CapstoneDraftError(422, f"Cannot set a field below a non-object at {pointer!r}")
+        parent[tokens[-1]] = copy.deepcopy(value)
+
+    return document
+
+
+def _longest_text(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return max((_longest_text(item) for item in value.values()), default=0)
+    if isinstance(value, list):
+        return max((_longest_text(item) for item in value), default=0)
+    return 0
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class CapstoneStore:
+    """Versioned capstone drafts kept apart from core learner progress.
+
+    Drafts are ``{version, capstone}`` documents in a companion of the
+    progress backend, so they share its storage and locking but are not
+    loaded by progress reads. The base-version check and the write happen in
+    one backend update, under the shard lock or WATCH transaction, so every
+    worker and node sees the same sequence of versions.
+    """
+
+    def __init__(
+        self,
+        progress: ProgressStore | None = None,
+        events: ProgressEventBroker | None = None,
+        backend: Any | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        self._progress = progress if progress is not None else ProgressStore()
+        self._events = events if events is not None else progress_events
+        self._backend = backend if backend is not None else self._progress.backend.companion("capstone")
+        self._max_bytes = max_bytes or int(os.environ.get("RMF_CAPSTONE_MAX_BYTES", MAX_DRAFT_BYTES))
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def _current(self, learner_id: str, stored: dict[str, Any] | None) -> tuple[int, dict[str, Any]]:
+        if isinstance(stored, dict) and isinstance(stored.get("capstone"), dict):
+            version = stored.get("version")
+            return (version if isinstance(version, int) else 0), stored["capstone"]
+
+        # Drafts saved before capstones moved out of the progress document
+        # are picked up from there until the first patch.
+        capstone = default_capstone()
+        legacy = self._progress.get_progress(learner_id=learner_id).get("capstone")
+        if isinstance(legacy, dict):
+            capstone.update(legacy)
+        return 0, capstone
+
+    def get(self, *, learner_id: str) -> dict[str, Any]:
+        version, capstone = self._current(learner_id, self._backend.read(learner_id))
+        return {"version": version, "capstone": capstone}
+
+    def _check_limits(self, capstone: Any) -> int:
+        if not isinstance(capstone, dict):
+            raise CapstoneDraftError(422, "Capstone draft must be an object")
+
+        size = len(_encode(capstone))
+        if size > self._max_bytes:
+            raise CapstoneDraftError(413, f"Capstone draft exceeds {self._max_bytes} bytes")
+        if _longest_text(capstone) > MAX_TEXT_CHARS:
+            raise CapstoneDraftError(413, f"Capstone answers are limited to {MAX_TEXT_CHARS} characters")
+        return size
+
+    def patch(
+        self,
+        *,
+        learner_id: str,
+        base_version: int | None,
+        operations: list[Any] | None = None,
+        fields: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        operation_count = len(operations or ()) + len(fields or {})
+        if operation_count > MAX_OPERATIONS:
+            raise CapstoneDraftError(413, f"Capstone patches are limited to {MAX_OPERATIONS} operations")
+
+        def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+            version, capstone = self._current(learner_id, stored)
+            if base_version is not None and base_version != version:
+                raise CapstoneDraftError(409, f"Capstone draft is at version {version}, not {base_version}")
+            if not operation_count:
+                return None, {"version": version, "size": len(_encode(capstone))}
+
+            updated = capstone
+            if operations:
+                updated = apply_patch(updated, operations)
+            if fields:
+                updated = apply_field_deltas(updated, fields)
+            size = self._check_limits(updated)
+            return {"version": version + 1, "capstone": updated}, {"version": version + 1, "size": size}
+
+        result, _ = self._backend.update(learner_id, mutate)
+        if operation_count:
+            self._events.publish("capstone.saved", learner_id, version=result["version"])
+        return result
+
+    def reset(self, *, learner_id: str) -> None:
+        # The version keeps counting, so a client still holding the old
+        # draft gets a conflict instead of patching the blank one.
+        def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any], None]:
+            version = stored.get("version") if isinstance(stored, dict) else None
+            next_version = version + 1 if isinstance(version, int) else 1
+            return {"version": next_version, "capstone": default_capstone()}, None
+
+        self._backend.update(learner_id, mutate)
+
+
+capstone_drafts = CapstoneStore()
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+ROLLUP_FILENAME = "_rollup.json"
+SCORE_BINS = 11  # 0-9, 10-19, ..., 90-99, 100
+TRACKED_STATUSES = ("in_progress", "completed")
+
+
+def _is_int_like(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def empty_rollup() -> dict[str, Any]:
+    return {
+        "learnerCount": 0,
+        "moduleStatus": {},
+        "quizScores": {},
+        "badges": {},
+        "scenarios": {},
+    }
+
+
+def learner_summary(progress: dict[str, Any]) -> dict[str, Any]:
+    modules = progress.get("modules") if isinstance(progress.get("modules"), dict) else {}
+    scenarios = progress.get("scenarios") if isinstance(progress.get("scenarios"), dict) else {}
+    badges = progress.get("badges") if isinstance(progress.get("badges"), list) else []
+
+    statuses: dict[str, str] = {}
+    quiz_scores: dict[str, int] = {}
+    for module_id, module_progress in modules.items():
+        if not isinstance(module_progress, dict):
+            continue
+        if module_progress.get("status") in TRACKED_STATUSES:
+            statuses[module_id] = module_progress["status"]
+        if _is_int_like(module_progress.get("quizScore")):
+            quiz_scores[module_id] = int(module_progress["quizScore"])
+
+    scenario_ratios: dict[str, float] = {}
+    for scenario_id, result in scenarios.items():
+        if not isinstance(result, dict):
+            continue
+        score, max_score = result.get("score"), result.get("maxScore")
+        if isinstance(score, (int, float)) and isinstance(max_score, (int, float)) and max_score > 0:
+            scenario_ratios[scenario_id] = round(score / max_score, 4)
+
+    return {
+        "modules": statuses,
+        "quizScores": quiz_scores,
+        "badges": sorted({str(badge_id) for badge_id in badges}),
+        "scenarios": scenario_ratios,
+    }
+
+
+def _adjust(rollup: dict[str, Any], summary: dict[str, Any], sign: int) -> None:
+    rollup["learnerCount"] += sign
+
+    for module_id, status in summary["modules"].items():
+        counts = rollup["moduleStatus"].setdefault(module_id, {status_name: 0 for status_name in TRACKED_STATUSES})
+        counts[status] += sign
+
+    for module_id, score in summary["quizScores"].items():
+        distribution = rollup["quizScores"].setdefault(module_id, {"histogram": [0] * SCORE_BINS, "count": 0, "sum": 0})
+        distribution["histogram"][min(max(score // 10, 0), SCORE_BINS - 1)] += sign
+        distribution["count"] += sign
+        distribution["sum"] += sign * score
+
+    for badge_id in summary["badges"]:
+        rollup["badges"][badge_id] = rollup["badges"].get(badge_id, 0) + sign
+
+    for scenario_id, ratio in summary["scenarios"].items():
+        totals = rollup["scenarios"].setdefault(scenario_id, {"count": 0, "ratioSum": 0.0})
+        totals["count"] += sign
+        totals["ratioSum"] = round(totals["ratioSum"] + sign * ratio, 6)
+
+
+def apply_summary_change(rollup: dict[str, Any], previous: dict[str, Any] | None, summary: dict[str, Any]) -> bool:
+    """Move one learner's contribution from ``previous`` (None if not yet counted) to ``summary``.
+
+    Returns False if nothing changed.
+    """
+    if previous == summary:
+        return False
+
+    if previous is not None:
+        _adjust(rollup, previous, -1)
+    _adjust(rollup, summary, 1)
+    return True
+
+
+def _flatten(rollup: dict[str, Any]) -> dict[str, int | float]:
+    counts: dict[str, int | float] = {"learnerCount": rollup["learnerCount"]}
+    for module_id, statuses in rollup["moduleStatus"].items():
+        for status, count in statuses.items():
+            counts[f"moduleStatus|{module_id}|{status}"] = count
+    for module_id, distribution in rollup["quizScores"].items():
+        for index, count in enumerate(distribution["histogram"]):
+            counts[f"quizScores|{module_id}|histogram|{index}"] = count
+        counts[f"quizScores|{module_id}|count"] = distribution["count"]
+        counts[f"quizScores|{module_id}|sum"] = distribution["sum"]
+    for badge_id, count in rollup["badges"].items():
+        counts[f"badges|{badge_id}"] = count
+    for scenario_id, totals in rollup["scenarios"].items():
+        counts[f"scenarios|{scenario_id}|count"] = totals["count"]
+        counts[f"scenarios|{scenario_id}|ratioSum"] = totals["ratioSum"]
+    return counts
+
+
+def rollup_delta(previous: dict[str, Any] | None, summary: dict[str, Any]) -> dict[str, int | float]:
+    """Counter increments that move a learner from ``previous`` to ``summary``.
+
+    Keys are ``|``-joined paths into the rollup, for stores that keep the
+    rollup as a flat hash of counters (see ``rollup_from_counts``).
+    """
+    delta = empty_rollup()
+    if previous is not None:
+        _adjust(delta, previous, -1)
+    _adjust(delta, summary, 1)
+    return {field: amount for field, amount in _flatten(delta).items() if amount}
+
+
+def rollup_from_counts(counts: dict[str, str]) -> dict[str, Any]:
+    """Rebuild a rollup from flat counters written with ``rollup_delta``."""
+    rollup = empty_rollup()
+    for field, raw in counts.items():
+        head, _, rest = field.partition("|")
+        # Ids may contain "|", so the known suffixes are split from the right.
+        if head == "learnerCount":
+            rollup["learnerCount"] = int(raw)
+        elif head == "moduleStatus" and "|" in rest:
+            module_id, status = rest.rsplit("|", 1)
+            statuses = rollup["moduleStatus"].setdefault(module_id, {name: 0 for name in TRACKED_STATUSES})
+            statuses[status] = int(raw)
+        elif head == "quizScores" and "|" in rest:
+            new_distribution = {"histogram": [0] * SCORE_BINS, "count": 0, "sum": 0}
+            module_id, key = rest.rsplit("|", 1)
+            if module_id.endswith("|histogram") and key.isdigit() and int(key) < SCORE_BINS:
+                module_id = module_id[: -len("|histogram")]
+                rollup["quizScores"].setdefault(module_id, new_distribution)["histogram"][int(key)] = int(raw)
+            elif key in ("count", "sum"):
+                rollup["quizScores"].setdefault(module_id, new_distribution)[key] = int(raw)
+        elif head == "badges" and rest:
+            rollup["badges"][rest] = int(raw)
+        elif head == "scenarios" and "|" in rest:
+            scenario_id, key = rest.rsplit("|", 1)
+            totals = rollup["scenarios"].setdefault(scenario_id, {"count": 0, "ratioSum": 0.0})
+            if key == "count":
+                totals["count"] = int(raw)
+            elif key == "ratioSum":
+                totals["ratioSum"] = round(float(raw), 6)
+    return rollup
+
+
+def read_rollup(path: Path) -> dict[str, Any]:
+    try:
+        with path.open("r", encoding="utf-8") as rollup_file:
+            data = json.load(rollup_file)
+    except (OSError, json.JSONDecodeError):
+        return empty_rollup()
+
+    if not isinstance(data, dict) or not isinstance(data.get("moduleStatus"), dict):
+        return empty_rollup()
+    # Rollups used to carry a row per learner; the counters alone are kept.
+    data.pop("learners", None)
+    return data
+
+
+def write_rollup(path: Path, rollup: dict[str, Any]) -> None:
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with temp_path.open("w", encoding="utf-8") as rollup_file:
+        json.dump(rollup, rollup_file, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def _merge_counts(target: dict[str, int], source: dict[str, int]) -> None:
+    for key, value in source.items():
+        target[key] = target.get(key, 0) + value
+
+
+class CohortAggregates:
+    """Cohort views over the rollups and learner summaries a progress backend keeps.
+
+    ``backend.rollups()`` returns the per-shard counters and
+    ``backend.learner_summaries(offset, limit)`` one page of learners in a
+    stable order, with the total count.
+    """
+
+    def __init__(self, backend: Any) -> None:
+        self._backend = backend
+
+    def summary(self, module_ids: list[str]) -> dict[str, Any]:
+        learner_count = 0
+        module_status: dict[str, dict[str, int]] = {}
+        quiz_scores: dict[str, dict[str, Any]] = {}
+        badges: dict[str, int] = {}
+        scenarios: dict[str, dict[str, float]] = {}
+
+        for rollup in self._backend.rollups():
+            learner_count += rollup["learnerCount"]
+            for module_id, counts in rollup["moduleStatus"].items():
+                _merge_counts(module_status.setdefault(module_id, {}), counts)
+            for module_id, distribution in rollup["quizScores"].items():
+                merged = quiz_scores.setdefault(module_id, {"histogram": [0] * SCORE_BINS, "count": 0, "sum": 0})
+                merged["histogram"] = [a + b for a, b in zip(merged["histogram"], distribution["histogram"])]
+                merged["count"] += distribution["count"]
+                merged["sum"] += distribution["sum"]
+            _merge_counts(badges, rollup["badges"])
+            for scenario_id, totals in rollup["scenarios"].items():
+                merged_totals = scenarios.setdefault(scenario_id, {"count": 0, "ratioSum": 0.0})
+                merged_totals["count"] += totals["count"]
+                merged_totals["ratioSum"] += totals["ratioSum"]
+
+        ordered_modules = module_ids + sorted(set(module_status) - set(module_ids))
+        modules_view = []
+        for module_id in ordered_modules:
+            counts = module_status.get(module_id, {})
+            in_progress = counts.get("in_progress", 0)
+            completed = counts.get("completed", 0)
+            distribution = quiz_scores.get(module_id)
+            modules_view.append(
+                {
+                    "moduleId": module_id,
+                    "notStarted": learner_count - in_progress - completed,
+                    "inProgress": in_progress,
+                    "completed": completed,
+                    "quizScores": {
+                        "histogram": distribution["histogram"] if distribution else [0] * SCORE_BINS,
+                        "count": distribution["count"] if distribution else 0,
+                        "mean": round(distribution["sum"] / distribution["count"], 2)
+                        if distribution and distribution["count"]
+                        else None,
+                    },
+                }
+            )
+
+        return {
+            "learnerCount": learner_count,
+            "modules": modules_view,
+            "badges": dict(sorted(badges.items())),
+            "scenarios": {
+                scenario_id: {
+                    "completions": int(totals["count"]),
+                    "meanScoreRatio": round(totals["ratioSum"] / totals["count"], 4) if totals["count"] else None,
+                }
+                for scenario_id, totals in sorted(scenarios.items())
+            },
+        }
+
+    def learners(self, module_ids: list[str], offset: int, limit: int) -> dict[str, Any]:
+        total, page = self._backend.learner_summaries(offset, limit)
+        rows = [
+            {
+                "learnerId": learner_id,
+                "modules": [summary["modules"].get(module_id, "not_started") for module_id in module_ids],
+                "quizScores": [summary["quizScores"].get(module_id) for module_id in module_ids],
+                "badgeCount": len(summary["badges"]),
+            }
+            for learner_id, summary in page
+        ]
+        return {"total": total, "offset": offset, "limit": limit, "moduleIds": module_ids, "learners": rows}
+
+
+def rebuild_rollups(progress_dir: Path) -> int:
+    """One-off backfill for learners whose progress predates the rollups."""
+    learner_total = 0
+    for shard_dir in sorted(progress_dir.glob("shard-*")):
+        rollup = empty_rollup()
+        for learner_path in sorted(shard_dir.glob("*.json")):
+            if learner_path.name == ROLLUP_FILENAME:
+                continue
+            try:
+                with learner_path.open("r", encoding="utf-8") as learner_file:
+                    progress = json.load(learner_file)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if isinstance(progress, dict):
+                apply_summary_change(rollup, None, learner_summary(progress))
+                learner_total += 1
+        write_rollup(shard_dir / ROLLUP_FILENAME, rollup)
+
+    return learner_total
+
+
+def main(argv: list[str] | None = None) -> None:
+    try:
+        from .progress_store import _default_progress_dir
+    except ImportError:
+        from services.progress_store import _default_progress_dir
+
+    parser = argparse.ArgumentParser(description="Rebuild cohort rollups from every learner document.")
+    parser.add_argument("--progress-dir", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    progress_dir = args.progress_dir or _default_progress_dir()
+    print(f"Rebuilt rollups for {rebuild_rollups(progress_dir)} learners in {progress_dir}")
+
+
+if __name__ == "__main__":
+    main()
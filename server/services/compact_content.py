@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator, Mapping
+from threading import Lock
+from typing import Any
+
+# Keys and identifier-like values (ids, question types, step links) repeat
+# across records and are deduplicated through a private table so they share
+# one object; prose is unique and is left alone.
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z0-9_.:-]{1,64}")
+
+_STRINGS: dict[str, str] = {}
+_KEY_TABLES: dict[tuple[str, ...], dict[str, int]] = {}
+_KEY_TABLES_LOCK = Lock()
+
+
+class FrozenRecord(Mapping[str, Any]):
+    """Read-only JSON object holding only a tuple of values.
+
+    Records with the same keys in the same order share one key table, so a
+    quiz with forty questions stores the question keys once rather than in
+    forty dict hash tables.
+    """
+
+    __slots__ = ("_table", "_values")
+
+    def __init__(self, table: dict[str, int], values: tuple[Any, ...]) -> None:
+        self._table = table
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._table[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._table.get(key)
+        return default if index is None else self._values[index]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._table
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"FrozenRecord({dict(self.items())!r})"
+
+
+def _intern(value: str) -> str:
+    if not _IDENTIFIER_PATTERN.fullmatch(value):
+        return value
+    return _STRINGS.setdefault(value, value)
+
+
+def compact(value: Any) -> Any:
+    """Convert parsed JSON into FrozenRecords, tuples and interned strings."""
+    if isinstance(value, dict):
+        keys = tuple(_STRINGS.setdefault(key, key) for key in map(str, value))
+        table = _KEY_TABLES.get(keys)
+        if table is None:
+            with _KEY_TABLES_LOCK:
+                table = _KEY_TABLES.setdefault(keys, {key: index for index, key in enumerate(keys)})
+        return FrozenRecord(table, tuple(compact(item) for item in value.values()))
+    if isinstance(value, list):
+        return tuple(compact(item) for item in value)
+    if isinstance(value, str):
+        return _intern(value)
+    return value
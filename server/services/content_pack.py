@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator
+
+from filelock import FileLock
+
+try:
+    from .compact_content import compact
+    from .glossary_linker import GlossaryMatcher, annotate_lessons
+    from .search_index import SearchIndex
+except ImportError:
+    from services.compact_content import compact
+    from services.glossary_linker import GlossaryMatcher, annotate_lessons
+    from services.search_index import SearchIndex
+
+PACK_MAGIC = b"RMFPACK\x00"
+# Bumped whenever compiled entries change shape, including the glossary
+# annotations, so packs built by older code are rebuilt.
+PACK_FORMAT_VERSION = 3
+
+# magic, format version, content digest, index offset, index length
+_HEADER = struct.Struct("<8sI32sQQ")
+
+DEFAULT_CONTENT_DIR = Path(__file__).resolve().parent.parent / "data" / "course_content"
+DEFAULT_PACK_DIR = DEFAULT_CONTENT_DIR.parent
+
+_LESSONS_FILE_PATTERN = re.compile(r"module(\d+)_lessons\.json")
+_QUIZ_ANSWER_FIELDS = ("correctIndex", "correctAnswer", "correctIndices", "explanation")
+
+
+class ContentLoadError(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _encode(value: Any) -> bytes:
+    # Matches the encoding FastAPI's JSONResponse would have produced.
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _source_files(content_dir: Path) -> list[Path]:
+    return sorted(path for path in content_dir.glob("*.json") if path.is_file())
+
+
+def content_digest(content_dir: Path = DEFAULT_CONTENT_DIR) -> bytes:
+    digest = hashlib.sha256()
+    digest.update(PACK_MAGIC)
+    digest.update(PACK_FORMAT_VERSION.to_bytes(4, "little"))
+    for path in _source_files(content_dir):
+        data = path.read_bytes()
+        digest.update(path.name.encode("utf-8"))
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.digest()
+
+
+def pack_path_for(digest: bytes, pack_dir: Path = DEFAULT_PACK_DIR) -> Path:
+    return pack_dir / f"course_content-{digest.hex()[:16]}.pack"
+
+
+def sanitize_quiz(quiz: dict[str, Any]) -> dict[str, Any]:
+    sanitized_quiz: dict[str, Any] = dict(quiz)
+    sanitized_questions: list[dict[str, Any]] = []
+
+    for question in quiz.get("questions", []):
+        if not isinstance(question, dict):
+            continue
+
+        sanitized_question = dict(question)
+        for field in _QUIZ_ANSWER_FIELDS:
+            sanitized_question.pop(field, None)
+        sanitized_questions.append(sanitized_question)
+
+    sanitized_quiz["questions"] = sanitized_questions
+    return sanitized_quiz
+
+
+def _load_source(path: Path, label: str) -> Any:
+    if not path.exists():
+        raise ContentLoadError(status_code=404, detail=f"{label} content file not found: {path.name}")
+
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            content = json.load(handle)
+    except json.JSONDecodeError as error:
+        raise ContentLoadError(status_code=500, detail=f"Invalid JSON in {label} content file") from error
+    except OSError as error:
+        raise ContentLoadError(status_code=500, detail=f"Unable to read {label} content file") from error
+
+    if not isinstance(content, (dict, list)):
+        raise ContentLoadError(status_code=500, detail=f"Unexpected format in {label} content file")
+
+    return content
+
+
+def _iter_scenarios(scenarios_data: Any) -> Iterator[tuple[str, dict[str, Any]]]:
+    if isinstance(scenarios_data, list):
+        for scenario in scenarios_data:
+            if isinstance(scenario, dict) and isinstance(scenario.get("id"), str):
+                yield scenario["id"], scenario
+        return
+
+    if not isinstance(scenarios_data, dict):
+        return
+
+    scenarios_list = scenarios_data.get("scenarios")
+    if isinstance(scenarios_list, (dict, list)):
+        if isinstance(scenarios_list, dict):
+            for scenario_id, scenario in scenarios_list.items():
+                if isinstance(scenario, dict):
+                    yield str(scenario_id), scenario
+        else:
+            yield from _iter_scenarios(scenarios_list)
+        return
+
+    top_level_id = scenarios_data.get("id")
+    if isinstance(top_level_id, str):
+        yield top_level_id, scenarios_data
+        return
+
+    for scenario_id, scenario in scenarios_data.items():
+        if isinstance(scenario, dict):
+            yield str(scenario_id), scenario
+
+
+class _PackBuilder:
+    def __init__(self) -> None:
+        self.blobs: dict[str, bytes] = {}
+        self.errors: dict[str, tuple[int, str]] = {}
+
+    def add(self, key: str, value: Any) -> None:
+        self.blobs[key] = _encode(value)
+
+    def fail(self, group: str, error: ContentLoadError) -> None:
+        self.errors[group] = (error.status_code, error.detail)
+
+
+def _compile_modules(builder: _PackBuilder, content_dir: Path) -> None:
+    try:
+        loaded = _load_source(content_dir / "modules.json", "modules")
+        if not isinstance(loaded, dict):
+            raise ContentLoadError(status_code=500, detail="Modules content is not an object")
+        modules = loaded.get("modules")
+        if not isinstance(modules, list):
+            raise ContentLoadError(status_code=500, detail="Modules content must include a modules array")
+    except ContentLoadError as error:
+        builder.fail("modules", error)
+        return
+
+    builder.add("modules", loaded)
+    for module in modules:
+        if isinstance(module, dict) and isinstance(module.get("id"), str):
+            builder.add(f"module/{module['id']}", module)
+
+
+def _compile_lessons(builder: _PackBuilder, content_dir: Path, matcher: GlossaryMatcher) -> None:
+    for path in _source_files(content_dir):
+        match = _LESSONS_FILE_PATTERN.fullmatch(path.name)
+        if match is None:
+            continue
+
+        module_number = int(match.group(1))
+        group = f"lessons/{module_number}"
+        try:
+            lessons_data = _load_source(path, f"module {module_number} lessons")
+            if not isinstance(lessons_data, dict):
+                raise ContentLoadError(status_code=500, detail=f"Invalid lessons format for module {module_number}")
+            if not isinstance(lessons_data.get("lessons"), list):
+                raise ContentLoadError(
+                    status_code=500,
+                    detail=f"Module {module_number} lessons content must include a lessons array",
+                )
+        except ContentLoadError as error:
+            builder.fail(group, error)
+            continue
+
+        builder.add(group, annotate_lessons(lessons_data, matcher))
+
+
+def _compile_quizzes(builder: _PackBuilder, content_dir: Path) -> None:
+    try:
+        quizzes_data = _load_source(content_dir / "quizzes.json", "quizzes")
+        if not isinstance(quizzes_data, dict):
+            raise ContentLoadError(status_code=500, detail="Invalid content format in file: quizzes.json")
+    except ContentLoadError as error:
+        builder.fail("quizzes", error)
+        return
+
+    quizzes = quizzes_data.get("quizzes")
+    if not isinstance(quizzes, dict):
+        return
+
+    for quiz_id, quiz in quizzes.items():
+        if not isinstance(quiz, dict):
+            continue
+        builder.add(f"quiz/{quiz_id}", quiz)
+        builder.add(f"quiz-public/{quiz_id}", sanitize_quiz(quiz))
+
+
+def _compile_scenarios(builder: _PackBuilder, content_dir: Path) -> None:
+    try:
+        scenarios_data = _load_source(content_dir / "scenarios.json", "scenarios")
+    except ContentLoadError as error:
+        builder.fail("scenarios", error)
+        return
+
+    for scenario_id, scenario in _iter_scenarios(scenarios_data):
+        builder.add(f"scenario/{scenario_id}", scenario)
+
+
+def _compile_document(
+    builder: _PackBuilder,
+    content_dir: Path,
+    name: str,
+    required_list: str | None,
+) -> dict[str, Any] | None:
+    try:
+        loaded = _load_source(content_dir / f"{name}.json", name)
+        if not isinstance(loaded, dict):
+            raise ContentLoadError(status_code=500, detail=f"{name.capitalize()} content is not an object")
+        if required_list is not None and not isinstance(loaded.get(required_list), list):
+            raise ContentLoadError(
+                status_code=500,
+                detail=f"{name.capitalize()} content must include a {required_list} array",
+            )
+    except ContentLoadError as error:
+        builder.fail(name, error)
+        return None
+
+    builder.add(name, loaded)
+    return loaded
+
+
+def build_content_pack(
+    content_dir: Path = DEFAULT_CONTENT_DIR,
+    pack_dir: Path = DEFAULT_PACK_DIR,
+) -> Path:
+    digest = content_digest(content_dir)
+    output_path = pack_path_for(digest, pack_dir)
+
+    builder = _PackBuilder()
+    glossary = _compile_document(builder, content_dir, "glossary", "terms")
+    _compile_document(builder, content_dir, "capstone", None)
+    _compile_modules(builder, content_dir)
+    # Lessons are annotated with glossary spans once per content version, so
+    # serving them stays a plain slice of the pack.
+    _compile_lessons(builder, content_dir, GlossaryMatcher(glossary["terms"] if glossary else []))
+    _compile_quizzes(builder, content_dir)
+    _compile_scenarios(builder, content_dir)
+
+    entries: dict[str, list[int]] = {}
+    offset = _HEADER.size
+    for key in sorted(builder.blobs):
+        length = len(builder.blobs[key])
+        entries[key] = [offset, length]
+        offset += length
+
+    index = _encode(
+        {
+            "version": digest.hex(),
+            "entries": entries,
+            "errors": {group: list(error) for group, error in builder.errors.items()},
+        }
+    )
+
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    with temp_path.open("wb") as pack_file:
+        pack_file.write(_HEADER.pack(PACK_MAGIC, PACK_FORMAT_VERSION, digest, offset, len(index)))
+        for key in sorted(builder.blobs):
+            pack_file.write(builder.blobs[key])
+        pack_file.write(index)
+
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+class ContentPack:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as pack_file:
+            self._map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, digest, index_offset, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != PACK_MAGIC or format_version != PACK_FORMAT_VERSION:
+            self._map.close()
+            raise ContentLoadError(status_code=500, detail=f"Unsupported content pack: {path.name}")
+
+        index = json.loads(self._map[index_offset : index_offset + index_length])
+        self.digest = digest
+        self.version: str = index["version"]
+        self._entries: dict[str, list[int]] = index["entries"]
+        self._errors: dict[str, list[Any]] = index["errors"]
+        self._parsed: dict[str, Any] = {}
+        self.search_index: SearchIndex | None = None
+
+    def check(self, group: str) -> None:
+        error = self._errors.get(group)
+        if error is not None:
+            raise ContentLoadError(status_code=int(error[0]), detail=str(error[1]))
+
+    def has(self, key: str) -> bool:
+        return key in self._entries
+
+    def keys(self, prefix: str = "") -> list[str]:
+        return [key for key in self._entries if key.startswith(prefix)]
+
+    def get_bytes(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._map[offset : offset + length]
+
+    def get_json(self, key: str) -> Any | None:
+        # Parsed objects are only materialized for the routes that need to
+        # inspect content (grading, scenario choices); everything else is
+        # served straight from the mapped bytes. They are cached for the life
+        # of the process in compact read-only form (FrozenRecord and tuples),
+        # so callers must not expect dicts or lists.
+        if key in self._parsed:
+            return self._parsed[key]
+
+        raw = self.get_bytes(key)
+        if raw is None:
+            return None
+
+        parsed = compact(json.loads(raw))
+        self._parsed[key] = parsed
+        return parsed
+
+
+_PACK: ContentPack | None = None
+_PACK_LOCK = Lock()
+
+
+def _remove_stale_packs(pack_dir: Path, current: Path) -> None:
+    for path in pack_dir.glob("course_content-*.pack"):
+        if path == current:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            # Another worker may still have the old pack mapped (Windows).
+            pass
+
+
+def load_content_pack(
+    content_dir: Path = DEFAULT_CONTENT_DIR,
+    pack_dir: Path = DEFAULT_PACK_DIR,
+) -> ContentPack:
+    global _PACK
+
+    if _PACK is not None:
+        return _PACK
+
+    with _PACK_LOCK:
+        if _PACK is not None:
+            return _PACK
+
+        if not content_dir.is_dir():
+            raise ContentLoadError(status_code=404, detail="Course content directory not found")
+
+        path = pack_path_for(content_digest(content_dir), pack_dir)
+        if not path.exists():
+            pack_dir.mkdir(parents=True, exist_ok=True)
+            with FileLock(str(pack_dir / "course_content.pack.lock")):
+                if not path.exists():
+                    try:
+                        build_content_pack(content_dir, pack_dir)
+                    except OSError as error:
+                        raise ContentLoadError(status_code=500, detail="Unable to build course content pack") from error
+                    _remove_stale_packs(pack_dir, path)
+
+        pack = ContentPack(path)
+        # Built with the pack, so the first search does not pay for it.
+        pack.search_index = SearchIndex.from_content_pack(pack)
+        _PACK = pack
+        return _PACK
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile course content JSON into a memory-mappable content pack.")
+    parser.add_argument("--content-dir", type=Path, default=DEFAULT_CONTENT_DIR)
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_PACK_DIR)
+    args = parser.parse_args(argv)
+
+    output_path = build_content_pack(args.content_dir, args.output_dir)
+    _remove_stale_packs(args.output_dir, output_path)
+    pack = ContentPack(output_path)
+    print(f"Wrote {output_path} ({output_path.stat().st_size} bytes, {len(pack.keys())} entries, version {pack.version[:16]})")
+
+
+if __name__ == "__main__":
+    main()
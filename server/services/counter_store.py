@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+from filelock import FileLock
+
+_KEY_PATTERN = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def default_analytics_dir() -> Path:
+    configured = os.environ.get("RMF_ANALYTICS_DIR")
+    if configured:
+        return Path(configured)
+    return Path(__file__).resolve().parent.parent / "data" / "analytics"
+
+
+class CounterStore:
+    """Merged on-disk totals for counter arrays kept in memory by each worker.
+
+    Workers accumulate deltas locally and periodically ``merge`` them into one
+    ``.npz`` file per key under a file lock, so any number of processes can
+    contribute to the same totals without coordinating on every update.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{_KEY_PATTERN.sub('_', key)}.npz"
+
+    def _read(self, path: Path) -> tuple[str, dict[str, np.ndarray]] | None:
+        if not path.exists():
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+        except (OSError, ValueError):
+            return None
+
+        layout = arrays.pop("__layout__", None)
+        if layout is None:
+            return None
+        return str(layout), arrays
+
+    def load(self, key: str, layout: str) -> dict[str, np.ndarray] | None:
+        stored = self._read(self._path(key))
+        if stored is None or stored[0] != layout:
+            return None
+        return stored[1]
+
+    def merge(self, key: str, layout: str, deltas: dict[str, np.ndarray]) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+
+        with FileLock(str(path.with_name(f"{path.name}.lock"))):
+            stored = self._read(path)
+            totals = {name: delta.copy() for name, delta in deltas.items()}
+            # A layout change means the underlying content changed shape;
+            # previous totals no longer line up and are discarded.
+            if stored is not None and stored[0] == layout:
+                for name, existing in stored[1].items():
+                    if name in totals and existing.shape == totals[name].shape:
+                        totals[name] += existing
+
+            temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with temp_path.open("wb") as handle:
+                np.savez(handle, __layout__=np.array(layout), **totals)
+            os.replace(temp_path, path)
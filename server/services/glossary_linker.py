@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Any
+
+_QUALIFIER_PATTERN = re.compile(r"\s*\([^)]*\)\s*$")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# Abstract nouns (qualities, fields of practice) that are not counted, so
+# no plural is generated: "reliability", "safety", "accuracy", "tolerance".
+_UNCOUNTABLE_SUFFIXES = ("ness", "ity", "ety", "acy", "ancy", "ency", "ance", "ence", "ism", "ship", "ing")
+_VOWELS = frozenset("aeiou")
+
+
+def _normalize_alias(value: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", value.strip()).lower()
+
+
+def _fold_case(text: str) -> str:
+    # Lower-case without changing string length so match offsets stay valid.
+    return "".join(lowered if len(lowered := char.lower()) == 1 else char for char in text)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum()
+
+
+def _plural(alias: str) -> str | None:
+    """English plural of a count-noun alias, inflecting only its last word."""
+    head, _, word = alias.rpartition(" ")
+    if len(word) < 2 or not word.isalpha() or word.endswith(_UNCOUNTABLE_SUFFIXES):
+        return None
+
+    if word.endswith("is"):
+        plural = f"{word[:-2]}es"  # analysis -> analyses
+    elif word.endswith(("ss", "us", "as", "x", "z", "ch", "sh")):
+        plural = f"{word}es"  # bias -> biases
+    elif word.endswith("s"):
+        return None  # already plural, e.g. "AI actors"
+    elif word.endswith("y") and word[-2] not in _VOWELS:
+        plural = f"{word[:-1]}ies"  # policy -> policies
+    else:
+        plural = f"{word}s"
+    return f"{head} {plural}" if head else plural
+
+
+def term_aliases(entry: dict[str, Any]) -> list[str]:
+    term = entry.get("term")
+    if not isinstance(term, str) or not term.strip():
+        return []
+
+    candidates = [term]
+    unqualified = _QUALIFIER_PATTERN.sub("", term)
+    if unqualified and unqualified != term:
+        candidates.append(unqualified)
+
+    extra = entry.get("aliases")
+    if isinstance(extra, list):
+        candidates.extend(alias for alias in extra if isinstance(alias, str))
+
+    aliases: list[str] = []
+    for candidate in candidates:
+        alias = _normalize_alias(candidate)
+        if not alias:
+            continue
+        aliases.append(alias)
+        # Acronyms such as TEVV are left alone.
+        plural = None if candidate.isupper() else _plural(alias)
+        if plural is not None:
+            aliases.append(plural)
+
+    return list(dict.fromkeys(aliases))
+
+
+class GlossaryMatcher:
+    """Aho-Corasick automaton over every glossary term and alias."""
+
+    def __init__(self, terms: list[dict[str, Any]]) -> None:
+        self.terms: list[str] = []
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[tuple[int, int]]] = [[]]
+
+        for entry in terms:
+            aliases = term_aliases(entry) if isinstance(entry, dict) else []
+            if not aliases:
+                continue
+
+            term_index = len(self.terms)
+            self.terms.append(entry["term"])
+            for alias in aliases:
+                self._insert(alias, term_index)
+
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, term_index: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append((len(pattern), term_index))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def find(self, text: str) -> list[tuple[int, int, int]]:
+        folded = _fold_case(text)
+        goto = self._goto
+        fail = self._fail
+        candidates: list[tuple[int, int, int]] = []
+
+        state = 0
+        for position, char in enumerate(folded):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for length, term_index in self._output[state]:
+                start = position - length + 1
+                end = position + 1
+                if start > 0 and _is_word_char(folded[start - 1]):
+                    continue
+                if end < len(folded) and _is_word_char(folded[end]):
+                    continue
+                candidates.append((start, end, term_index))
+
+        # Leftmost-longest, non-overlapping.
+        candidates.sort(key=lambda match: (match[0], match[0] - match[1]))
+        spans: list[tuple[int, int, int]] = []
+        covered_until = 0
+        for start, end, term_index in candidates:
+            if start >= covered_until:
+                spans.append((start, end, term_index))
+                covered_until = end
+
+        return spans
+
+
+def _utf16_offsets(text: str) -> list[int]:
+    # Browsers index strings in UTF-16 code units; map each code point index.
+    offsets = [0] * (len(text) + 1)
+    units = 0
+    for index, char in enumerate(text):
+        offsets[index] = units
+        units += 2 if ord(char) > 0xFFFF else 1
+    offsets[len(text)] = units
+    return offsets
+
+
+def annotate_lessons(lessons_data: dict[str, Any], matcher: GlossaryMatcher) -> dict[str, Any]:
+    """Return a copy of a lesson set with glossary spans attached to each text section.
+
+    Each annotated section gains ``glossaryLinks`` with parallel ``starts``,
+    ``ends`` and ``terms`` arrays. Offsets are UTF-16 code units into the
+    section's ``content`` and ``terms`` index into the lesson set's
+    ``glossaryTerms`` table.
+    """
+    local_terms: dict[int, int] = {}
+    annotated_lessons: list[Any] = []
+
+    for lesson in lessons_data.get("lessons", []):
+        if not isinstance(lesson, dict) or not isinstance(lesson.get("sections"), list):
+            annotated_lessons.append(lesson)
+            continue
+
+        sections: list[Any] = []
+        for section in lesson["sections"]:
+            content = section.get("content") if isinstance(section, dict) else None
+            spans = matcher.find(content) if isinstance(content, str) else []
+            if not spans:
+                sections.append(section)
+                continue
+
+            offsets = _utf16_offsets(content)
+            sections.append(
+                {
+                    **section,
+                    "glossaryLinks": {
+                        "starts": [offsets[start] for start, _, _ in spans],
+                        "ends": [offsets[end] for _, end, _ in spans],
+                        "terms": [local_terms.setdefault(term, len(local_terms)) for _, _, term in spans],
+                    },
+                }
+            )
+
+        annotated_lessons.append({**lesson, "sections": sections})
+
+    glossary_terms = [""] * len(local_terms)
+    for term_index, local_index in local_terms.items():
+        glossary_terms[local_index] = matcher.terms[term_index]
+
+    return {**lessons_data, "lessons": annotated_lessons, "glossaryTerms": glossary_terms}
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Mapping, Sequence
 from typing import Any
 
 
@@ -9,7 +10,7 @@ class QuizGrader:
 
     def grade_quiz(
         self,
-        questions: list[dict[str, Any]],
+        questions: Sequence[Mapping[str, Any]],
         answers: dict[str, Any],
         passing_score: int | None = None,
     ) -> dict[str, Any]:
@@ -19,7 +20,7 @@ class QuizGrader:
         results: list[dict[str, Any]] = []
 
         for question in questions:
-            if not isinstance(question, dict):
+            if not isinstance(question, Mapping):
                 continue
 
             question_id = question.get("id")
@@ -82,7 +83,7 @@ class QuizGrader:
 
     @staticmethod
     def _normalize_int_list(value: Any) -> list[int] | None:
-        if not isinstance(value, list):
+        if not isinstance(value, (list, tuple)):
             return None
 
         normalized: list[int] = []
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from threading import Event, Lock
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_KEYS_PER_LEARNER = 16
+DEFAULT_MAX_LEARNERS = 2048
+DEFAULT_WAIT_SECONDS = 30.0
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires_at", "done", "failed", "result")
+
+    def __init__(self, fingerprint: bytes, expires_at: float) -> None:
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = Event()
+        self.failed = False
+        self.result: Any = None
+
+
+class IdempotencyCache:
+    """Recent submission results per learner, keyed by the client's Idempotency-Key.
+
+    The first request with a key runs; a retry with the same key and body
+    gets the stored result without running again, and one that arrives while
+    the first is still running waits for it. A key reused for a different
+    body is rejected. Failed requests are not stored, so their retries run.
+
+    Each learner keeps at most ``keys_per_learner`` keys and the least
+    recently active learners are dropped beyond ``max_learners``; entries
+    expire ``ttl_seconds`` after the first request.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float | None = None,
+        keys_per_learner: int | None = None,
+        max_learners: int | None = None,
+        wait_seconds: float = DEFAULT_WAIT_SECONDS,
+    ) -> None:
+        self._ttl = ttl_seconds or float(os.environ.get("RMF_IDEMPOTENCY_TTL", DEFAULT_TTL_SECONDS))
+        self._keys_per_learner = keys_per_learner or int(
+            os.environ.get("RMF_IDEMPOTENCY_KEYS_PER_LEARNER", DEFAULT_KEYS_PER_LEARNER)
+        )
+        self._max_learners = max_learners or int(os.environ.get("RMF_IDEMPOTENCY_LEARNERS", DEFAULT_MAX_LEARNERS))
+        self._wait_seconds = wait_seconds
+        self._learners: OrderedDict[str, OrderedDict[str, _Entry]] = OrderedDict()
+        self._lock = Lock()
+        self.replays = 0
+
+    def _claim(self, learner_id: str, key: str, fingerprint: bytes) -> tuple[_Entry, bool]:
+        """The live entry for ``key``, or a new one owned by the caller."""
+        now = time.monotonic()
+        with self._lock:
+            entries = self._learners.get(learner_id)
+            if entries is None:
+                entries = self._learners[learner_id] = OrderedDict()
+            self._learners.move_to_end(learner_id)
+
+            entry = entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                return entry, False
+
+            entry = entries[key] = _Entry(fingerprint, now + self._ttl)
+            entries.move_to_end(key)
+            while len(entries) > self._keys_per_learner:
+                entries.popitem(last=False)
+            while len(self._learners) > self._max_learners:
+                self._learners.popitem(last=False)
+            return entry, True
+
+    def _forget(self, learner_id: str, key: str, entry: _Entry) -> None:
+        with self._lock:
+            entries = self._learners.get(learner_id)
+            if entries is not None and entries.get(key) is entry:
+                del entries[key]
+
+    def run(self, learner_id: str, key: str | None, request: str, compute: Callable[[], T]) -> tuple[T, bool]:
+        """Result of ``compute`` for this key, and whether it was replayed from cache.
+
+        ``request`` identifies what was asked (route and body); only a
+        digest of it is kept.
+        """
+        if key is None:
+            return compute(), False
+
+        fingerprint = hashlib.blake2b(request.encode("utf-8"), digest_size=16).digest()
+        deadline = time.monotonic() + self._wait_seconds
+        while True:
+            entry, owner = self._claim(learner_id, key, fingerprint)
+            if owner:
+                break
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyError(422, "Idempotency-Key was already used for a different request")
+            if not entry.done.wait(max(deadline - time.monotonic(), 0.0)):
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still being processed")
+            if not entry.failed:
+                with self._lock:
+                    self.replays += 1
+                return entry.result, True
+            # The original attempt failed and was forgotten; run it here.
+
+        try:
+            entry.result = compute()
+        except BaseException:
+            entry.failed = True
+            self._forget(learner_id, key, entry)
+            raise
+        finally:
+            entry.done.set()
+        return entry.result, False
+
+
+submissions = IdempotencyCache()
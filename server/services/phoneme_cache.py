@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+DEFAULT_MAX_ENTRIES = 4096
+
+
+def _default_cache_dir() -> Path:
+    configured = os.environ.get("RMF_PHONEME_CACHE_DIR")
+    if configured:
+        return Path(configured)
+    return Path(__file__).resolve().parent.parent / "data" / "phonemes"
+
+
+class PhonemeCache:
+    """Phonemized text segments, in a bounded LRU backed by one file per segment.
+
+    Entries are keyed by G2P version, language and segment text, so an
+    upgraded phonemizer starts a fresh namespace instead of reusing stale
+    output. Disk files are written atomically and checked against the full
+    key on read, so a hash collision or torn file is treated as a miss.
+    """
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        max_entries: int | None = None,
+        namespace: str = "",
+    ) -> None:
+        self._directory = directory if directory is not None else _default_cache_dir()
+        self._max_entries = max_entries or int(os.environ.get("RMF_PHONEME_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self._namespace = namespace
+        self._entries: OrderedDict[tuple[str, str], tuple[str, ...]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, lang_code: str, text: str) -> Path:
+        digest = hashlib.blake2b(f"{self._namespace}\0{lang_code}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+        return self._directory / digest[:2] / f"{digest}.json"
+
+    def _remember(self, key: tuple[str, str], phonemes: tuple[str, ...]) -> None:
+        with self._lock:
+            self._entries[key] = phonemes
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, lang_code: str, text: str) -> tuple[str, ...] | None:
+        key = (lang_code, text)
+        with self._lock:
+            phonemes = self._entries.get(key)
+            if phonemes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return phonemes
+
+        try:
+            with self._path(lang_code, text).open("r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, json.JSONDecodeError):
+            data = None
+
+        if (
+            isinstance(data, dict)
+            and data.get("namespace") == self._namespace
+            and data.get("lang") == lang_code
+            and data.get("text") == text
+            and isinstance(data.get("phonemes"), list)
+            and all(isinstance(item, str) for item in data["phonemes"])
+        ):
+            phonemes = tuple(data["phonemes"])
+            self._remember(key, phonemes)
+            with self._lock:
+                self.hits += 1
+            return phonemes
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, lang_code: str, text: str, phonemes: tuple[str, ...]) -> None:
+        self._remember((lang_code, text), phonemes)
+
+        path = self._path(lang_code, text)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with temp_path.open("w", encoding="utf-8") as cache_file:
+                json.dump(
+                    {"namespace": self._namespace, "lang": lang_code, "text": text, "phonemes": list(phonemes)},
+                    cache_file,
+                )
+            os.replace(temp_path, path)
+        except OSError:
+            # The disk tier is an optimization; the in-memory entry still serves.
+            pass
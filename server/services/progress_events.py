@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any
+
+DEFAULT_QUEUE_SIZE = 64
+
+
+class ProgressSubscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue_size: int) -> None:
+        self._loop = loop
+        # A full deque discards its oldest entry on append, which is the
+        # backpressure policy we want for slow or stalled subscribers.
+        self._queue: deque[dict[str, Any]] = deque(maxlen=max_queue_size)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, event: dict[str, Any]) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The subscriber's event loop is already closed; the stream is gone.
+            pass
+
+    async def next_events(self, timeout: float) -> list[dict[str, Any]]:
+        if not self._queue:
+            self._ready.clear()
+            if not self._queue:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return []
+
+        events: list[dict[str, Any]] = []
+        while self._queue:
+            events.append(self._queue.popleft())
+        return events
+
+
+class ProgressEventBroker:
+    def __init__(self, max_queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self._max_queue_size = max_queue_size
+        self._subscribers: dict[str, set[ProgressSubscription]] = {}
+        self._lock = Lock()
+        self._sequence = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def subscribe(self, learner_id: str) -> ProgressSubscription:
+        subscription = ProgressSubscription(asyncio.get_running_loop(), self._max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(learner_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, learner_id: str, subscription: ProgressSubscription) -> None:
+        with self._lock:
+            subscriptions = self._subscribers.get(learner_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[learner_id]
+
+    def publish(self, event_type: str, learner_id: str, **data: Any) -> None:
+        if learner_id not in self._subscribers:
+            return
+
+        with self._lock:
+            event = {
+                "id": next(self._sequence),
+                "type": event_type,
+                "at": datetime.now(timezone.utc).isoformat(),
+                **data,
+            }
+            subscribers = tuple(self._subscribers.get(learner_id, ()))
+
+        for subscription in subscribers:
+            subscription.push(event)
+
+
+# Shared by every ProgressStore instance in the process so that a mutation made
+# through any router reaches every open event stream for that learner.
+progress_events = ProgressEventBroker()
@@ -1,22 +1,397 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from threading import Lock
+from typing import Any, TypeVar
 
 from filelock import FileLock
 
+try:
+    from .badge_rules import COUNTERS_KEY, BadgeEngine, badge_engine
+    from .cohort_aggregates import ROLLUP_FILENAME, apply_summary_change, learner_summary, read_rollup, write_rollup
+    from .progress_events import ProgressEventBroker, progress_events
+except ImportError:
+    from services.badge_rules import COUNTERS_KEY, BadgeEngine, badge_engine
+    from services.cohort_aggregates import ROLLUP_FILENAME, apply_summary_change, learner_summary, read_rollup, write_rollup
+    from services.progress_events import ProgressEventBroker, progress_events
+
+
+DEFAULT_LEARNER_ID = "local"
+DEFAULT_SHARD_COUNT = 64
+
+_LEARNER_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+_FILE_LOCK_POLL_SECONDS = 0.005
+
+# Threads in one process serialize on these before touching a shard's OS file
+# lock, so the file lock only arbitrates between processes. Shared by every
+# ProgressStore instance (the routers each create their own).
+_SHARD_THREAD_LOCKS: dict[tuple[str, int], Lock] = {}
+_SHARD_THREAD_LOCKS_GUARD = Lock()
+
+
+class InvalidLearnerIdError(ValueError):
+    """Raised when a learner id cannot be used as a storage key."""
+
+
+def is_valid_learner_id(learner_id: str) -> bool:
+    return isinstance(learner_id, str) and _LEARNER_ID_PATTERN.fullmatch(learner_id) is not None
+
+
+def learner_shard(learner_id: str, shard_count: int) -> int:
+    digest = hashlib.blake2b(learner_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shard_count
+
+
+# Server-side state a stored document may carry that clients never get back:
+# badge rule counters, which are written with the change that moves them, and
+# ``review``, only found in documents written before review schedules moved
+# to their own store.
+CLIENT_HIDDEN_FIELDS = frozenset({COUNTERS_KEY, "review"})
+
+
+def client_view(progress: dict[str, Any]) -> dict[str, Any]:
+    if CLIENT_HIDDEN_FIELDS.isdisjoint(progress):
+        return progress
+    return {key: value for key, value in progress.items() if key not in CLIENT_HIDDEN_FIELDS}
+
+
+T = TypeVar("T")
+# Backends hand a learner's stored document (None when absent) to ``mutate``,
+# which returns the document to write (None to leave it alone) and a result.
+Mutation = Callable[[dict[str, Any] | None], tuple[dict[str, Any] | None, T]]
+
+
+def _default_progress_dir() -> Path:
+    configured = os.environ.get("RMF_PROGRESS_DIR")
+    if configured:
+        return Path(configured)
+    return Path(__file__).resolve().parent.parent / "data" / "progress"
+
+
+class FileProgressBackend:
+    """Learner documents as JSON files in hash-partitioned shard directories.
+
+    Each shard has a thread lock and an OS file lock, so writers to different
+    shards never wait on each other, and a per-shard file of cohort counters
+    updated under the same lock. Writes land via atomic rename, so reads take
+    no lock.
+    """
+
+    def __init__(
+        self,
+        progress_dir: Path | None = None,
+        shard_count: int | None = None,
+        legacy_progress_path: Path | None = None,
+        cohort: bool = True,
+    ) -> None:
+        self._progress_dir = progress_dir if progress_dir is not None else _default_progress_dir()
+        self._shard_count = shard_count or int(os.environ.get("RMF_PROGRESS_SHARDS", DEFAULT_SHARD_COUNT))
+        self._legacy_progress_path = legacy_progress_path
+        self._cohort = cohort
+        self._file_locks: dict[int, FileLock] = {}
+        self._rollup_cache: dict[Path, tuple[int, dict[str, Any]]] = {}
+        self._rollup_cache_lock = Lock()
+
+    @property
+    def progress_dir(self) -> Path:
+        return self._progress_dir
+
+    @property
+    def shard_count(self) -> int:
+        return self._shard_count
+
+    def companion(self, name: str) -> FileProgressBackend:
+        """Backend for another per-learner document, kept in its own directory.
+
+        Writes take the same shard locks, but no cohort counters are kept.
+        """
+        return FileProgressBackend(self._progress_dir / name, self._shard_count, cohort=False)
+
+    def _shard_dir(self, shard: int) -> Path:
+        return self._progress_dir / f"shard-{shard:03d}"
+
+    def _learner_path(self, learner_id: str) -> Path:
+        if not is_valid_learner_id(learner_id):
+            raise InvalidLearnerIdError(f"Invalid learner id: {learner_id!r}")
+        return self._shard_dir(learner_shard(learner_id, self._shard_count)) / f"{learner_id}.json"
+
+    def _thread_lock(self, shard: int) -> Lock:
+        key = (str(self._progress_dir), shard)
+        lock = _SHARD_THREAD_LOCKS.get(key)
+        if lock is None:
+            with _SHARD_THREAD_LOCKS_GUARD:
+                lock = _SHARD_THREAD_LOCKS.setdefault(key, Lock())
+        return lock
+
+    def _file_lock(self, shard: int) -> FileLock:
+        lock = self._file_locks.get(shard)
+        if lock is None:
+            shard_dir = self._shard_dir(shard)
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            lock = self._file_locks.setdefault(shard, FileLock(str(shard_dir / ".lock")))
+        return lock
+
+    @contextmanager
+    def _locked_shard(self, shard: int) -> Iterator[None]:
+        with self._thread_lock(shard):
+            with self._file_lock(shard).acquire(poll_interval=_FILE_LOCK_POLL_SECONDS):
+                yield
+
+    @contextmanager
+    def _locked(self, learner_id: str) -> Iterator[None]:
+        if not is_valid_learner_id(learner_id):
+            raise InvalidLearnerIdError(f"Invalid learner id: {learner_id!r}")
+
+        with self._locked_shard(learner_shard(learner_id, self._shard_count)):
+            yield
+
+    def _load_progress_file(self, progress_path: Path) -> dict[str, Any] | None:
+        try:
+            with progress_path.open("r", encoding="utf-8") as progress_file:
+                data = json.load(progress_file)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+        return data if isinstance(data, dict) else None
+
+    def _has_legacy_progress(self, learner_id: str) -> bool:
+        return (
+            learner_id == DEFAULT_LEARNER_ID
+            and self._legacy_progress_path is not None
+            and self._legacy_progress_path.exists()
+        )
+
+    def read(self, learner_id: str) -> dict[str, Any] | None:
+        progress_path = self._learner_path(learner_id)
+        if not progress_path.exists():
+            if not self._has_legacy_progress(learner_id):
+                return None
+            # Progress saved before storage was sharded belongs to the
+            # default local learner.
+            progress_path = self._legacy_progress_path
+
+        return self._load_progress_file(progress_path)
+
+    def exists(self, learner_id: str) -> bool:
+        return self._learner_path(learner_id).exists()
+
+    def stamp(self, learner_id: str) -> tuple[int, int] | None:
+        # Every write replaces the file, so the inode changes along with mtime.
+        try:
+            stat = self._learner_path(learner_id).stat()
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _write_progress_file(self, learner_id: str, progress: dict[str, Any]) -> Path:
+        progress_path = self._learner_path(learner_id)
+        progress_path.parent.mkdir(parents=True, exist_ok=True)
+
+        temp_path = progress_path.with_name(f".{progress_path.name}.tmp")
+        with temp_path.open("w", encoding="utf-8") as progress_file:
+            json.dump(progress, progress_file)
+
+        os.replace(temp_path, progress_path)
+        return progress_path
+
+    def _counted_summary(self, learner_id: str, stored: dict[str, Any] | None) -> dict[str, Any] | None:
+        # What the shard rollup holds for this learner. Taken before ``mutate``
+        # runs, as it may change ``stored`` in place. Legacy progress is only
+        # counted once it is written to a shard.
+        if not self._cohort or stored is None or not self.exists(learner_id):
+            return None
+        return learner_summary(stored)
+
+    def _update_rollup(
+        self, shard_dir: Path, changes: Iterable[tuple[dict[str, Any] | None, dict[str, Any]]]
+    ) -> None:
+        # Called with the shard lock held, so the read-modify-write of the
+        # shard's cohort counters cannot interleave with another writer.
+        if not self._cohort:
+            return
+        rollup_path = shard_dir / ROLLUP_FILENAME
+        rollup = read_rollup(rollup_path)
+        changed = False
+        for previous, progress in changes:
+            changed = apply_summary_change(rollup, previous, learner_summary(progress)) or changed
+        if changed:
+            write_rollup(rollup_path, rollup)
+
+    def update(self, learner_id: str, mutate: Mutation[T]) -> tuple[T, Any]:
+        """Run one read-modify-write under the learner's shard lock.
+
+        Returns the mutation's result and the document's stamp afterwards.
+        """
+        with self._locked(learner_id):
+            stored = self.read(learner_id)
+            previous = self._counted_summary(learner_id, stored)
+            progress, result = mutate(stored)
+            if progress is not None:
+                progress_path = self._write_progress_file(learner_id, progress)
+                self._update_rollup(progress_path.parent, [(previous, progress)])
+            return result, self.stamp(learner_id)
+
+    def update_many(
+        self,
+        learner_ids: Iterable[str],
+        mutate: Callable[[str, dict[str, Any] | None], dict[str, Any] | None],
+    ) -> list[tuple[str, dict[str, Any]]]:
+        """Apply ``mutate`` to a batch of learners, one shard lock at a time.
+
+        Each shard's learners are written and its cohort rollup updated under
+        a single acquisition of that shard's lock. Returns what was written.
+        """
+        by_shard: dict[int, list[str]] = {}
+        for learner_id in learner_ids:
+            if not is_valid_learner_id(learner_id):
+                raise InvalidLearnerIdError(f"Invalid learner id: {learner_id!r}")
+            by_shard.setdefault(learner_shard(learner_id, self._shard_count), []).append(learner_id)
+
+        written: list[tuple[str, dict[str, Any]]] = []
+        for shard, shard_learners in sorted(by_shard.items()):
+            shard_written: list[tuple[str, dict[str, Any]]] = []
+            changes: list[tuple[dict[str, Any] | None, dict[str, Any]]] = []
+            with self._locked_shard(shard):
+                for learner_id in shard_learners:
+                    stored = self.read(learner_id)
+                    previous = self._counted_summary(learner_id, stored)
+                    progress = mutate(learner_id, stored)
+                    if progress is not None:
+                        self._write_progress_file(learner_id, progress)
+                        shard_written.append((learner_id, progress))
+                        changes.append((previous, progress))
+                if changes:
+                    self._update_rollup(self._shard_dir(shard), changes)
+            written.extend(shard_written)
+        return written
+
+    def iter_progress(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        if self._has_legacy_progress(DEFAULT_LEARNER_ID) and not self.exists(DEFAULT_LEARNER_ID):
+            progress = self.read(DEFAULT_LEARNER_ID)
+            if progress is not None:
+                yield DEFAULT_LEARNER_ID, progress
+
+        for shard in range(self._shard_count):
+            shard_dir = self._shard_dir(shard)
+            for learner_id in self._shard_learner_ids(shard_dir):
+                progress = self._load_progress_file(shard_dir / f"{learner_id}.json")
+                if progress is not None:
+                    yield learner_id, progress
+
+    def _shard_learner_ids(self, shard_dir: Path) -> list[str]:
+        try:
+            names = sorted(entry.name for entry in os.scandir(shard_dir) if entry.is_file())
+        except FileNotFoundError:
+            return []
+
+        learner_ids = []
+        for name in names:
+            learner_id, extension = os.path.splitext(name)
+            if extension == ".json" and name != ROLLUP_FILENAME and is_valid_learner_id(learner_id):
+                learner_ids.append(learner_id)
+        return learner_ids
+
+    def rollups(self) -> list[dict[str, Any]]:
+        """Each shard's cohort counters, re-read only when the file changed."""
+        rollups: list[dict[str, Any]] = []
+        for path in sorted(self._progress_dir.glob(f"shard-*/{ROLLUP_FILENAME}")):
+            try:
+                modified = path.stat().st_mtime_ns
+            except OSError:
+                continue
+
+            with self._rollup_cache_lock:
+                cached = self._rollup_cache.get(path)
+            if cached is None or cached[0] != modified:
+                cached = (modified, read_rollup(path))
+                with self._rollup_cache_lock:
+                    self._rollup_cache[path] = cached
+            rollups.append(cached[1])
+
+        return rollups
+
+    def learner_summaries(self, offset: int, limit: int) -> tuple[int, list[tuple[str, dict[str, Any]]]]:
+        """Total learner count and one page of summaries, in shard then id order.
+
+        Only the documents on the page are read.
+        """
+        total = 0
+        page: list[tuple[str, dict[str, Any]]] = []
+        for shard in range(self._shard_count):
+            shard_dir = self._shard_dir(shard)
+            learner_ids = self._shard_learner_ids(shard_dir)
+            for learner_id in learner_ids[max(offset - total, 0) :]:
+                if len(page) >= limit:
+                    break
+                progress = self._load_progress_file(shard_dir / f"{learner_id}.json")
+                if progress is not None:
+                    page.append((learner_id, learner_summary(progress)))
+            total += len(learner_ids)
+        return total, page
+
+
+def progress_backend_from_env(
+    progress_dir: Path | None = None,
+    shard_count: int | None = None,
+    legacy_progress_path: Path | None = None,
+) -> Any:
+    """File storage unless RMF_PROGRESS_BACKEND names a Redis URL.
+
+    ``redis://``, ``rediss://`` and ``unix://`` URLs need the ``redis``
+    package; ``memory://`` uses the in-process stand-in. An explicit
+    ``progress_dir`` always means file storage.
+    """
+    url = os.environ.get("RMF_PROGRESS_BACKEND", "file")
+    if progress_dir is not None or url == "file":
+        return FileProgressBackend(progress_dir, shard_count, legacy_progress_path)
+
+    try:
+        from .redis_progress import RedisProgressBackend
+    except ImportError:
+        from services.redis_progress import RedisProgressBackend
+    return RedisProgressBackend.from_url(url, shard_count=shard_count)
+
 
 class ProgressStore:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        events: ProgressEventBroker | None = None,
+        progress_dir: Path | None = None,
+        shard_count: int | None = None,
+        badges: BadgeEngine | None = None,
+        backend: Any | None = None,
+    ) -> None:
         self._data_dir = Path(__file__).resolve().parent.parent / "data"
         self._course_content_dir = self._data_dir / "course_content"
-        self._progress_path = self._data_dir / "progress.json"
-        self._lock_path = self._data_dir / "progress.json.lock"
-        self._lock = FileLock(str(self._lock_path))
+        self._progress_dir = progress_dir if progress_dir is not None else _default_progress_dir()
+        self._backend = (
+            backend
+            if backend is not None
+            else progress_backend_from_env(progress_dir, shard_count, self._data_dir / "progress.json")
+        )
+        self._events = events if events is not None else progress_events
+        self._badges = badges
+
+    @property
+    def backend(self) -> Any:
+        return self._backend
+
+    @property
+    def progress_dir(self) -> Path:
+        # Local directory for progress data, whichever backend holds the
+        # progress documents themselves.
+        return self._progress_dir
+
+    @property
+    def shard_count(self) -> int:
+        return self._backend.shard_count
 
     def _now_iso(self) -> str:
         return datetime.now(timezone.utc).isoformat()
@@ -30,12 +405,6 @@ class ProgressStore:
             },
             "modules": {},
             "scenarios": {},
-            "capstone": {
-                "started": False,
-                "currentStep": None,
-                "selectedSystem": None,
-                "responses": {},
-            },
             "badges": [],
             "totalTimeMinutes": 0,
         }
@@ -123,48 +492,182 @@ class ProgressStore:
         module_progress["completedAt"] = None
         module_progress["status"] = "in_progress" if has_activity else "not_started"
 
-    def _read_progress(self) -> dict[str, Any]:
-        if not self._progress_path.exists():
-            return self._default_progress()
-
-        try:
-            with self._progress_path.open("r", encoding="utf-8") as progress_file:
-                data = json.load(progress_file)
-        except (json.JSONDecodeError, OSError):
-            return self._default_progress()
-
-        if isinstance(data, dict):
-            return data
-
-        return self._default_progress()
-
-    def _write_progress(self, progress: dict[str, Any]) -> None:
-        self._data_dir.mkdir(parents=True, exist_ok=True)
-
+    def _module_status_events(
+        self,
+        module_id: str,
+        previous_status: Any,
+        module_progress: dict[str, Any],
+    ) -> list[tuple[str, dict[str, Any]]]:
+        status = module_progress.get("status")
+        if status == previous_status:
+            return []
+        return [("module.status", {"moduleId": module_id, "status": status})]
+
+    def _award_badges(
+        self,
+        progress: dict[str, Any],
+        events: list[tuple[str, dict[str, Any]]],
+    ) -> list[tuple[str, str | None]]:
+        # Runs inside the learner's update before the write, so rule counters
+        # and badges are persisted together with the change that earned them.
+        engine = self._badges if self._badges is not None else badge_engine()
+        awarded: list[tuple[str, str | None]] = []
+        for event_type, data in events:
+            for badge_id in engine.evaluate(progress, event_type, data):
+                rule = engine.rule(badge_id)
+                awarded.append((badge_id, rule.module_id() if rule is not None else None))
+        return awarded
+
+    def _publish(
+        self,
+        learner_id: str,
+        events: list[tuple[str, dict[str, Any]]],
+        new_badges: list[tuple[str, str | None]],
+    ) -> None:
+        for event_type, data in events:
+            self._events.publish(event_type, learner_id, **data)
+        for badge_id, module_id in new_badges:
+            if module_id is None:
+                self._events.publish("badge.earned", learner_id, badgeId=badge_id)
+            else:
+                self._events.publish("badge.earned", learner_id, badgeId=badge_id, moduleId=module_id)
+
+    def _read_progress(self, learner_id: str) -> dict[str, Any]:
+        progress = self._backend.read(learner_id)
+        return progress if progress is not None else self._default_progress()
+
+    def _touch(self, progress: dict[str, Any]) -> None:
         progress_user = progress.get("user")
         if not isinstance(progress_user, dict):
             progress_user = {}
             progress["user"] = progress_user
         progress_user["lastActiveAt"] = self._now_iso()
 
-        temp_path = self._progress_path.with_name(f".{self._progress_path.name}.tmp")
-        with temp_path.open("w", encoding="utf-8") as progress_file:
-            json.dump(progress, progress_file)
+    def _modify(
+        self,
+        learner_id: str,
+        change: Callable[[dict[str, Any]], tuple[bool, T]],
+    ) -> tuple[T, Any]:
+        """Apply ``change`` atomically; it returns whether to write, and a result.
+
+        A backend with optimistic transactions may call ``change`` again on a
+        fresh copy, so it must only touch the document it is given.
+        """
+
+        def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any] | None, T]:
+            progress = stored if stored is not None else self._default_progress()
+            write, result = change(progress)
+            if not write:
+                return None, result
+            self._touch(progress)
+            return progress, result
+
+        return self._backend.update(learner_id, mutate)
+
+    def iter_progress(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Yield every stored learner's progress, one document at a time.
+
+        Reads take no locks, so a full scan never blocks learners; a learner
+        written mid-scan is seen either before or after that write.
+        """
+        return self._backend.iter_progress()
+
+    def import_progress(self, learners: Iterable[tuple[str, dict[str, Any]]], *, overwrite: bool = True) -> list[str]:
+        """Write a batch of learner documents as stored.
+
+        The backend writes the batch with as few lock acquisitions or
+        transactions as it can. Returns the learner ids written; with
+        ``overwrite=False`` learners that already have progress are left alone.
+        """
+        incoming: dict[str, dict[str, Any]] = {}
+        for learner_id, progress in learners:
+            if not is_valid_learner_id(learner_id):
+                raise InvalidLearnerIdError(f"Invalid learner id: {learner_id!r}")
+            incoming[learner_id] = progress
+
+        def mutate(learner_id: str, stored: dict[str, Any] | None) -> dict[str, Any] | None:
+            # Decided from what the backend read for this write, so a learner
+            # created concurrently is seen under the same lock or WATCH.
+            if not overwrite and stored is not None:
+                return None
+            return {**self._default_progress(), **incoming[learner_id]}
+
+        written = [learner_id for learner_id, _ in self._backend.update_many(list(incoming), mutate)]
+        for learner_id in written:
+            self._events.publish("progress.imported", learner_id)
+        return written
+
+    def record_activity(self, entries: Iterable[dict[str, Any]], *, session_gap: float) -> None:
+        """Apply aggregated heartbeats in one backend batch.
+
+        Each entry carries the credited ``seconds`` (in total and per module),
+        the wall-clock span it covers and the session starts seen inside it.
+        A batch that begins more than ``session_gap`` seconds after the stored
+        ``lastActiveAt`` also starts a new session.
+        """
+        by_learner = {entry["learnerId"]: entry for entry in entries}
+
+        def mutate(learner_id: str, stored: dict[str, Any] | None) -> dict[str, Any]:
+            entry = by_learner[learner_id]
+            progress = stored if stored is not None else self._default_progress()
+            user = progress.get("user")
+            if not isinstance(user, dict):
+                user = {}
+                progress["user"] = user
+
+            previous_active = user.get("lastActiveAt")
+            sessions = user.get("sessionCount")
+            sessions = int(sessions) if self._is_int_like(sessions) else 0
+            try:
+                idle = (datetime.fromisoformat(entry["firstAt"]) - datetime.fromisoformat(previous_active)).total_seconds()
+            except (TypeError, ValueError):
+                idle = None
+            if idle is None or idle > session_gap:
+                sessions += 1
+            user["sessionCount"] = sessions + entry["sessionStarts"]
 
-        os.replace(temp_path, self._progress_path)
+            if user.get("startedAt") is None:
+                user["startedAt"] = entry["firstAt"]
+            if not isinstance(previous_active, str) or entry["lastAt"] > previous_active:
+                user["lastActiveAt"] = entry["lastAt"]
+
+            total = progress.get("totalTimeMinutes")
+            total = float(total) if isinstance(total, (int, float)) and not isinstance(total, bool) else 0.0
+            progress["totalTimeMinutes"] = round(total + entry["seconds"] / 60, 2)
+
+            if entry["modules"]:
+                modules = progress.setdefault("modules", {})
+                for module_id, seconds in entry["modules"].items():
+                    module_progress = modules.setdefault(module_id, self._default_module_progress())
+                    spent = module_progress.get("timeSpentMinutes")
+                    spent = float(spent) if isinstance(spent, (int, float)) and not isinstance(spent, bool) else 0.0
+                    module_progress["timeSpentMinutes"] = round(spent + seconds / 60, 2)
+
+            # Written as-is: lastActiveAt is the last heartbeat, not the flush time.
+            return progress
+
+        self._backend.update_many(list(by_learner), mutate)
 
-    def get_progress(self) -> dict[str, Any]:
-        with self._lock:
-            return self._read_progress()
+    def get_progress(self, *, learner_id: str = DEFAULT_LEARNER_ID) -> dict[str, Any]:
+        # Backends write atomically, so readers never need the learner's lock.
+        return client_view(self._read_progress(learner_id))
 
-    def save_progress(self, data: dict[str, Any]) -> None:
-        with self._lock:
+    def save_progress(self, data: dict[str, Any], *, learner_id: str = DEFAULT_LEARNER_ID) -> None:
+        def replace(_stored: dict[str, Any] | None) -> tuple[dict[str, Any], None]:
             progress = dict(data)
-            self._write_progress(progress)
+            self._touch(progress)
+            return progress, None
 
-    def mark_lesson_complete(self, module_id: str, lesson_id: str) -> dict[str, Any]:
-        with self._lock:
-            progress = self._read_progress()
+        self._backend.update(learner_id, replace)
+
+    def mark_lesson_complete(
+        self,
+        module_id: str,
+        lesson_id: str,
+        *,
+        learner_id: str = DEFAULT_LEARNER_ID,
+    ) -> dict[str, Any]:
+        def change(progress: dict[str, Any]) -> tuple[bool, Any]:
             modules = progress.setdefault("modules", {})
             module_progress = modules.setdefault(module_id, self._default_module_progress())
             lessons = module_progress.setdefault("lessonsCompleted", [])
@@ -172,9 +675,18 @@ class ProgressStore:
             if lesson_id not in lessons:
                 lessons.append(lesson_id)
 
+            previous_status = module_progress.get("status")
             self._apply_module_status(module_id, module_progress)
-            self._write_progress(progress)
-            return progress
+            events = [
+                ("lesson.completed", {"moduleId": module_id, "lessonId": lesson_id}),
+                *self._module_status_events(module_id, previous_status, module_progress),
+            ]
+            new_badges = self._award_badges(progress, events)
+            return True, (progress, events, new_badges)
+
+        (progress, events, new_badges), _ = self._modify(learner_id, change)
+        self._publish(learner_id, events, new_badges)
+        return {"progress": client_view(progress), "newBadges": [badge_id for badge_id, _ in new_badges]}
 
     def record_quiz_result(
         self,
@@ -183,9 +695,10 @@ class ProgressStore:
         score: int,
         passed: bool,
         badge_id: str | None,
+        *,
+        learner_id: str = DEFAULT_LEARNER_ID,
     ) -> dict[str, Any]:
-        with self._lock:
-            progress = self._read_progress()
+        def change(progress: dict[str, Any]) -> tuple[bool, Any]:
             modules = progress.setdefault("modules", {})
             module_progress = modules.setdefault(module_id, self._default_module_progress())
 
@@ -196,51 +709,77 @@ class ProgressStore:
             attempts = module_progress.get("quizAttempts", 0)
             module_progress["quizAttempts"] = int(attempts) + 1 if self._is_int_like(attempts) else 1
             module_progress["quizPassed"] = bool(module_progress.get("quizPassed")) or bool(passed)
-
-            badge_added = False
             if passed and badge_id:
                 module_progress["badgeEarned"] = True
-                badges = progress.setdefault("badges", [])
-                if badge_id not in badges:
-                    badges.append(badge_id)
-                    badge_added = True
 
+            previous_status = module_progress.get("status")
             self._apply_module_status(module_id, module_progress)
-            self._write_progress(progress)
-            return {
-                "progress": progress,
-                "badgeAdded": badge_added,
-                "moduleCompleted": module_progress.get("status") == "completed",
-            }
+            events = [
+                (
+                    "quiz.recorded",
+                    {"moduleId": module_id, "quizId": quiz_id, "score": score, "passed": bool(passed)},
+                ),
+                *self._module_status_events(module_id, previous_status, module_progress),
+            ]
+            new_badges = self._award_badges(progress, events)
+            return True, (progress, module_progress, events, new_badges)
+
+        (progress, module_progress, events, new_badges), _ = self._modify(learner_id, change)
+        self._publish(learner_id, events, new_badges)
+        new_badge_ids = [new_badge_id for new_badge_id, _ in new_badges]
+        return {
+            "progress": client_view(progress),
+            "badgeAdded": badge_id is not None and badge_id in new_badge_ids,
+            "newBadges": new_badge_ids,
+            "moduleCompleted": module_progress.get("status") == "completed",
+        }
 
-    def record_scenario_result(self, scenario_id: str, score: int, max_score: int) -> dict[str, Any]:
-        with self._lock:
-            progress = self._read_progress()
+    def record_scenario_result(
+        self,
+        scenario_id: str,
+        score: int,
+        max_score: int,
+        *,
+        learner_id: str = DEFAULT_LEARNER_ID,
+    ) -> dict[str, Any]:
+        def change(progress: dict[str, Any]) -> tuple[bool, Any]:
             scenarios = progress.setdefault("scenarios", {})
             scenarios[scenario_id] = {"score": score, "maxScore": max_score}
-            self._write_progress(progress)
-            return progress
+            events = [
+                (
+                    "scenario.recorded",
+                    {
+                        "scenarioId": scenario_id,
+                        "score": score,
+                        "maxScore": max_score,
+                        "scoreRatio": round(score / max_score, 4) if max_score > 0 else None,
+                    },
+                )
+            ]
+            new_badges = self._award_badges(progress, events)
+            return True, (progress, events, new_badges)
+
+        (progress, events, new_badges), _ = self._modify(learner_id, change)
+        self._publish(learner_id, events, new_badges)
+        return {"progress": client_view(progress), "newBadges": [badge_id for badge_id, _ in new_badges]}
+
+    def reset_progress(self, *, learner_id: str = DEFAULT_LEARNER_ID) -> dict[str, Any]:
+        def replace(_stored: dict[str, Any] | None) -> tuple[dict[str, Any], dict[str, Any]]:
+            progress = self._default_progress()
+            self._touch(progress)
+            return progress, progress
 
-    def save_capstone(self, capstone_data: dict[str, Any]) -> dict[str, Any]:
-        with self._lock:
-            progress = self._read_progress()
-            capstone = progress.setdefault("capstone", {})
-            if isinstance(capstone_data, dict):
-                capstone.update(capstone_data)
-            self._write_progress(progress)
-            return progress
+        progress, _ = self._backend.update(learner_id, replace)
 
-    def reset_progress(self) -> dict[str, Any]:
-        with self._lock:
-            progress = self._default_progress()
-            self._write_progress(progress)
-            return progress
+        self._events.publish("progress.reset", learner_id)
+        return progress
 
-    def set_user_start(self) -> None:
-        with self._lock:
-            progress = self._read_progress()
+    def set_user_start(self, *, learner_id: str = DEFAULT_LEARNER_ID) -> None:
+        def change(progress: dict[str, Any]) -> tuple[bool, None]:
             user = progress.setdefault("user", {})
+            if user.get("startedAt") is not None:
+                return False, None
+            user["startedAt"] = self._now_iso()
+            return True, None
 
-            if user.get("startedAt") is None:
-                user["startedAt"] = self._now_iso()
-                self._write_progress(progress)
+        self._modify(learner_id, change)
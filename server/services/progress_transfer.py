@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from .progress_store import ProgressStore, is_valid_learner_id
+except ImportError:
+    from services.progress_store import ProgressStore, is_valid_learner_id
+
+
+EXPORT_FORMATS = ("ndjson", "xapi")
+EXPORT_CHUNK_BYTES = 64 * 1024
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+
+_VERB_IRIS = {
+    "completed": "http://adlnet.gov/expapi/verbs/completed",
+    "passed": "http://adlnet.gov/expapi/verbs/passed",
+    "failed": "http://adlnet.gov/expapi/verbs/failed",
+    "earned": "http://id.tincanapi.com/verb/earned",
+}
+_STATEMENT_NAMESPACE = uuid.UUID("5b0d7f0e-3a0c-4f5e-9c55-6a1f0b7e2d41")
+_PROGRESS_SECTIONS = (("user", dict), ("modules", dict), ("scenarios", dict), ("badges", list))
+
+
+class ProgressImportError(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _statement(
+    learner_id: str,
+    verb: str,
+    activity_id: str,
+    activity_base: str,
+    timestamp: Any = None,
+    result: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    statement: dict[str, Any] = {
+        # Deterministic ids make re-exports idempotent in a learning record store.
+        "id": str(uuid.uuid5(_STATEMENT_NAMESPACE, f"{learner_id}|{verb}|{activity_id}")),
+        "actor": {"objectType": "Agent", "account": {"homePage": activity_base, "name": learner_id}},
+        "verb": {"id": _VERB_IRIS[verb], "display": {"en-US": verb}},
+        "object": {"objectType": "Activity", "id": activity_id},
+    }
+    if result is not None:
+        statement["result"] = result
+    if isinstance(timestamp, str) and timestamp:
+        statement["timestamp"] = timestamp
+    return statement
+
+
+def xapi_statements(learner_id: str, progress: dict[str, Any], activity_base: str) -> Iterator[dict[str, Any]]:
+    """Describe one learner's progress as xAPI statements.
+
+    Only final state is stored, so each lesson, quiz, scenario and badge
+    yields one statement rather than a full attempt history.
+    """
+    user = progress.get("user")
+    last_active = user.get("lastActiveAt") if isinstance(user, dict) else None
+
+    modules = progress.get("modules")
+    for module_id, module in (modules.items() if isinstance(modules, dict) else ()):
+        if not isinstance(module, dict):
+            continue
+        module_base = f"{activity_base}/modules/{module_id}"
+
+        lessons = module.get("lessonsCompleted")
+        for lesson_id in (lessons if isinstance(lessons, list) else ()):
+            yield _statement(learner_id, "completed", f"{module_base}/lessons/{lesson_id}", activity_base)
+
+        score = module.get("quizScore")
+        if isinstance(score, (int, float)) and not isinstance(score, bool):
+            passed = bool(module.get("quizPassed"))
+            yield _statement(
+                learner_id,
+                "passed" if passed else "failed",
+                f"{module_base}/quiz",
+                activity_base,
+                last_active,
+                {
+                    "score": {"scaled": round(score / 100, 4), "raw": score, "min": 0, "max": 100},
+                    "success": passed,
+                    "extensions": {f"{activity_base}/extensions/attempts": module.get("quizAttempts", 0)},
+                },
+            )
+
+        if module.get("status") == "completed":
+            yield _statement(learner_id, "completed", module_base, activity_base, module.get("completedAt"))
+
+    scenarios = progress.get("scenarios")
+    for scenario_id, scenario in (scenarios.items() if isinstance(scenarios, dict) else ()):
+        if not isinstance(scenario, dict):
+            continue
+        score, max_score = scenario.get("score"), scenario.get("maxScore")
+        result: dict[str, Any] = {"completion": True}
+        if isinstance(score, (int, float)) and isinstance(max_score, (int, float)) and max_score > 0:
+            result["score"] = {"scaled": round(score / max_score, 4), "raw": score, "min": 0, "max": max_score}
+        yield _statement(
+            learner_id, "completed", f"{activity_base}/scenarios/{scenario_id}", activity_base, last_active, result
+        )
+
+    badges = progress.get("badges")
+    for badge_id in (badges if isinstance(badges, list) else ()):
+        yield _statement(learner_id, "earned", f"{activity_base}/badges/{badge_id}", activity_base, last_active)
+
+
+def export_chunks(store: ProgressStore, export_format: str, activity_base: str = "") -> Iterator[bytes]:
+    """Stream every learner as NDJSON, batching lines into ~64 KiB chunks.
+
+    Memory stays bounded by one learner document plus one chunk, whatever
+    the number of learners.
+    """
+    buffer: list[bytes] = []
+    buffered = 0
+    for learner_id, progress in store.iter_progress():
+        if export_format == "xapi":
+            records: Iterator[dict[str, Any]] = xapi_statements(learner_id, progress, activity_base)
+        else:
+            records = iter(({"learnerId": learner_id, "progress": progress},))
+
+        for record in records:
+            line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            buffer.append(line)
+            buffered += len(line)
+
+        if buffered >= EXPORT_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer.clear()
+            buffered = 0
+
+    if buffer:
+        yield b"".join(buffer)
+
+
+def parse_import_line(line: bytes) -> tuple[str, dict[str, Any]]:
+    """Parse one ``{"learnerId", "progress"}`` line, as written by the NDJSON export."""
+    try:
+        record = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError(f"invalid JSON: {error}") from error
+    if not isinstance(record, dict):
+        raise ValueError("line is not a JSON object")
+
+    learner_id = record.get("learnerId")
+    if not is_valid_learner_id(learner_id):
+        raise ValueError(f"invalid learnerId: {learner_id!r}")
+
+    progress = record.get("progress")
+    if not isinstance(progress, dict):
+        raise ValueError("progress must be an object")
+    for section, expected_type in _PROGRESS_SECTIONS:
+        if section in progress and not isinstance(progress[section], expected_type):
+            raise ValueError(f"progress.{section} must be {'an object' if expected_type is dict else 'a list'}")
+
+    return learner_id, progress
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield line
+        if len(pending) > MAX_IMPORT_LINE_BYTES:
+            raise ProgressImportError(413, f"Import line exceeds {MAX_IMPORT_LINE_BYTES} bytes")
+    if pending:
+        yield pending
+
+
+async def import_ndjson(
+    store: ProgressStore,
+    chunks: AsyncIterator[bytes],
+    *,
+    overwrite: bool = True,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> dict[str, Any]:
+    """Read NDJSON progress from a byte stream and write it in batches.
+
+    Batches are written off the event loop and each holds only the locks of
+    the shards it touches, so an import of any size never blocks the whole
+    store. Invalid lines are skipped and reported by line number.
+    """
+    imported = skipped = rejected = 0
+    errors: list[dict[str, Any]] = []
+    batch: list[tuple[str, dict[str, Any]]] = []
+
+    async def write_batch() -> None:
+        nonlocal imported, skipped
+        written = await run_in_threadpool(store.import_progress, batch, overwrite=overwrite)
+        imported += len(written)
+        skipped += len(batch) - len(written)
+        batch.clear()
+
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            batch.append(parse_import_line(line))
+        except ValueError as error:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "error": str(error)})
+            continue
+        if len(batch) >= batch_size:
+            await write_batch()
+
+    if batch:
+        await write_batch()
+
+    return {"imported": imported, "skipped": skipped, "rejected": rejected, "errors": errors}
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections.abc import Mapping, Sequence
+from threading import Lock
+from typing import Any
+
+import numpy as np
+
+try:
+    from .counter_store import CounterStore, default_analytics_dir
+except ImportError:
+    from services.counter_store import CounterStore, default_analytics_dir
+
+FLUSH_EVERY_SUBMISSIONS = 25
+FLUSH_INTERVAL_SECONDS = 30.0
+
+
+def _option_count(question: Mapping[str, Any]) -> int:
+    if question.get("type") == "true_false":
+        return 2
+    options = question.get("options")
+    return len(options) if isinstance(options, (list, tuple)) else 0
+
+
+def _selected_options(question: Mapping[str, Any], answer: Any, option_count: int) -> list[int]:
+    q_type = question.get("type")
+    if q_type == "true_false":
+        return [0 if answer else 1] if isinstance(answer, bool) else []
+
+    if isinstance(answer, bool):
+        return []
+    if isinstance(answer, int):
+        candidates = [answer]
+    elif isinstance(answer, list) and q_type == "multi_select":
+        candidates = [item for item in answer if isinstance(item, int) and not isinstance(item, bool)]
+    else:
+        return []
+
+    return sorted({index for index in candidates if 0 <= index < option_count})
+
+
+def _correct_options(question: Mapping[str, Any]) -> set[int]:
+    q_type = question.get("type")
+    if q_type == "true_false":
+        answer = question.get("correctAnswer")
+        return {0 if answer else 1} if isinstance(answer, bool) else set()
+    if q_type == "multi_select":
+        indices = question.get("correctIndices")
+        return {index for index in indices if isinstance(index, int)} if isinstance(indices, (list, tuple)) else set()
+    index = question.get("correctIndex")
+    return {index} if isinstance(index, int) else set()
+
+
+class _QuizCounters:
+    __slots__ = ("layout", "question_ids", "option_counts", "arrays")
+
+    def __init__(self, questions: Sequence[Mapping[str, Any]]) -> None:
+        self.question_ids = [str(question.get("id")) for question in questions]
+        self.option_counts = [_option_count(question) for question in questions]
+        signature = "|".join(f"{qid}:{count}" for qid, count in zip(self.question_ids, self.option_counts))
+        self.layout = hashlib.sha1(signature.encode("utf-8")).hexdigest()
+        self.arrays = self._zeros()
+
+    def _zeros(self) -> dict[str, np.ndarray]:
+        question_count = len(self.question_ids)
+        max_options = max(self.option_counts, default=0)
+        return {
+            # submissions, sum of raw scores, sum of squared raw scores
+            "totals": np.zeros(3, dtype=np.float64),
+            "answered": np.zeros(question_count, dtype=np.int64),
+            "correct": np.zeros(question_count, dtype=np.int64),
+            # sum of the submission's raw score over submissions answering correctly
+            "correct_score_sum": np.zeros(question_count, dtype=np.float64),
+            "option_selected": np.zeros((question_count, max_options), dtype=np.int64),
+        }
+
+
+class QuizItemAnalytics:
+    def __init__(
+        self,
+        store: CounterStore | None = None,
+        flush_every: int = FLUSH_EVERY_SUBMISSIONS,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self._store = store if store is not None else CounterStore(default_analytics_dir() / "quizzes")
+        self._flush_every = flush_every
+        self._flush_interval = flush_interval
+        self._counters: dict[str, _QuizCounters] = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = Lock()
+        # Held across a merge, so a snapshot is never in memory and in the
+        # store at once as far as statistics() can see.
+        self._flush_lock = Lock()
+
+    def _counters_for(self, quiz_id: str, questions: Sequence[Mapping[str, Any]]) -> _QuizCounters:
+        counters = self._counters.get(quiz_id)
+        if counters is None or counters.question_ids != [str(question.get("id")) for question in questions]:
+            counters = _QuizCounters(questions)
+            self._counters[quiz_id] = counters
+        return counters
+
+    def record(
+        self,
+        quiz_id: str,
+        questions: Sequence[Mapping[str, Any]],
+        answers: dict[str, Any],
+        results: list[dict[str, Any]],
+    ) -> None:
+        questions = [question for question in questions if isinstance(question, Mapping)]
+        if not questions or len(results) != len(questions):
+            return
+
+        correct = np.fromiter((bool(result.get("correct")) for result in results), dtype=np.int64, count=len(results))
+        answered = np.zeros(len(questions), dtype=np.int64)
+        rows: list[int] = []
+        columns: list[int] = []
+
+        with self._lock:
+            counters = self._counters_for(quiz_id, questions)
+            for row, question in enumerate(questions):
+                answer = answers.get(question.get("id")) if isinstance(answers, dict) else None
+                selected = _selected_options(question, answer, counters.option_counts[row])
+                if selected:
+                    answered[row] = 1
+                    rows.extend([row] * len(selected))
+                    columns.extend(selected)
+
+            raw_score = float(correct.sum())
+            arrays = counters.arrays
+            arrays["totals"] += (1.0, raw_score, raw_score * raw_score)
+            arrays["answered"] += answered
+            arrays["correct"] += correct
+            arrays["correct_score_sum"] += correct * raw_score
+            if rows:
+                np.add.at(arrays["option_selected"], (rows, columns), 1)
+
+            self._pending += 1
+            due = (
+                self._pending >= self._flush_every
+                or time.monotonic() - self._last_flush >= self._flush_interval
+            )
+
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                snapshots = [
+                    (quiz_id, counters, {name: array.copy() for name, array in counters.arrays.items()})
+                    for quiz_id, counters in self._counters.items()
+                    if counters.arrays["totals"][0] > 0
+                ]
+                self._pending = 0
+                self._last_flush = time.monotonic()
+
+            for quiz_id, counters, arrays in snapshots:
+                self._store.merge(quiz_id, counters.layout, arrays)
+                # Only counts that reached the store leave memory; if a merge
+                # fails, the rest stay for the next flush.
+                with self._lock:
+                    for name, array in arrays.items():
+                        counters.arrays[name] -= array
+
+    def _merged_arrays(self, quiz_id: str, questions: Sequence[Mapping[str, Any]]) -> tuple[_QuizCounters, dict[str, np.ndarray]]:
+        with self._flush_lock:
+            with self._lock:
+                counters = self._counters_for(quiz_id, questions)
+                merged = {name: array.copy() for name, array in counters.arrays.items()}
+
+            stored = self._store.load(quiz_id, counters.layout)
+        if stored is not None:
+            for name, array in stored.items():
+                if name in merged and merged[name].shape == array.shape:
+                    merged[name] += array
+
+        return counters, merged
+
+    def statistics(self, quiz_id: str, questions: Sequence[Mapping[str, Any]]) -> dict[str, Any]:
+        questions = [question for question in questions if isinstance(question, Mapping)]
+        counters, arrays = self._merged_arrays(quiz_id, questions)
+
+        submissions, score_sum, score_sq_sum = (float(value) for value in arrays["totals"])
+        correct = arrays["correct"].astype(np.float64)
+        answered = arrays["answered"].astype(np.float64)
+        correct_score_sum = arrays["correct_score_sum"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            difficulty = correct / submissions if submissions else np.full(len(questions), np.nan)
+
+            # Point-biserial against the rest score (total minus the item), so
+            # an item does not correlate with itself.
+            rest_mean_correct = (correct_score_sum - correct) / correct
+            rest_mean_incorrect = (score_sum - correct_score_sum) / (submissions - correct)
+            rest_sum = score_sum - correct
+            rest_sq_sum = score_sq_sum - 2 * correct_score_sum + correct
+            rest_variance = rest_sq_sum / submissions - (rest_sum / submissions) ** 2
+            discrimination = (
+                (rest_mean_correct - rest_mean_incorrect)
+                * np.sqrt(difficulty * (1 - difficulty))
+                / np.sqrt(rest_variance)
+            )
+            selection_rates = arrays["option_selected"] / answered[:, None]
+
+        def _finite(value: float) -> float | None:
+            return round(float(value), 4) if np.isfinite(value) else None
+
+        question_stats: list[dict[str, Any]] = []
+        for row, question in enumerate(questions):
+            correct_options = _correct_options(question)
+            question_stats.append(
+                {
+                    "questionId": counters.question_ids[row],
+                    "type": question.get("type"),
+                    "answered": int(answered[row]),
+                    "difficulty": _finite(difficulty[row]),
+                    "discrimination": _finite(discrimination[row]),
+                    "options": [
+                        {
+                            "index": column,
+                            "correct": column in correct_options,
+                            "selected": int(arrays["option_selected"][row, column]),
+                            "selectionRate": _finite(selection_rates[row, column]),
+                        }
+                        for column in range(counters.option_counts[row])
+                    ],
+                }
+            )
+
+        mean_raw = score_sum / submissions if submissions else None
+        return {
+            "quizId": quiz_id,
+            "submissions": int(submissions),
+            "meanCorrect": round(mean_raw, 4) if mean_raw is not None else None,
+            "questions": question_stats,
+        }
+
+
+# One accumulator per process; the grading path and the analytics API share it.
+quiz_analytics = QuizItemAnalytics()
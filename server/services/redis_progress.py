@@ -0,0 +1,506 @@
+"""Progress storage on Redis, for deployments running several app nodes.
+
+Each learner is a hash under ``{prefix}:learner:{id}``. Top-level progress
+keys are stored as JSON in ``p:<key>`` fields, beside a ``rev`` counter that
+serves as the document's stamp and the learner's cohort ``summary``. Updates
+are optimistic transactions: WATCH the learner, read it, apply the change,
+then write only the fields that changed together with the cohort counters in
+one MULTI/EXEC, retrying if another node wrote the learner in between.
+
+Cohort rollups are flat counter hashes per shard (``{prefix}:cohort:{n}``)
+plus a hash of learner summaries (``{prefix}:cohort:{n}:learners``), kept
+in step with the learners inside the same transactions.
+
+``memory://`` URLs use ``MemoryRedis``, an in-process stand-in for the
+commands used here, so the backend runs without a server or the ``redis``
+package. It is shared per URL within one process only.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+from collections.abc import Callable, Iterable, Iterator
+from threading import Lock, RLock
+from typing import Any, TypeVar
+
+try:
+    import redis
+    from redis.exceptions import WatchError
+except ImportError:  # Only needed for redis:// URLs; memory:// works without it.
+    redis = None
+    WatchError = None
+
+try:
+    from .cohort_aggregates import learner_summary, rollup_delta, rollup_from_counts
+    from .progress_store import (
+        DEFAULT_SHARD_COUNT,
+        InvalidLearnerIdError,
+        Mutation,
+        is_valid_learner_id,
+        learner_shard,
+    )
+except ImportError:
+    from services.cohort_aggregates import learner_summary, rollup_delta, rollup_from_counts
+    from services.progress_store import (
+        DEFAULT_SHARD_COUNT,
+        InvalidLearnerIdError,
+        Mutation,
+        is_valid_learner_id,
+        learner_shard,
+    )
+
+T = TypeVar("T")
+
+FIELD_PREFIX = "p:"
+REV_FIELD = "rev"
+SUMMARY_FIELD = "summary"
+
+DEFAULT_KEY_PREFIX = "rmf"
+DEFAULT_MAX_CONNECTIONS = 32
+POOL_TIMEOUT_SECONDS = 5
+MAX_TRANSACTION_ATTEMPTS = 50
+BATCH_SIZE = 100
+SCAN_COUNT = 500
+
+
+class RedisProgressError(RuntimeError):
+    """Raised when the Redis backend is misconfigured or cannot commit."""
+
+
+class MemoryWatchError(Exception):
+    """A watched key changed before EXEC (``redis.exceptions.WatchError``)."""
+
+
+_WATCH_ERRORS: tuple[type[Exception], ...] = (
+    (MemoryWatchError,) if WatchError is None else (MemoryWatchError, WatchError)
+)
+
+
+class MemoryRedis:
+    """In-process stand-in for the subset of redis-py this backend uses.
+
+    Hashes only, string replies (as with ``decode_responses=True``), and
+    WATCH via per-key versions. Thread-safe; not shared between processes.
+    """
+
+    def __init__(self) -> None:
+        self._hashes: dict[str, dict[str, str]] = {}
+        self._versions: dict[str, int] = {}
+        self._lock = RLock()
+
+    def _written(self, key: str) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if not self._hashes.get(key, True):
+            del self._hashes[key]
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def hgetall(self, key: str) -> dict[str, str]:
+        with self._lock:
+            return dict(self._hashes.get(key, {}))
+
+    def hget(self, key: str, field: str) -> str | None:
+        with self._lock:
+            return self._hashes.get(key, {}).get(field)
+
+    def hlen(self, key: str) -> int:
+        with self._lock:
+            return len(self._hashes.get(key, {}))
+
+    def hset(
+        self,
+        key: str,
+        field: str | None = None,
+        value: Any = None,
+        mapping: dict[str, Any] | None = None,
+    ) -> int:
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            added = sum(1 for name in items if name not in fields)
+            fields.update({name: str(item) for name, item in items.items()})
+            self._written(key)
+            return added
+
+    def hdel(self, key: str, *fields: str) -> int:
+        with self._lock:
+            stored = self._hashes.get(key, {})
+            removed = sum(1 for name in fields if stored.pop(name, None) is not None)
+            if removed:
+                self._written(key)
+            return removed
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            value = int(fields.get(field, 0)) + amount
+            fields[field] = str(value)
+            self._written(key)
+            return value
+
+    def hincrbyfloat(self, key: str, field: str, amount: float = 1.0) -> float:
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            value = float(fields.get(field, 0)) + amount
+            fields[field] = repr(value)
+            self._written(key)
+            return value
+
+    def exists(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if key in self._hashes)
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._hashes.pop(key, None) is not None:
+                    removed += 1
+                    self._written(key)
+            return removed
+
+    def scan_iter(self, match: str | None = None, count: int | None = None) -> Iterator[str]:
+        with self._lock:
+            keys = list(self._hashes)
+        for key in keys:
+            if match is None or fnmatch.fnmatchcase(key, match):
+                yield key
+
+    def pipeline(self, transaction: bool = True) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    """Pipeline over ``MemoryRedis`` with redis-py's WATCH/MULTI behaviour.
+
+    After ``watch`` commands run immediately until ``multi``; otherwise they
+    are queued for ``execute``, which fails with ``MemoryWatchError`` if a
+    watched key was written in the meantime.
+    """
+
+    def __init__(self, client: MemoryRedis) -> None:
+        self._client = client
+        self._watched: dict[str, int] = {}
+        self._immediate = False
+        self._queue: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    def __enter__(self) -> MemoryPipeline:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._watched = {}
+        self._immediate = False
+        self._queue = []
+
+    def watch(self, *keys: str) -> None:
+        for key in keys:
+            self._watched[key] = self._client.version(key)
+        self._immediate = True
+
+    def unwatch(self) -> None:
+        self._watched = {}
+        self._immediate = False
+
+    def multi(self) -> None:
+        self._immediate = False
+
+    def _command(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        if self._immediate:
+            return getattr(self._client, name)(*args, **kwargs)
+        self._queue.append((name, args, kwargs))
+        return self
+
+    def hgetall(self, key: str) -> Any:
+        return self._command("hgetall", key)
+
+    def hget(self, key: str, field: str) -> Any:
+        return self._command("hget", key, field)
+
+    def hlen(self, key: str) -> Any:
+        return self._command("hlen", key)
+
+    def hset(self, key: str, field: str | None = None, value: Any = None, mapping: dict[str, Any] | None = None) -> Any:
+        return self._command("hset", key, field, value, mapping=mapping)
+
+    def hdel(self, key: str, *fields: str) -> Any:
+        return self._command("hdel", key, *fields)
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> Any:
+        return self._command("hincrby", key, field, amount)
+
+    def hincrbyfloat(self, key: str, field: str, amount: float = 1.0) -> Any:
+        return self._command("hincrbyfloat", key, field, amount)
+
+    def exists(self, *keys: str) -> Any:
+        return self._command("exists", *keys)
+
+    def execute(self) -> list[Any]:
+        with self._client._lock:
+            try:
+                if any(self._client.version(key) != version for key, version in self._watched.items()):
+                    raise MemoryWatchError("Watched variable changed.")
+                return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._queue]
+            finally:
+                self.reset()
+
+
+_clients: dict[str, Any] = {}
+_clients_lock = Lock()
+
+
+def redis_client(url: str, max_connections: int | None = None) -> Any:
+    """Client for ``url``, shared by every store in the process.
+
+    Real servers get a blocking connection pool, so a burst of requests
+    waits for a free connection instead of opening more than
+    ``max_connections``.
+    """
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is not None:
+            return client
+
+        if url.startswith("memory://"):
+            client = MemoryRedis()
+        elif redis is None:
+            raise RedisProgressError(f"RMF_PROGRESS_BACKEND={url} needs the redis package (pip install redis)")
+        else:
+            pool = redis.BlockingConnectionPool.from_url(
+                url,
+                max_connections=max_connections
+                or int(os.environ.get("RMF_REDIS_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)),
+                timeout=POOL_TIMEOUT_SECONDS,
+                decode_responses=True,
+            )
+            client = redis.Redis(connection_pool=pool)
+        _clients[url] = client
+        return client
+
+
+def _decode(fields: dict[str, str]) -> dict[str, Any] | None:
+    progress = {
+        name[len(FIELD_PREFIX) :]: json.loads(value)
+        for name, value in fields.items()
+        if name.startswith(FIELD_PREFIX)
+    }
+    return progress or None
+
+
+def _stamp(raw: str | int | None) -> int | None:
+    return int(raw) if raw is not None else None
+
+
+class RedisProgressBackend:
+    """Learner documents as Redis hashes; see the module docstring for the layout."""
+
+    def __init__(
+        self,
+        client: Any,
+        shard_count: int | None = None,
+        key_prefix: str | None = None,
+        cohort: bool = True,
+    ) -> None:
+        self._client = client
+        self._shard_count = shard_count or int(os.environ.get("RMF_PROGRESS_SHARDS", DEFAULT_SHARD_COUNT))
+        self._prefix = key_prefix or os.environ.get("RMF_REDIS_PREFIX", DEFAULT_KEY_PREFIX)
+        self._cohort = cohort
+
+    @classmethod
+    def from_url(cls, url: str, shard_count: int | None = None) -> RedisProgressBackend:
+        return cls(redis_client(url), shard_count=shard_count)
+
+    @property
+    def shard_count(self) -> int:
+        return self._shard_count
+
+    def companion(self, name: str) -> RedisProgressBackend:
+        """Backend for another per-learner document, under ``{prefix}:{name}``.
+
+        Updates use the same transactions, but no cohort counters are kept.
+        """
+        return RedisProgressBackend(self._client, self._shard_count, f"{self._prefix}:{name}", cohort=False)
+
+    def _learner_key(self, learner_id: str) -> str:
+        if not is_valid_learner_id(learner_id):
+            raise InvalidLearnerIdError(f"Invalid learner id: {learner_id!r}")
+        return f"{self._prefix}:learner:{learner_id}"
+
+    def _cohort_key(self, shard: int) -> str:
+        return f"{self._prefix}:cohort:{shard}"
+
+    def read(self, learner_id: str) -> dict[str, Any] | None:
+        return _decode(self._client.hgetall(self._learner_key(learner_id)))
+
+    def exists(self, learner_id: str) -> bool:
+        return bool(self._client.exists(self._learner_key(learner_id)))
+
+    def stamp(self, learner_id: str) -> int | None:
+        return _stamp(self._client.hget(self._learner_key(learner_id), REV_FIELD))
+
+    def _queue_write(self, pipe: Any, learner_id: str, stored: dict[str, str], progress: dict[str, Any]) -> None:
+        """Queue the commands that turn ``stored`` into ``progress``; the first replies with the new rev."""
+        key = self._learner_key(learner_id)
+        encoded = {
+            FIELD_PREFIX + name: json.dumps(value, separators=(",", ":"))
+            for name, value in progress.items()
+        }
+        changed = {name: value for name, value in encoded.items() if stored.get(name) != value}
+        removed = [name for name in stored if name.startswith(FIELD_PREFIX) and name not in encoded]
+
+        pipe.hincrby(key, REV_FIELD, 1)
+        if changed:
+            pipe.hset(key, mapping=changed)
+        if removed:
+            pipe.hdel(key, *removed)
+        if not self._cohort:
+            return
+
+        summary = learner_summary(progress)
+        previous = json.loads(stored[SUMMARY_FIELD]) if SUMMARY_FIELD in stored else None
+        if summary == previous:
+            return
+
+        encoded_summary = json.dumps(summary, separators=(",", ":"))
+        cohort_key = self._cohort_key(learner_shard(learner_id, self._shard_count))
+        pipe.hset(key, SUMMARY_FIELD, encoded_summary)
+        pipe.hset(f"{cohort_key}:learners", learner_id, encoded_summary)
+        for field, amount in rollup_delta(previous, summary).items():
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(cohort_key, field, amount)
+            else:
+                pipe.hincrby(cohort_key, field, amount)
+
+    def update(self, learner_id: str, mutate: Mutation[T]) -> tuple[T, Any]:
+        """Run one read-modify-write as a WATCH/MULTI/EXEC transaction.
+
+        ``mutate`` is called again on a fresh read if another writer got in
+        first. Returns the mutation's result and the document's rev afterwards.
+        """
+        key = self._learner_key(learner_id)
+        for _ in range(MAX_TRANSACTION_ATTEMPTS):
+            with self._client.pipeline() as pipe:
+                try:
+                    pipe.watch(key)
+                    stored = pipe.hgetall(key)
+                    progress, result = mutate(_decode(stored))
+                    if progress is None:
+                        pipe.unwatch()
+                        return result, _stamp(stored.get(REV_FIELD))
+                    pipe.multi()
+                    self._queue_write(pipe, learner_id, stored, progress)
+                    return result, _stamp(pipe.execute()[0])
+                except _WATCH_ERRORS:
+                    continue
+        raise RedisProgressError(f"Gave up updating learner {learner_id!r} after {MAX_TRANSACTION_ATTEMPTS} conflicts")
+
+    def update_many(
+        self,
+        learner_ids: Iterable[str],
+        mutate: Callable[[str, dict[str, Any] | None], dict[str, Any] | None],
+    ) -> list[tuple[str, dict[str, Any]]]:
+        """Apply ``mutate`` to learners in batches, one transaction per batch."""
+        learner_ids = list(learner_ids)
+        for learner_id in learner_ids:
+            self._learner_key(learner_id)
+
+        written: list[tuple[str, dict[str, Any]]] = []
+        for start in range(0, len(learner_ids), BATCH_SIZE):
+            written.extend(self._update_batch(learner_ids[start : start + BATCH_SIZE], mutate))
+        return written
+
+    def _update_batch(
+        self,
+        learner_ids: list[str],
+        mutate: Callable[[str, dict[str, Any] | None], dict[str, Any] | None],
+    ) -> list[tuple[str, dict[str, Any]]]:
+        keys = [self._learner_key(learner_id) for learner_id in learner_ids]
+        for _ in range(MAX_TRANSACTION_ATTEMPTS):
+            with self._client.pipeline() as pipe:
+                try:
+                    pipe.watch(*keys)
+                    # Reads while watching are immediate; fetch them in one round trip.
+                    with self._client.pipeline(transaction=False) as reads:
+                        for key in keys:
+                            reads.hgetall(key)
+                        stored_batch = reads.execute()
+
+                    writes = []
+                    for learner_id, stored in zip(learner_ids, stored_batch):
+                        progress = mutate(learner_id, _decode(stored))
+                        if progress is not None:
+                            writes.append((learner_id, stored, progress))
+                    if not writes:
+                        pipe.unwatch()
+                        return []
+
+                    pipe.multi()
+                    for learner_id, stored, progress in writes:
+                        self._queue_write(pipe, learner_id, stored, progress)
+                    pipe.execute()
+                    return [(learner_id, progress) for learner_id, _, progress in writes]
+                except _WATCH_ERRORS:
+                    continue
+        raise RedisProgressError(f"Gave up updating {len(learner_ids)} learners after {MAX_TRANSACTION_ATTEMPTS} conflicts")
+
+    def iter_progress(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        key_prefix = f"{self._prefix}:learner:"
+        batch: list[str] = []
+
+        def fetch(keys: list[str]) -> Iterator[tuple[str, dict[str, Any]]]:
+            with self._client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hgetall(key)
+                for key, fields in zip(keys, pipe.execute()):
+                    progress = _decode(fields)
+                    if progress is not None:
+                        yield key[len(key_prefix) :], progress
+
+        for key in self._client.scan_iter(match=f"{key_prefix}*", count=SCAN_COUNT):
+            batch.append(key)
+            if len(batch) >= BATCH_SIZE:
+                yield from fetch(batch)
+                batch = []
+        if batch:
+            yield from fetch(batch)
+
+    def rollups(self) -> list[dict[str, Any]]:
+        """Every shard's cohort counters, read in one pipelined round trip."""
+        with self._client.pipeline(transaction=False) as pipe:
+            for shard in range(self._shard_count):
+                pipe.hgetall(self._cohort_key(shard))
+            replies = pipe.execute()
+
+        return [rollup_from_counts(counts) for counts in replies]
+
+    def learner_summaries(self, offset: int, limit: int) -> tuple[int, list[tuple[str, dict[str, Any]]]]:
+        """Total learner count and one page of summaries, in shard then id order.
+
+        Shard sizes come from HLEN; only the shards the page covers are fetched.
+        """
+        with self._client.pipeline(transaction=False) as pipe:
+            for shard in range(self._shard_count):
+                pipe.hlen(f"{self._cohort_key(shard)}:learners")
+            sizes = [int(size) for size in pipe.execute()]
+
+        page: list[tuple[str, dict[str, Any]]] = []
+        skip = offset
+        for shard, size in enumerate(sizes):
+            if len(page) >= limit:
+                break
+            if skip >= size:
+                skip -= size
+                continue
+            summaries = self._client.hgetall(f"{self._cohort_key(shard)}:learners")
+            for learner_id in sorted(summaries)[skip : skip + limit - len(page)]:
+                page.append((learner_id, json.loads(summaries[learner_id])))
+            skip = 0
+        return sum(sizes), page
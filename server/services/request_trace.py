@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+MAX_CAPTURED_BODY_BYTES = 64 * 1024
+TRACE_FILENAME = "requests.ndjson"
+# Kept beside the log; without it the learner hashes cannot be matched to ids.
+TRACE_SALT_FILENAME = "learner-salt"
+
+# Identifiers (module, step and quiz ids, voices) are kept verbatim so traces
+# can be replayed; any other string is reduced to its length.
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z0-9_.:-]{1,64}")
+
+
+def learner_hash(learner_id: str, salt: bytes = b"") -> str:
+    return hashlib.blake2b(learner_id.encode("utf-8"), digest_size=6, salt=salt).hexdigest()
+
+
+def trace_salt(directory: Path, create: bool = False) -> bytes | None:
+    """The trace directory's learner-hash salt, created on first use if ``create``.
+
+    Every worker writing to the directory agrees on one salt, so a learner
+    hashes the same in every rotated file; traces from other directories
+    do not link up.
+    """
+    path = directory / TRACE_SALT_FILENAME
+    if create and not path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(os.urandom(hashlib.blake2b.SALT_SIZE).hex(), encoding="utf-8")
+        try:
+            # Linking fails if another worker got there first; theirs is kept.
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            temp_path.unlink()
+
+    try:
+        return bytes.fromhex(path.read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        return None
+
+
+def body_shape(value: Any) -> Any:
+    """Strip free text from a JSON body while keeping its structure and sizes."""
+    if isinstance(value, dict):
+        return {str(key): body_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [body_shape(item) for item in value]
+    if isinstance(value, str) and not _IDENTIFIER_PATTERN.fullmatch(value):
+        return {"$str": len(value)}
+    return value
+
+
+def body_from_shape(shape: Any) -> Any:
+    """Rebuild a body with the recorded structure, using filler for free text."""
+    if isinstance(shape, dict):
+        if set(shape) == {"$str"} and isinstance(shape["$str"], int):
+            return "x" * shape["$str"]
+        return {key: body_from_shape(item) for key, item in shape.items()}
+    if isinstance(shape, list):
+        return [body_from_shape(item) for item in shape]
+    return shape
+
+
+class TraceWriter:
+    """Appends trace records to a size-rotated NDJSON file from a background thread."""
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS) -> None:
+        self._directory = directory
+        self._path = directory / TRACE_FILENAME
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._queue: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self._salt: bytes | None = None
+
+    @property
+    def salt(self) -> bytes:
+        if self._salt is None:
+            with self._thread_lock:
+                if self._salt is None:
+                    self._salt = trace_salt(self._directory, create=True) or b""
+        return self._salt
+
+    def write(self, record: dict[str, Any]) -> None:
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="request-trace-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put(record)
+
+    def close(self) -> None:
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _rotate(self) -> None:
+        for index in range(self._backups - 1, 0, -1):
+            source = self._path.with_name(f"{TRACE_FILENAME}.{index}")
+            if source.exists():
+                os.replace(source, self._path.with_name(f"{TRACE_FILENAME}.{index + 1}"))
+        if self._backups > 0:
+            os.replace(self._path, self._path.with_name(f"{TRACE_FILENAME}.1"))
+        else:
+            self._path.unlink()
+
+    def _run(self) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            record = self._queue.get()
+            batch = [] if record is None else [record]
+            # Drain whatever else is queued so a burst costs one write.
+            while record is not None:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is not None:
+                    batch.append(record)
+
+            if batch:
+                lines = "".join(json.dumps(item, separators=(",", ":")) + "\n" for item in batch)
+                with self._path.open("a", encoding="utf-8") as trace_file:
+                    trace_file.write(lines)
+                    size = trace_file.tell()
+                if size >= self._max_bytes:
+                    self._rotate()
+
+            if record is None:
+                return
+
+
+class RequestTraceMiddleware:
+    """Records one trace line per API request for later replay.
+
+    Each line holds the route template, method, path and query, the body
+    shape (see ``body_shape``), the response status, handler time and a
+    salted hash of the learner id. Only paths under ``path_prefix`` are traced.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        writer: TraceWriter,
+        learner_header: str,
+        learner_cookie: str,
+        default_learner: str,
+        path_prefix: str = "/api/",
+        sample_rate: float = 1.0,
+    ) -> None:
+        self.app = app
+        self._writer = writer
+        self._learner_header = learner_header
+        self._learner_cookie = learner_cookie
+        self._default_learner = default_learner
+        self._path_prefix = path_prefix
+        self._sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self._path_prefix):
+            await self.app(scope, receive, send)
+            return
+        if self._sample_rate < 1.0 and random.random() >= self._sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        body_chunks: list[bytes] = []
+        body_size = 0
+        status = 0
+
+        async def capture_receive() -> Message:
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if body_size <= MAX_CAPTURED_BODY_BYTES:
+                    body_chunks.append(chunk)
+            return message
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            self._writer.write(self._record(scope, started, status, body_chunks, body_size))
+
+    def _record(
+        self,
+        scope: Scope,
+        started: float,
+        status: int,
+        body_chunks: list[bytes],
+        body_size: int,
+    ) -> dict[str, Any]:
+        headers = Headers(scope=scope)
+        learner_id = (
+            headers.get(self._learner_header)
+            or cookie_parser(headers.get("cookie", "")).get(self._learner_cookie)
+            or self._default_learner
+        )
+
+        record: dict[str, Any] = {
+            "at": round(time.time() - (time.monotonic() - started), 4),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(scope.get("route"), "path", None),
+            "status": status,
+            "ms": round((time.monotonic() - started) * 1000, 2),
+            "learner": learner_hash(learner_id, self._writer.salt),
+        }
+        query = scope.get("query_string", b"").decode("latin-1")
+        if query:
+            record["query"] = query
+        if body_size:
+            record["bodyBytes"] = body_size
+            if body_size <= MAX_CAPTURED_BODY_BYTES:
+                try:
+                    record["body"] = body_shape(json.loads(b"".join(body_chunks)))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    pass
+        return record
+
+
+def trace_writer_from_env() -> TraceWriter | None:
+    """Tracing is opt-in: it is enabled only when RMF_TRACE_DIR is set."""
+    directory = os.environ.get("RMF_TRACE_DIR")
+    if not directory:
+        return None
+    return TraceWriter(
+        Path(directory),
+        max_bytes=int(os.environ.get("RMF_TRACE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        backups=int(os.environ.get("RMF_TRACE_BACKUPS", DEFAULT_BACKUPS)),
+    )
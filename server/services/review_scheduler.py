@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import heapq
+import re
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from threading import Lock
+from typing import Any
+
+try:
+    from .content_pack import load_content_pack
+    from .progress_store import DEFAULT_LEARNER_ID, ProgressStore
+    from .spaced_repetition import DUE, apply_grades
+except ImportError:
+    from services.content_pack import load_content_pack
+    from services.progress_store import DEFAULT_LEARNER_ID, ProgressStore
+    from services.spaced_repetition import DUE, apply_grades
+
+QUIZ_ITEM_PREFIX = "quiz:"
+TERM_ITEM_PREFIX = "term:"
+
+QUALITY_CORRECT = 4
+QUALITY_MISSED = 1
+
+MAX_CACHED_LEARNERS = 1024
+
+
+def quiz_item_id(quiz_id: str, question_id: str) -> str:
+    return f"{QUIZ_ITEM_PREFIX}{quiz_id}:{question_id}"
+
+
+def term_item_id(term: str) -> str:
+    return TERM_ITEM_PREFIX + re.sub(r"[^a-z0-9]+", "-", term.casefold()).strip("-")
+
+
+_glossary_lock = Lock()
+_glossary: tuple[str, dict[str, Mapping[str, Any]], dict[str, list[str]]] | None = None
+
+
+def _glossary_index() -> tuple[dict[str, Mapping[str, Any]], dict[str, list[str]]]:
+    """Glossary terms by item id and term ids by module, per content version."""
+    global _glossary
+    pack = load_content_pack()
+    pack.check("glossary")
+
+    cached = _glossary
+    if cached is not None and cached[0] == pack.version:
+        return cached[1], cached[2]
+
+    with _glossary_lock:
+        if _glossary is None or _glossary[0] != pack.version:
+            glossary = pack.get_json("glossary")
+            terms = glossary.get("terms") if isinstance(glossary, Mapping) else None
+            by_id: dict[str, Mapping[str, Any]] = {}
+            by_module: dict[str, list[str]] = {}
+            for entry in terms if isinstance(terms, (list, tuple)) else ():
+                if not (isinstance(entry, Mapping) and isinstance(entry.get("term"), str)):
+                    continue
+                item_id = term_item_id(entry["term"])
+                by_id[item_id] = entry
+                if isinstance(entry.get("module"), str):
+                    by_module.setdefault(entry["module"], []).append(item_id)
+            _glossary = (pack.version, by_id, by_module)
+        return _glossary[1], _glossary[2]
+
+
+def module_term_ids(module_id: str) -> list[str]:
+    return list(_glossary_index()[1].get(module_id, ()))
+
+
+def _answer_text(question: Mapping[str, Any]) -> str | None:
+    options = question.get("options")
+    options = options if isinstance(options, (list, tuple)) else ()
+    q_type = question.get("type")
+    if q_type == "multiple_choice":
+        index = question.get("correctIndex")
+        if isinstance(index, int) and 0 <= index < len(options):
+            return str(options[index])
+    elif q_type == "true_false" and isinstance(question.get("correctAnswer"), bool):
+        return "True" if question["correctAnswer"] else "False"
+    elif q_type == "multi_select" and isinstance(question.get("correctIndices"), (list, tuple)):
+        return "; ".join(
+            str(options[index])
+            for index in question["correctIndices"]
+            if isinstance(index, int) and 0 <= index < len(options)
+        )
+    return None
+
+
+def describe_item(item_id: str) -> dict[str, Any] | None:
+    """Flashcard content for a review item, or None if it is not in the course."""
+    if item_id.startswith(TERM_ITEM_PREFIX):
+        entry = _glossary_index()[0].get(item_id)
+        if entry is None:
+            return None
+        return {
+            "id": item_id,
+            "kind": "term",
+            "moduleId": entry.get("module"),
+            "front": entry["term"],
+            "back": entry.get("definition", ""),
+        }
+
+    if item_id.startswith(QUIZ_ITEM_PREFIX):
+        quiz_id, _, question_id = item_id[len(QUIZ_ITEM_PREFIX) :].partition(":")
+        pack = load_content_pack()
+        pack.check("quizzes")
+        quiz = pack.get_json(f"quiz/{quiz_id}") if quiz_id else None
+        questions = quiz.get("questions") if isinstance(quiz, Mapping) else None
+        for question in questions if isinstance(questions, (list, tuple)) else ():
+            if isinstance(question, Mapping) and question.get("id") == question_id:
+                answer = _answer_text(question)
+                explanation = str(question.get("explanation") or "")
+                return {
+                    "id": item_id,
+                    "kind": "quiz",
+                    "quizId": quiz_id,
+                    "questionId": question_id,
+                    "front": str(question.get("question") or ""),
+                    "back": f"{answer}\n\n{explanation}".strip() if answer else explanation,
+                }
+    return None
+
+
+class _LearnerQueue:
+    """Due-time heap over one learner's review items.
+
+    Rescheduling pushes a fresh ``(due, item)`` entry instead of searching
+    the heap; entries whose due time no longer matches ``dues`` are stale and
+    dropped when they surface.
+    """
+
+    __slots__ = ("stamp", "rev", "dues", "heap")
+
+    def __init__(self, stamp: Any, rev: str | None, items: Mapping[str, Any]) -> None:
+        self.stamp = stamp
+        self.rev = rev
+        self.dues = {
+            item_id: int(state[DUE])
+            for item_id, state in items.items()
+            if isinstance(state, list) and len(state) == 4
+        }
+        self.heap = [(due, item_id) for item_id, due in self.dues.items()]
+        heapq.heapify(self.heap)
+
+    def reschedule(self, item_id: str, due: int) -> None:
+        self.dues[item_id] = due
+        heapq.heappush(self.heap, (due, item_id))
+        if len(self.heap) > 2 * len(self.dues) + 16:
+            self.heap = [(due, item_id) for item_id, due in self.dues.items()]
+            heapq.heapify(self.heap)
+
+    def _is_live(self, entry: tuple[int, str]) -> bool:
+        return self.dues.get(entry[1]) == entry[0]
+
+    def due(self, now: int, limit: int) -> tuple[list[tuple[int, str]], int | None]:
+        """Up to ``limit`` due items, most overdue first, and the next due time after them."""
+        taken: list[tuple[int, str]] = []
+        while self.heap and len(taken) < limit:
+            entry = self.heap[0]
+            if not self._is_live(entry):
+                heapq.heappop(self.heap)
+                continue
+            if entry[0] > now:
+                break
+            taken.append(heapq.heappop(self.heap))
+
+        while self.heap and not self._is_live(self.heap[0]):
+            heapq.heappop(self.heap)
+        next_due = self.heap[0][0] if self.heap else None
+
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return taken, next_due
+
+
+class ReviewScheduler:
+    """Per-learner spaced-repetition queues.
+
+    Schedules are ``{rev, items}`` documents (see ``spaced_repetition``) in a
+    companion of the progress backend, so progress reads and writes never
+    carry them. This keeps a due-time heap per recently active learner so
+    asking for the next items costs ``O(limit log n)`` instead of a scan. A
+    cached heap is revalidated against the document's stamp and review
+    revision, so grades written by another worker are picked up.
+    """
+
+    def __init__(
+        self,
+        store: ProgressStore | None = None,
+        backend: Any | None = None,
+        max_learners: int = MAX_CACHED_LEARNERS,
+    ) -> None:
+        self._store = store if store is not None else ProgressStore()
+        self._backend = backend if backend is not None else self._store.backend.companion("review")
+        self._max_learners = max_learners
+        self._queues: OrderedDict[str, _LearnerQueue] = OrderedDict()
+        self._lock = Lock()
+
+    def _remember(self, learner_id: str, queue: _LearnerQueue) -> None:
+        self._queues[learner_id] = queue
+        self._queues.move_to_end(learner_id)
+        while len(self._queues) > self._max_learners:
+            self._queues.popitem(last=False)
+
+    def _current(self, learner_id: str, stored: dict[str, Any] | None) -> tuple[dict[str, Any], bool]:
+        """The learner's review document, and whether it came from their progress document."""
+        if isinstance(stored, dict):
+            return stored, False
+
+        # Schedules kept in the progress document before they had their own
+        # store are picked up from there until the first grade moves them.
+        progress = self._store.backend.read(learner_id)
+        legacy = progress.get("review") if isinstance(progress, dict) else None
+        return (legacy if isinstance(legacy, dict) else {}), isinstance(legacy, dict)
+
+    def _drop_legacy(self, learner_id: str) -> None:
+        def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any] | None, None]:
+            if not isinstance(stored, dict) or "review" not in stored:
+                return None, None
+            del stored["review"]
+            return stored, None
+
+        self._store.backend.update(learner_id, mutate)
+
+    def _queue(self, learner_id: str) -> _LearnerQueue:
+        stamp = self._backend.stamp(learner_id)
+        with self._lock:
+            queue = self._queues.get(learner_id)
+            if queue is not None and queue.stamp == stamp:
+                self._queues.move_to_end(learner_id)
+                return queue
+
+        review, _ = self._current(learner_id, self._backend.read(learner_id))
+        rev = review.get("rev") if isinstance(review.get("rev"), str) else None
+
+        with self._lock:
+            queue = self._queues.get(learner_id)
+            if queue is not None and queue.rev == rev:
+                # Another part of the document changed; the schedule did not.
+                queue.stamp = stamp
+            else:
+                items = review.get("items")
+                queue = _LearnerQueue(stamp, rev, items if isinstance(items, dict) else {})
+            self._remember(learner_id, queue)
+            return queue
+
+    def grade(
+        self,
+        grades: Sequence[tuple[str, int | None]],
+        *,
+        add_passed: bool = True,
+        now: int | None = None,
+        learner_id: str = DEFAULT_LEARNER_ID,
+    ) -> dict[str, list[int]]:
+        """Record graded answers and return the new schedule of each changed item."""
+        now = int(time.time()) if now is None else now
+        grades = list(grades)
+
+        def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any] | None, tuple[Any, ...]]:
+            review, legacy = self._current(learner_id, stored)
+            previous_rev, rev, changed = apply_grades(review, grades, now, add_passed=add_passed)
+            return (review if changed else None), (previous_rev, rev, changed, legacy)
+
+        # The stamp is taken inside the same lock or transaction as the write.
+        (previous_rev, rev, changed, legacy), stamp = self._backend.update(learner_id, mutate)
+        if not changed:
+            return changed
+        if legacy:
+            self._drop_legacy(learner_id)
+
+        with self._lock:
+            queue = self._queues.get(learner_id)
+            if queue is not None and queue.rev == previous_rev:
+                for item_id, state in changed.items():
+                    queue.reschedule(item_id, state[DUE])
+                queue.rev = rev
+                queue.stamp = stamp
+            elif queue is not None:
+                # The cached heap missed a write from elsewhere; rebuild on next read.
+                del self._queues[learner_id]
+        return changed
+
+    def record_quiz(
+        self,
+        quiz_id: str,
+        results: Sequence[Mapping[str, Any]],
+        *,
+        learner_id: str = DEFAULT_LEARNER_ID,
+    ) -> dict[str, list[int]]:
+        """Schedule missed quiz questions; correct answers advance items already scheduled."""
+        grades = [
+            (quiz_item_id(quiz_id, str(result["questionId"])), QUALITY_CORRECT if result.get("correct") else QUALITY_MISSED)
+            for result in results
+            if result.get("questionId") is not None
+        ]
+        return self.grade(grades, add_passed=False, learner_id=learner_id)
+
+    def introduce(self, item_ids: Sequence[str], *, learner_id: str = DEFAULT_LEARNER_ID) -> dict[str, list[int]]:
+        """Add unseen items as due now; items already scheduled keep their schedule."""
+        return self.grade([(item_id, None) for item_id in item_ids], learner_id=learner_id)
+
+    def reset(self, *, learner_id: str = DEFAULT_LEARNER_ID) -> None:
+        """Clear the learner's schedule, as a progress reset does."""
+        self._backend.update(learner_id, lambda _stored: ({"rev": secrets.token_hex(4), "items": {}}, None))
+        with self._lock:
+            self._queues.pop(learner_id, None)
+
+    def next_due(
+        self,
+        limit: int,
+        *,
+        now: int | None = None,
+        learner_id: str = DEFAULT_LEARNER_ID,
+    ) -> tuple[list[tuple[int, str]], int | None]:
+        now = int(time.time()) if now is None else now
+        queue = self._queue(learner_id)
+        with self._lock:
+            return queue.due(now, limit)
+
+
+review_scheduler = ReviewScheduler()
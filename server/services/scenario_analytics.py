@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+
+try:
+    from .counter_store import CounterStore, default_analytics_dir
+except ImportError:
+    from services.counter_store import CounterStore, default_analytics_dir
+
+FLUSH_EVERY_CHOICES = 100
+FLUSH_INTERVAL_SECONDS = 30.0
+
+
+class _ScenarioLayout:
+    __slots__ = ("signature", "step_ids", "step_index", "max_choices")
+
+    def __init__(self, scenario: Mapping[str, Any]) -> None:
+        steps = [step for step in scenario.get("steps", ()) if isinstance(step, Mapping)]
+        self.step_ids = [str(step.get("id")) for step in steps]
+        self.step_index = {step_id: index for index, step_id in enumerate(self.step_ids)}
+        choice_counts = [len(step["choices"]) if isinstance(step.get("choices"), (list, tuple)) else 0 for step in steps]
+        self.max_choices = max(choice_counts, default=0)
+        signature = "|".join(f"{step_id}:{count}" for step_id, count in zip(self.step_ids, choice_counts))
+        self.signature = hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+    def zeros(self) -> dict[str, np.ndarray]:
+        step_count = len(self.step_ids)
+        return {
+            "choices": np.zeros((step_count, self.max_choices), dtype=np.int64),
+            # The extra column counts choices that ended the scenario.
+            "transitions": np.zeros((step_count, step_count + 1), dtype=np.int64),
+        }
+
+
+class _ThreadCounters:
+    __slots__ = ("arrays", "flushed")
+
+    def __init__(self) -> None:
+        self.arrays: dict[str, dict[str, np.ndarray]] = {}
+        self.flushed: dict[str, dict[str, np.ndarray]] = {}
+
+
+class ScenarioPathAnalytics:
+    def __init__(
+        self,
+        store: CounterStore | None = None,
+        flush_every: int = FLUSH_EVERY_CHOICES,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ) -> None:
+        self._store = store if store is not None else CounterStore(default_analytics_dir() / "scenarios")
+        self._flush_every = flush_every
+        self._flush_interval = flush_interval
+        self._layouts: dict[str, _ScenarioLayout] = {}
+        self._local = threading.local()
+        self._thread_counters: list[_ThreadCounters] = []
+        self._registry_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._recorded = itertools.count(1)
+        self._last_flush = time.monotonic()
+
+    def _layout_for(self, scenario_id: str, scenario: Mapping[str, Any]) -> _ScenarioLayout:
+        layout = self._layouts.get(scenario_id)
+        if layout is None:
+            layout = _ScenarioLayout(scenario)
+            self._layouts[scenario_id] = layout
+        return layout
+
+    def _local_counters(self) -> _ThreadCounters:
+        counters = getattr(self._local, "counters", None)
+        if counters is None:
+            counters = _ThreadCounters()
+            self._local.counters = counters
+            with self._registry_lock:
+                self._thread_counters.append(counters)
+        return counters
+
+    def record(
+        self,
+        scenario_id: str,
+        scenario: Mapping[str, Any],
+        step_id: str,
+        choice_index: int,
+        next_step_id: str | None,
+    ) -> None:
+        layout = self._layout_for(scenario_id, scenario)
+        row = layout.step_index.get(step_id)
+        if row is None or not 0 <= choice_index < layout.max_choices:
+            return
+
+        target = len(layout.step_ids) if next_step_id is None else layout.step_index.get(next_step_id)
+        if target is None:
+            return
+
+        # Each thread increments only its own arrays, so the hot path takes no
+        # lock; flushes and queries sum across threads.
+        counters = self._local_counters()
+        arrays = counters.arrays.get(scenario_id)
+        if arrays is None:
+            arrays = layout.zeros()
+            counters.arrays[scenario_id] = arrays
+        arrays["choices"][row, choice_index] += 1
+        arrays["transitions"][row, target] += 1
+
+        if next(self._recorded) % self._flush_every == 0 or time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def _collect_deltas(
+        self,
+        scenario_id: str | None = None,
+        snapshots: list[tuple[_ThreadCounters, str, dict[str, np.ndarray]]] | None = None,
+    ) -> dict[str, dict[str, np.ndarray]]:
+        # Thread arrays only ever grow, so the delta since the last flush is
+        # their current value minus the snapshot taken then; nothing is reset
+        # underneath a thread that may be mid-increment.
+        with self._registry_lock:
+            thread_counters = list(self._thread_counters)
+
+        deltas: dict[str, dict[str, np.ndarray]] = {}
+        for counters in thread_counters:
+            for current_id, arrays in list(counters.arrays.items()):
+                if scenario_id is not None and current_id != scenario_id:
+                    continue
+
+                snapshot = {name: array.copy() for name, array in arrays.items()}
+                flushed = counters.flushed.get(current_id)
+                merged = deltas.setdefault(current_id, {name: np.zeros_like(array) for name, array in snapshot.items()})
+                for name, array in snapshot.items():
+                    merged[name] += array - flushed[name] if flushed is not None else array
+                if snapshots is not None:
+                    snapshots.append((counters, current_id, snapshot))
+
+        return deltas
+
+    def flush(self) -> None:
+        if not self._flush_lock.acquire(blocking=False):
+            return
+
+        try:
+            self._last_flush = time.monotonic()
+            snapshots: list[tuple[_ThreadCounters, str, dict[str, np.ndarray]]] = []
+            for scenario_id, arrays in self._collect_deltas(snapshots=snapshots).items():
+                layout = self._layouts.get(scenario_id)
+                if layout is not None and any(array.any() for array in arrays.values()):
+                    self._store.merge(scenario_id, layout.signature, arrays)
+                # Snapshots only advance once their counts reached the store;
+                # if a merge fails, the rest stay pending for the next flush.
+                for counters, current_id, snapshot in snapshots:
+                    if current_id == scenario_id:
+                        counters.flushed[current_id] = snapshot
+        finally:
+            self._flush_lock.release()
+
+    def heatmap(self, scenario_id: str, scenario: Mapping[str, Any]) -> dict[str, Any]:
+        layout = self._layout_for(scenario_id, scenario)
+        arrays = layout.zeros()
+
+        # A flush between the load and the delta would count its merge twice.
+        with self._flush_lock:
+            stored = self._store.load(scenario_id, layout.signature)
+            pending = self._collect_deltas(scenario_id).get(scenario_id)
+        for source in (stored, pending):
+            if source is None:
+                continue
+            for name, array in source.items():
+                if name in arrays and arrays[name].shape == array.shape:
+                    arrays[name] += array
+
+        choices = arrays["choices"]
+        visits = choices.sum(axis=1)
+        return {
+            "scenarioId": scenario_id,
+            "steps": layout.step_ids,
+            "visits": visits.tolist(),
+            "choiceCounts": choices.tolist(),
+            "transitions": {
+                "from": layout.step_ids,
+                "to": [*layout.step_ids, "end"],
+                "counts": arrays["transitions"].tolist(),
+            },
+        }
+
+
+# One set of counters per process; the choice route and the analytics API share it.
+scenario_analytics = ScenarioPathAnalytics()
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Iterator
+
+if TYPE_CHECKING:
+    # content_pack builds the index when it loads a pack, so only the type is needed here.
+    from .content_pack import ContentPack
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2
+MAX_PREFIX_EXPANSIONS = 24
+SNIPPET_CHARS = 180
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_MARKDOWN_EMPHASIS = re.compile(r"\*{1,2}|`")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _plain_text(value: Any) -> str:
+    return _MARKDOWN_EMPHASIS.sub("", value) if isinstance(value, str) else ""
+
+
+def _load_pack_json(pack: ContentPack, key: str) -> Any:
+    # Read once for indexing without pinning the parsed graph in the pack cache.
+    raw = pack.get_bytes(key)
+    return json.loads(raw) if raw is not None else None
+
+
+def _iter_lesson_documents(pack: ContentPack) -> Iterator[dict[str, Any]]:
+    for key in sorted(pack.keys("lessons/"), key=lambda item: int(item.split("/", 1)[1])):
+        lessons_data = _load_pack_json(pack, key)
+        if not isinstance(lessons_data, dict):
+            continue
+
+        for lesson in lessons_data.get("lessons", []):
+            if not isinstance(lesson, dict):
+                continue
+
+            lesson_title = _plain_text(lesson.get("title"))
+            for section_index, section in enumerate(lesson.get("sections", [])):
+                if not isinstance(section, dict):
+                    continue
+
+                text = _plain_text(section.get("content")) or _plain_text(section.get("caption"))
+                if not text:
+                    continue
+
+                section_title = _plain_text(section.get("title"))
+                yield {
+                    "kind": "lesson",
+                    "id": f"{lesson.get('id')}#{section_index}",
+                    "title": f"{lesson_title}: {section_title}" if section_title else lesson_title,
+                    "text": text,
+                    "moduleId": lesson.get("moduleId"),
+                    "lessonId": lesson.get("id"),
+                    "sectionIndex": section_index,
+                }
+
+
+def _iter_glossary_documents(pack: ContentPack) -> Iterator[dict[str, Any]]:
+    glossary = _load_pack_json(pack, "glossary")
+    terms = glossary.get("terms") if isinstance(glossary, dict) else None
+    if not isinstance(terms, list):
+        return
+
+    for term in terms:
+        if not isinstance(term, dict) or not isinstance(term.get("term"), str):
+            continue
+
+        yield {
+            "kind": "glossary",
+            "id": term["term"],
+            "title": term["term"],
+            "text": _plain_text(term.get("definition")),
+            "moduleId": term.get("module"),
+        }
+
+
+def _iter_scenario_documents(pack: ContentPack) -> Iterator[dict[str, Any]]:
+    for key in sorted(pack.keys("scenario/")):
+        scenario = _load_pack_json(pack, key)
+        if not isinstance(scenario, dict):
+            continue
+
+        scenario_id = key.split("/", 1)[1]
+        scenario_title = _plain_text(scenario.get("title"))
+        context = _plain_text(scenario.get("context"))
+        if context:
+            yield {
+                "kind": "scenario",
+                "id": scenario_id,
+                "title": scenario_title,
+                "text": context,
+                "moduleId": scenario.get("moduleId"),
+                "scenarioId": scenario_id,
+                "stepId": None,
+            }
+
+        for step in scenario.get("steps", []):
+            if not isinstance(step, dict):
+                continue
+
+            narrative = _plain_text(step.get("narrative"))
+            if not narrative:
+                continue
+
+            yield {
+                "kind": "scenario",
+                "id": f"{scenario_id}#{step.get('id')}",
+                "title": scenario_title,
+                "text": narrative,
+                "moduleId": scenario.get("moduleId"),
+                "scenarioId": scenario_id,
+                "stepId": step.get("id"),
+            }
+
+
+class SearchIndex:
+    def __init__(self, documents: list[dict[str, Any]], version: str = "") -> None:
+        self.version = version
+        self._documents = documents
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._doc_lengths: list[int] = []
+
+        for doc_id, document in enumerate(documents):
+            body_tokens = tokenize(document["text"])
+            frequencies = Counter(body_tokens)
+            for token in tokenize(document["title"]):
+                frequencies[token] += TITLE_WEIGHT
+
+            self._doc_lengths.append(len(body_tokens) + TITLE_WEIGHT * len(tokenize(document["title"])))
+            for token, frequency in frequencies.items():
+                self._postings.setdefault(token, []).append((doc_id, frequency))
+
+        self._vocabulary = sorted(self._postings)
+        self._average_length = sum(self._doc_lengths) / len(self._doc_lengths) if self._doc_lengths else 0.0
+        self._idf = {
+            token: math.log(1 + (len(documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self._postings.items()
+        }
+
+    @classmethod
+    def from_content_pack(cls, pack: ContentPack) -> SearchIndex:
+        documents = [
+            *_iter_lesson_documents(pack),
+            *_iter_glossary_documents(pack),
+            *_iter_scenario_documents(pack),
+        ]
+        return cls(documents, version=pack.version)
+
+    @property
+    def document_count(self) -> int:
+        return len(self._documents)
+
+    def _expand_prefix(self, prefix: str, limit: int = MAX_PREFIX_EXPANSIONS) -> list[str]:
+        """The ``limit`` tokens starting with ``prefix`` found in the most documents."""
+        start = bisect_left(self._vocabulary, prefix)
+        end = start
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(prefix):
+            end += 1
+        return heapq.nsmallest(
+            limit,
+            self._vocabulary[start:end],
+            key=lambda token: (-len(self._postings[token]), token),
+        )
+
+    def _query_terms(self, query: str, prefix: bool) -> list[list[str]]:
+        # Each group is scored as one query term; a prefix-expanded last token
+        # contributes its best-matching expansion rather than the sum of all.
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        groups = [[token] for token in dict.fromkeys(tokens[:-1]) if token in self._postings]
+        last = tokens[-1]
+        if prefix:
+            expansions = self._expand_prefix(last)
+            if expansions:
+                groups.append(expansions)
+        elif last in self._postings:
+            groups.append([last])
+
+        return groups
+
+    def _snippet(self, text: str, terms: list[str]) -> tuple[str, list[list[int]]]:
+        term_set = set(terms)
+        matches = [match for match in _TOKEN_PATTERN.finditer(text.lower()) if match.group() in term_set]
+
+        start = 0
+        if matches:
+            start = max(0, matches[0].start() - SNIPPET_CHARS // 3)
+            if start > 0:
+                boundary = text.find(" ", start)
+                start = boundary + 1 if 0 <= boundary < matches[0].start() else start
+        end = min(len(text), start + SNIPPET_CHARS)
+        if end < len(text):
+            boundary = text.rfind(" ", start, end)
+            end = boundary if boundary > start else end
+
+        snippet = text[start:end].replace("\n", " ")
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(text) else ""
+        highlights = [
+            [match.start() - start + len(prefix), match.end() - start + len(prefix)]
+            for match in matches
+            if match.start() >= start and match.end() <= end
+        ]
+        return f"{prefix}{snippet}{suffix}", highlights
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        kind: str | None = None,
+        prefix: bool = True,
+    ) -> dict[str, Any]:
+        groups = self._query_terms(query, prefix)
+        terms = [term for group in groups for term in group]
+        scores: dict[int, float] = {}
+
+        for group in groups:
+            group_scores: dict[int, float] = {}
+            for term in group:
+                idf = self._idf[term]
+                for doc_id, frequency in self._postings[term]:
+                    length_norm = 1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / self._average_length
+                    term_score = idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                    if term_score > group_scores.get(doc_id, 0.0):
+                        group_scores[doc_id] = term_score
+
+            for doc_id, term_score in group_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + term_score
+
+        if kind is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if self._documents[doc_id]["kind"] == kind}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results: list[dict[str, Any]] = []
+        for doc_id, score in ranked:
+            document = self._documents[doc_id]
+            snippet, highlights = self._snippet(document["text"], terms)
+            result = {key: value for key, value in document.items() if key != "text"}
+            result["score"] = round(score, 4)
+            result["snippet"] = snippet
+            result["highlights"] = highlights
+            results.append(result)
+
+        return {"query": query, "total": len(scores), "results": results}
+
+    def suggest(self, query: str, limit: int = 8) -> list[str]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        head = " ".join(tokens[:-1])
+        return [f"{head} {token}".strip() for token in self._expand_prefix(tokens[-1], limit=limit)]
+
+
+_INDEX_LOCK = Lock()
+
+
+def get_search_index(pack: ContentPack) -> SearchIndex:
+    # load_content_pack builds the index with the pack; packs opened
+    # directly get theirs on first use.
+    if pack.search_index is None:
+        with _INDEX_LOCK:
+            if pack.search_index is None:
+                pack.search_index = SearchIndex.from_content_pack(pack)
+    return pack.search_index
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import secrets
+from collections.abc import Iterable
+from typing import Any
+
+# Stored per item as [due (epoch seconds), interval (days), ease x 100, repetitions]
+# so a learner's whole review state is a few dozen bytes per item.
+DUE, INTERVAL, EASE, REPS = range(4)
+
+DEFAULT_EASE = 250
+MIN_EASE = 130
+PASSING_QUALITY = 3
+DAY_SECONDS = 86_400
+
+
+def new_item(due: int = 0) -> list[int]:
+    return [due, 0, DEFAULT_EASE, 0]
+
+
+def sm2(state: list[int], quality: int, now: int) -> list[int]:
+    """One SuperMemo-2 review: quality 0-5, where 3 and above is a pass."""
+    _, interval, ease, reps = state
+    quality = max(0, min(5, quality))
+
+    if quality < PASSING_QUALITY:
+        reps = 0
+        interval = 1
+    else:
+        reps += 1
+        if reps == 1:
+            interval = 1
+        elif reps == 2:
+            interval = 6
+        else:
+            interval = max(1, round(interval * ease / 100))
+
+    penalty = 5 - quality
+    ease = max(MIN_EASE, ease + 10 - penalty * (8 + penalty * 2))
+    return [now + interval * DAY_SECONDS, interval, ease, reps]
+
+
+def apply_grades(
+    review: dict[str, Any],
+    grades: Iterable[tuple[str, int | None]],
+    now: int,
+    *,
+    add_passed: bool = True,
+) -> tuple[str | None, str, dict[str, list[int]]]:
+    """Apply graded answers to a learner's review document, ``{rev, items}``.
+
+    Items not yet scheduled are added, unless ``add_passed`` is false and the
+    answer passed (quiz answers only start a schedule when missed). A quality
+    of None introduces an unseen item as due now and leaves known ones alone.
+    Returns the previous revision token, the new one and the changed items.
+    """
+    items = review.get("items")
+    if not isinstance(items, dict):
+        items = {}
+        review["items"] = items
+
+    changed: dict[str, list[int]] = {}
+    for item_id, quality in grades:
+        state = items.get(item_id)
+        known = isinstance(state, list) and len(state) == 4
+        if quality is None:
+            if not known:
+                items[item_id] = changed[item_id] = new_item(now)
+            continue
+        if not known:
+            if not add_passed and quality >= PASSING_QUALITY:
+                continue
+            state = new_item()
+        items[item_id] = changed[item_id] = sm2(state, quality, now)
+
+    previous_rev = review.get("rev") if isinstance(review.get("rev"), str) else None
+    if changed:
+        review["rev"] = secrets.token_hex(4)
+    return previous_rev, review.get("rev") or "", changed
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+from pathlib import Path
+from threading import Lock
+from urllib.parse import unquote
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available.
+    brotli = None
+
+
+MAX_MEMORY_FILE_BYTES = 2 * 1024 * 1024
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# (encoding, sibling file suffix) in server preference order.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+
+def _is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _compress(encoding: str, data: bytes, *, build: bool) -> bytes | None:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == "br" and brotli is not None:
+        # Maximum quality is slow enough that it belongs in the build step.
+        return brotli.compress(data, quality=11 if build else 5)
+    return None
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted: set[str] = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class _Asset:
+    __slots__ = ("path", "media_type", "size", "etag", "cache_control", "body", "variants")
+
+    def __init__(self, path: Path, relative: str, data: bytes | None, size: int, digest: str) -> None:
+        self.path = path
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type == "application/javascript":
+            self.media_type += "; charset=utf-8"
+        self.size = size
+        self.etag = f'"{digest}"'
+        # Vite puts content-hashed filenames under assets/; anything else
+        # keeps a stable name and must be revalidated.
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if relative.startswith("assets/") else REVALIDATE_CACHE_CONTROL
+        self.body = data
+        self.variants: dict[str, bytes] = {}
+
+
+class StaticAssets:
+    """ASGI app serving the built client from an in-memory index.
+
+    The directory is indexed once, at startup via ``load`` or else on the
+    first request. Files up to
+    ``MAX_MEMORY_FILE_BYTES`` are kept in memory together with gzip and
+    (when the ``brotli`` package is installed) brotli variants, preferring
+    ``.gz``/``.br`` siblings written by ``python -m server.services.static_assets``.
+    Client-side routes fall back to ``index.html``; missing files that look
+    like assets are a plain 404.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._assets: dict[str, _Asset] | None = None
+        self._index_lock = Lock()
+
+    def load(self) -> int:
+        """Index the directory now instead of on the first request."""
+        return len(self._index())
+
+    def _index(self) -> dict[str, _Asset]:
+        if self._assets is not None:
+            return self._assets
+
+        with self._index_lock:
+            if self._assets is None:
+                if not self._directory.is_dir():
+                    # The client may not be built yet; try again next request.
+                    return {}
+                self._assets = self._build_index()
+        return self._assets
+
+    def _build_index(self) -> dict[str, _Asset]:
+        assets: dict[str, _Asset] = {}
+        for path in sorted(self._directory.rglob("*")):
+            if not path.is_file() or path.suffix in (".gz", ".br"):
+                continue
+
+            relative = path.relative_to(self._directory).as_posix()
+            size = path.stat().st_size
+            if size > MAX_MEMORY_FILE_BYTES:
+                digest = hashlib.blake2b(f"{relative}:{size}:{path.stat().st_mtime_ns}".encode(), digest_size=8)
+                assets[relative] = _Asset(path, relative, None, size, digest.hexdigest())
+                continue
+
+            data = path.read_bytes()
+            asset = _Asset(path, relative, data, size, hashlib.blake2b(data, digest_size=8).hexdigest())
+            if size >= MIN_COMPRESS_BYTES and _is_compressible(asset.media_type):
+                for encoding, suffix in ENCODINGS:
+                    sibling = path.with_name(path.name + suffix)
+                    if sibling.is_file() and sibling.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+                        compressed = sibling.read_bytes()
+                    else:
+                        compressed = _compress(encoding, data, build=False)
+                    if compressed is not None and len(compressed) < size * 0.9:
+                        asset.variants[encoding] = compressed
+            assets[relative] = asset
+
+        return assets
+
+    def _lookup(self, request_path: str) -> _Asset | None:
+        assets = self._index()
+        relative = posixpath.normpath(unquote(request_path)).lstrip("/")
+        if relative in ("", "."):
+            relative = "index.html"
+
+        asset = assets.get(relative) or assets.get(f"{relative}/index.html")
+        if asset is not None:
+            return asset
+
+        # Only extensionless paths outside the API and asset folders are
+        # client routes; a missing /assets/app.js must not return HTML.
+        last_segment = relative.rsplit("/", 1)[-1]
+        if relative.startswith(("api/", "assets/")) or relative == "api" or "." in last_segment:
+            return None
+        return assets.get("index.html")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            raise RuntimeError("StaticAssets only handles HTTP requests")
+
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            response: Response = Response("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+            await response(scope, receive, send)
+            return
+
+        asset = self._lookup(scope["path"])
+        if asset is None:
+            response = Response('{"detail":"Not Found"}', status_code=404, media_type="application/json")
+            await response(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        body = asset.body
+        etag = asset.etag
+        headers = {"Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, _suffix in ENCODINGS:
+                if encoding in asset.variants and encoding in accepted:
+                    body = asset.variants[encoding]
+                    # Each encoding is a distinct representation for caches.
+                    etag = f'{asset.etag[:-1]}-{encoding}"'
+                    headers["Content-Encoding"] = encoding
+                    break
+        headers["ETag"] = etag
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+            headers.pop("Content-Encoding", None)
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        if body is None:
+            response = FileResponse(asset.path, headers=headers, media_type=asset.media_type, method=method)
+            await response(scope, receive, send)
+            return
+
+        headers["Content-Length"] = str(len(body))
+        response = Response(b"" if method == "HEAD" else body, headers=headers, media_type=asset.media_type)
+        await response(scope, receive, send)
+
+
+def precompress(directory: Path) -> int:
+    """Write .gz and .br siblings next to every compressible built file."""
+    written = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix in (".gz", ".br"):
+            continue
+        media_type = mimetypes.guess_type(path.name)[0] or ""
+        if not _is_compressible(media_type) or path.stat().st_size < MIN_COMPRESS_BYTES:
+            continue
+
+        data = path.read_bytes()
+        for encoding, suffix in ENCODINGS:
+            compressed = _compress(encoding, data, build=True)
+            if compressed is None:
+                continue
+            sibling = path.with_name(path.name + suffix)
+            temp_path = sibling.with_name(f".{sibling.name}.tmp")
+            temp_path.write_bytes(compressed)
+            os.replace(temp_path, sibling)
+            written += 1
+
+    return written
+
+
+def main(argv: list[str] | None = None) -> None:
+    default_dir = Path(__file__).resolve().parent.parent.parent / "client" / "dist"
+    parser = argparse.ArgumentParser(description="Precompress the built client bundle.")
+    parser.add_argument("directory", type=Path, nargs="?", default=default_dir)
+    args = parser.parse_args(argv)
+
+    written = precompress(args.directory)
+    note = "" if brotli is not None else " (install brotli for .br variants)"
+    print(f"Wrote {written} compressed files under {args.directory}{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,134 @@
 from __future__ import annotations
 
 import io
+import os
+import re
 import wave
+from collections import OrderedDict
+from collections.abc import Iterator
+from importlib import metadata
 from threading import Lock
+from typing import Any
+
+try:
+    from .phoneme_cache import PhonemeCache
+    from .time_stretch import DEFAULT_STRETCH_QUALITY, STRETCH_QUALITIES, stretch_pcm
+    from .tts_sidecar import (
+        TtsSidecarClient,
+        TtsSidecarRemoteError,
+        TtsSidecarTimeoutError,
+        TtsSidecarUnavailableError,
+    )
+except ImportError:
+    from services.phoneme_cache import PhonemeCache
+    from services.time_stretch import DEFAULT_STRETCH_QUALITY, STRETCH_QUALITIES, stretch_pcm
+    from services.tts_sidecar import (
+        TtsSidecarClient,
+        TtsSidecarRemoteError,
+        TtsSidecarTimeoutError,
+        TtsSidecarUnavailableError,
+    )
+
+# Kokoro's model accepts at most this many phonemes per inference call.
+MAX_PHONEMES_PER_CHUNK = 510
+SEGMENT_SPLIT_PATTERN = r"\n+"
+
+SPEED_VARIANT_MODES = ("synthesize", "stretch")
+DEFAULT_BASE_CACHE_MB = 64
+
+
+def _g2p_namespace() -> str:
+    versions = []
+    for package in ("kokoro", "misaki"):
+        try:
+            versions.append(f"{package}-{metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}-unknown")
+    return "/".join(versions)
 
 
 class KokoroSynthesisError(RuntimeError):
     """Raised when Kokoro cannot synthesize audio."""
 
 
+class KokoroUnavailableError(KokoroSynthesisError):
+    """Raised when the TTS sidecar cannot serve a request and there is no fallback."""
+
+    def __init__(self, message: str, status_code: int = 503) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _RenditionCache:
+    """LRU of 1.0x PCM renditions keyed by voice and text, bounded in bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, voice: str, text: str) -> Any | None:
+        with self._lock:
+            pcm = self._entries.get((voice, text))
+            if pcm is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((voice, text))
+            self.hits += 1
+            return pcm
+
+    def put(self, voice: str, text: str, pcm: Any) -> None:
+        if pcm.nbytes > self._max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((voice, text), None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[(voice, text)] = pcm
+            self._bytes += pcm.nbytes
+            while self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
 class KokoroService:
     sample_rate = 24_000
+    lang_code = "a"
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        phoneme_cache: PhonemeCache | None = None,
+        sidecar: TtsSidecarClient | None = None,
+        local_fallback: bool = True,
+        speed_variants: str | None = None,
+        stretch_quality: str | None = None,
+    ) -> None:
         self._pipeline = None
         self._pipeline_lock = Lock()
+        self._phoneme_cache = phoneme_cache
+        self._sidecar = sidecar
+        self._local_fallback = local_fallback
+        # "stretch" renders each text once at 1.0x and derives other speeds
+        # from that rendition by time-stretching instead of re-running the model.
+        self._speed_variants = speed_variants or os.environ.get("RMF_TTS_SPEED_VARIANTS", "synthesize")
+        self._stretch_quality = stretch_quality or os.environ.get("RMF_TTS_STRETCH_QUALITY", DEFAULT_STRETCH_QUALITY)
+        if self._speed_variants not in SPEED_VARIANT_MODES:
+            raise ValueError(f"RMF_TTS_SPEED_VARIANTS must be one of {', '.join(SPEED_VARIANT_MODES)}")
+        if self._stretch_quality not in STRETCH_QUALITIES:
+            raise ValueError(f"RMF_TTS_STRETCH_QUALITY must be one of {', '.join(STRETCH_QUALITIES)}")
+        self._renditions = _RenditionCache(
+            int(float(os.environ.get("RMF_TTS_BASE_CACHE_MB", DEFAULT_BASE_CACHE_MB)) * 1024 * 1024)
+        )
+
+    @property
+    def mode(self) -> str:
+        return "sidecar" if self._sidecar is not None else "in-process"
+
+    def preload(self) -> None:
+        self._get_pipeline()
 
     def _get_pipeline(self):
         if self._pipeline is not None:
@@ -32,7 +146,7 @@ class KokoroService:
                 ) from error
 
             try:
-                self._pipeline = KPipeline(lang_code="a", repo_id="hexgrad/Kokoro-82M")
+                self._pipeline = KPipeline(lang_code=self.lang_code, repo_id="hexgrad/Kokoro-82M")
             except Exception as error:
                 message = str(error).strip() or "Unable to initialize Kokoro."
                 if "espeak" in message.lower():
@@ -44,11 +158,76 @@ class KokoroService:
 
             return self._pipeline
 
+    def _phonemize(self, pipeline: Any, segment: str) -> tuple[str, ...]:
+        if self._phoneme_cache is None:
+            # Built on first use so workers that only talk to a sidecar never
+            # touch the phoneme cache.
+            self._phoneme_cache = PhonemeCache(namespace=_g2p_namespace())
+        cached = self._phoneme_cache.get(self.lang_code, segment)
+        if cached is not None:
+            return cached
+
+        if self.lang_code in "ab":
+            # English G2P (misaki) returns tokens that Kokoro chunks at
+            # punctuation into model-sized phoneme strings.
+            _, tokens = pipeline.g2p(segment)
+            phonemes = tuple(ps[:MAX_PHONEMES_PER_CHUNK] for _, ps, _ in pipeline.en_tokenize(tokens) if ps)
+        else:
+            ps, _ = pipeline.g2p(segment)
+            phonemes = (ps[:MAX_PHONEMES_PER_CHUNK],) if ps else ()
+
+        self._phoneme_cache.put(self.lang_code, segment, phonemes)
+        return phonemes
+
+    def _generate(self, pipeline: Any, text: str, voice: str, speed: float) -> Iterator[Any]:
+        if not hasattr(pipeline, "generate_from_tokens"):
+            # Kokoro releases before 0.9 can only synthesize from text.
+            yield from pipeline(text, voice=voice, speed=speed, split_pattern=SEGMENT_SPLIT_PATTERN)
+            return
+
+        # Same segmentation as KPipeline's own text path, but each segment is
+        # phonemized once and reused across voices and speeds.
+        for segment in re.split(SEGMENT_SPLIT_PATTERN, text):
+            if not segment.strip():
+                continue
+            for phonemes in self._phonemize(pipeline, segment):
+                yield from pipeline.generate_from_tokens(phonemes, voice=voice, speed=speed)
+
     def synthesize_wav(self, text: str, voice: str = "af_heart", speed: float = 1.0) -> bytes:
         normalized_text = text.strip()
         if not normalized_text:
             raise KokoroSynthesisError("Text cannot be empty.")
 
+        if self._sidecar is None:
+            return self._synthesize_local(normalized_text, voice, speed)
+
+        try:
+            return self._sidecar.synthesize_wav(normalized_text, voice, speed)
+        except TtsSidecarRemoteError as error:
+            raise KokoroSynthesisError(str(error)) from error
+        except TtsSidecarTimeoutError as error:
+            # A busy sidecar is not a reason to load the model in this worker.
+            raise KokoroUnavailableError(str(error), status_code=504) from error
+        except TtsSidecarUnavailableError as error:
+            if not self._local_fallback:
+                raise KokoroUnavailableError(str(error)) from error
+        return self._synthesize_local(normalized_text, voice, speed)
+
+    def _synthesize_local(self, normalized_text: str, voice: str, speed: float) -> bytes:
+        voice = voice.strip() or "af_heart"
+        if self._speed_variants == "synthesize":
+            return self.pack_wav(self._render_pcm(normalized_text, voice, speed))
+
+        pcm = self._renditions.get(voice, normalized_text)
+        if pcm is None:
+            pcm = self._render_pcm(normalized_text, voice, 1.0)
+            self._renditions.put(voice, normalized_text, pcm)
+        if abs(speed - 1.0) >= 1e-3:
+            pcm = stretch_pcm(pcm, speed, self.sample_rate, self._stretch_quality)
+        return self.pack_wav(pcm)
+
+    def _render_pcm(self, normalized_text: str, voice: str, speed: float) -> Any:
+        """Run the model and return 16-bit mono PCM as a NumPy array."""
         pipeline = self._get_pipeline()
 
         try:
@@ -57,12 +236,7 @@ class KokoroService:
             raise KokoroSynthesisError("PyTorch is required for Kokoro synthesis.") from error
 
         try:
-            generator = pipeline(
-                normalized_text,
-                voice=voice.strip() or "af_heart",
-                speed=speed,
-                split_pattern=r"\n+",
-            )
+            generator = self._generate(pipeline, normalized_text, voice, speed)
         except Exception as error:
             message = str(error).strip() or "Unable to start Kokoro synthesis."
             raise KokoroSynthesisError(message) from error
@@ -90,13 +264,14 @@ class KokoroService:
             raise KokoroSynthesisError("Kokoro returned no audio for the provided text.")
 
         merged = torch.cat(chunks).clamp(-1.0, 1.0)
-        pcm = (merged * 32767.0).to(torch.int16).numpy().tobytes()
+        return (merged * 32767.0).to(torch.int16).numpy()
 
+    def pack_wav(self, pcm: Any) -> bytes:
         buffer = io.BytesIO()
         with wave.open(buffer, "wb") as wav_file:
             wav_file.setnchannels(1)
             wav_file.setsampwidth(2)
             wav_file.setframerate(self.sample_rate)
-            wav_file.writeframes(pcm)
+            wav_file.writeframes(pcm.tobytes())
 
         return buffer.getvalue()
@@ -0,0 +1,279 @@
+"""Out-of-process Kokoro synthesis shared by every web worker.
+
+Run one sidecar that owns the model, then point the workers at it:
+
+    python -m server.services.tts_sidecar --listen unix:/tmp/rmf-tts.sock
+    RMF_TTS_SIDECAR=unix:/tmp/rmf-tts.sock uvicorn server.main:app --workers 4
+
+Frames are ``!IIB`` (payload length, request id, kind) followed by the
+payload. Requests carry JSON; replies carry WAV bytes or an error message and
+may arrive in any order, so one connection multiplexes every request a
+worker has in flight.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+
+FRAME_HEADER = struct.Struct("!IIB")
+FRAME_REQUEST = 1
+FRAME_AUDIO = 2
+FRAME_ERROR = 3
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+DEFAULT_TIMEOUT_SECONDS = 60.0
+CONNECT_TIMEOUT_SECONDS = 1.0
+
+
+class TtsSidecarError(RuntimeError):
+    """Base class for sidecar failures."""
+
+
+class TtsSidecarUnavailableError(TtsSidecarError):
+    """Raised when the sidecar cannot be reached or the connection drops."""
+
+
+class TtsSidecarTimeoutError(TtsSidecarError):
+    """Raised when the sidecar does not answer within the client timeout."""
+
+
+class TtsSidecarRemoteError(TtsSidecarError):
+    """Raised when the sidecar reports that synthesis failed."""
+
+
+def parse_address(address: str) -> tuple[socket.AddressFamily, Any]:
+    """``unix:/path/to.sock``, ``tcp:host:port`` or bare ``host:port``."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    if address.startswith("tcp:"):
+        address = address[len("tcp:") :]
+    host, separator, port = address.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Invalid TTS sidecar address: {address!r}")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def encode_frame(kind: int, request_id: int, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload), request_id, kind) + payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(min(size - len(chunks), 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("TTS sidecar closed the connection")
+        chunks += chunk
+    return bytes(chunks)
+
+
+class TtsSidecarClient:
+    """Thread-safe client that multiplexes requests over one connection.
+
+    A reader thread completes each caller's future as its reply arrives. If
+    the connection drops, every pending request fails with
+    ``TtsSidecarUnavailableError`` and the next call reconnects.
+    """
+
+    def __init__(self, address: str, timeout: float = DEFAULT_TIMEOUT_SECONDS) -> None:
+        self._family, self._address = parse_address(address)
+        self._timeout = timeout
+        self._sock: socket.socket | None = None
+        self._connect_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending: dict[int, Future[tuple[int, bytes]]] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _connection(self) -> socket.socket:
+        sock = self._sock
+        if sock is not None:
+            return sock
+
+        with self._connect_lock:
+            if self._sock is not None:
+                return self._sock
+            sock = socket.socket(self._family, socket.SOCK_STREAM)
+            sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+            try:
+                sock.connect(self._address)
+            except OSError as error:
+                sock.close()
+                raise TtsSidecarUnavailableError(f"TTS sidecar is not reachable: {error}") from error
+            sock.settimeout(None)
+            self._sock = sock
+            threading.Thread(target=self._read_loop, args=(sock,), name="tts-sidecar-reader", daemon=True).start()
+            return sock
+
+    def _drop(self, sock: socket.socket, reason: str) -> None:
+        with self._connect_lock:
+            if self._sock is sock:
+                self._sock = None
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(TtsSidecarUnavailableError(reason))
+
+    def _read_loop(self, sock: socket.socket) -> None:
+        try:
+            while True:
+                size, request_id, kind = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+                if size > MAX_FRAME_BYTES:
+                    raise ConnectionError(f"TTS sidecar frame of {size} bytes exceeds the limit")
+                payload = _recv_exact(sock, size)
+                with self._pending_lock:
+                    future = self._pending.pop(request_id, None)
+                # Replies to requests that already timed out are dropped.
+                if future is not None and not future.done():
+                    future.set_result((kind, payload))
+        except (OSError, ConnectionError, struct.error) as error:
+            self._drop(sock, str(error) or "TTS sidecar connection lost")
+
+    def synthesize_wav(self, text: str, voice: str, speed: float) -> bytes:
+        sock = self._connection()
+        request_id = next(self._ids) & 0xFFFFFFFF
+        future: Future[tuple[int, bytes]] = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+
+        payload = json.dumps({"text": text, "voice": voice, "speed": speed}).encode("utf-8")
+        try:
+            with self._send_lock:
+                sock.sendall(encode_frame(FRAME_REQUEST, request_id, payload))
+        except OSError as error:
+            self._drop(sock, f"TTS sidecar connection lost: {error}")
+
+        try:
+            kind, reply = future.result(timeout=self._timeout)
+        except FutureTimeoutError as error:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise TtsSidecarTimeoutError(f"TTS sidecar did not respond within {self._timeout:g}s") from error
+
+        if kind == FRAME_AUDIO:
+            return reply
+        raise TtsSidecarRemoteError(reply.decode("utf-8", errors="replace"))
+
+    def close(self) -> None:
+        sock = self._sock
+        if sock is not None:
+            self._drop(sock, "TTS sidecar client closed")
+
+
+def sidecar_client_from_env() -> TtsSidecarClient | None:
+    """The sidecar is opt-in: it is used only when RMF_TTS_SIDECAR is set."""
+    address = os.environ.get("RMF_TTS_SIDECAR")
+    if not address:
+        return None
+    return TtsSidecarClient(address, timeout=float(os.environ.get("RMF_TTS_TIMEOUT", DEFAULT_TIMEOUT_SECONDS)))
+
+
+async def _serve_connection(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    service: Any,
+    executor: ThreadPoolExecutor,
+) -> None:
+    loop = asyncio.get_running_loop()
+    write_lock = asyncio.Lock()
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def handle(request_id: int, payload: bytes) -> None:
+        try:
+            request = json.loads(payload)
+            audio = await loop.run_in_executor(
+                executor,
+                service.synthesize_wav,
+                str(request["text"]),
+                str(request.get("voice") or "af_heart"),
+                float(request.get("speed", 1.0)),
+            )
+            frame = encode_frame(FRAME_AUDIO, request_id, audio)
+        except Exception as error:
+            message = str(error).strip() or "Kokoro failed while generating audio."
+            frame = encode_frame(FRAME_ERROR, request_id, message.encode("utf-8"))
+
+        async with write_lock:
+            writer.write(frame)
+            await writer.drain()
+
+    try:
+        while True:
+            size, request_id, kind = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+            if size > MAX_FRAME_BYTES:
+                break
+            payload = await reader.readexactly(size)
+            if kind != FRAME_REQUEST:
+                continue
+            task = asyncio.create_task(handle(request_id, payload))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+
+async def serve(address: str, service: Any, threads: int) -> None:
+    family, bind_address = parse_address(address)
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="tts-synthesis")
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await _serve_connection(reader, writer, service, executor)
+
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.unlink(bind_address)
+        server = await asyncio.start_unix_server(on_connection, path=bind_address)
+    else:
+        server = await asyncio.start_server(on_connection, host=bind_address[0], port=bind_address[1])
+
+    print(f"TTS sidecar listening on {address} with {threads} synthesis thread(s)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    try:
+        from .tts_kokoro import KokoroService
+    except ImportError:
+        from services.tts_kokoro import KokoroService
+
+    parser = argparse.ArgumentParser(description="Serve Kokoro synthesis to the web workers.")
+    parser.add_argument("--listen", default=os.environ.get("RMF_TTS_SIDECAR", "unix:/tmp/rmf-tts.sock"))
+    parser.add_argument("--threads", type=int, default=1, help="concurrent synthesis calls")
+    parser.add_argument("--preload", action="store_true", help="load the model before accepting connections")
+    args = parser.parse_args(argv)
+
+    service = KokoroService()
+    if args.preload:
+        service.preload()
+    try:
+        asyncio.run(serve(args.listen, service, args.threads))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+
+from server.services.progress_events import ProgressEventBroker
+from server.services.progress_store import FileProgressBackend, ProgressStore
+from server.services.redis_progress import MemoryRedis, RedisProgressBackend
+
+
+@pytest.fixture(params=["file", "memory"])
+def progress_store(request: pytest.FixtureRequest, tmp_path) -> ProgressStore:
+    """A progress store on each backend, with its own events broker."""
+    if request.param == "file":
+        backend = FileProgressBackend(tmp_path / "progress", shard_count=4)
+    else:
+        backend = RedisProgressBackend(MemoryRedis(), shard_count=4)
+    return ProgressStore(events=ProgressEventBroker(), progress_dir=tmp_path / "progress", backend=backend)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from server.services.admission import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejectedError,
+    RouteClass,
+    admission_controller_from_env,
+)
+
+
+def _controller(*route_classes: RouteClass, capacity: int = 1, **options: float) -> AdmissionController:
+    return AdmissionController([RouteClass("default", PRIORITY_LOW), *route_classes], [], capacity=capacity, **options)
+
+
+def test_request_over_capacity_queues_until_a_slot_is_released() -> None:
+    async def scenario() -> None:
+        controller = _controller()
+        default = controller.classes["default"]
+        await controller.acquire(default)
+
+        waiting = asyncio.ensure_future(controller.acquire(default))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        assert controller.stats["default"]["queued"] == 1
+
+        controller.release(default)
+        await asyncio.wait_for(waiting, 1)
+        assert controller.stats["default"]["admitted"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_higher_priority_waiters_are_granted_first() -> None:
+    async def scenario() -> None:
+        controller = _controller(RouteClass("progress", PRIORITY_HIGH))
+        default, progress = controller.classes["default"], controller.classes["progress"]
+        await controller.acquire(default)
+
+        low = asyncio.ensure_future(controller.acquire(default))
+        await asyncio.sleep(0)
+        high = asyncio.ensure_future(controller.acquire(progress))
+        await asyncio.sleep(0)
+
+        controller.release(default)
+        await asyncio.wait_for(high, 1)
+        assert not low.done()
+
+        controller.release(progress)
+        await asyncio.wait_for(low, 1)
+
+    asyncio.run(scenario())
+
+
+def test_class_concurrency_queues_even_with_spare_capacity() -> None:
+    async def scenario() -> None:
+        controller = _controller(RouteClass("tts", PRIORITY_LOW, concurrency=1), capacity=4)
+        tts, default = controller.classes["tts"], controller.classes["default"]
+        await controller.acquire(tts)
+
+        waiting = asyncio.ensure_future(controller.acquire(tts))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        await asyncio.wait_for(controller.acquire(default), 1)
+
+        controller.release(tts)
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_sheds_new_requests() -> None:
+    async def scenario() -> None:
+        controller = _controller(RouteClass("tts", PRIORITY_LOW, max_queue=1, max_wait=1.0))
+        tts = controller.classes["tts"]
+        await controller.acquire(tts)
+        waiting = asyncio.ensure_future(controller.acquire(tts))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as error:
+            await controller.acquire(tts)
+
+        assert error.value.status_code == 503
+        assert error.value.retry_after == 1.0
+        assert controller.stats["tts"]["shedQueueFull"] == 1
+        controller.release(tts)
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(scenario())
+
+
+def test_waiter_past_its_budget_is_shed_and_leaves_the_queue() -> None:
+    async def scenario() -> None:
+        controller = _controller(RouteClass("tts", PRIORITY_LOW, max_wait=0.01))
+        tts = controller.classes["tts"]
+        await controller.acquire(tts)
+
+        with pytest.raises(AdmissionRejectedError) as error:
+            await controller.acquire(tts)
+
+        assert error.value.status_code == 503
+        assert controller.stats["tts"]["shedTimeout"] == 1
+        # The timed-out waiter does not take the released slot.
+        controller.release(tts)
+        await asyncio.wait_for(controller.acquire(tts), 1)
+        assert controller.stats["tts"]["admitted"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_rate_limit_is_per_learner_within_an_address() -> None:
+    controller = _controller(rate_per_second=0.001, burst=2)
+    default = controller.classes["default"]
+    controller.check_rate("10.0.0.1", "alice", default)
+    controller.check_rate("10.0.0.1", "alice", default)
+
+    with pytest.raises(AdmissionRejectedError) as error:
+        controller.check_rate("10.0.0.1", "alice", default)
+
+    assert error.value.status_code == 429
+    assert error.value.retry_after > 0
+    assert controller.stats["default"]["rateLimited"] == 1
+    controller.check_rate("10.0.0.1", "bob", default)
+    controller.check_rate("10.0.0.2", "alice", default)
+
+
+def test_address_bucket_caps_rotating_learner_ids() -> None:
+    controller = _controller(rate_per_second=0.001, burst=2, address_rate_per_second=0.001, address_burst=5)
+    default = controller.classes["default"]
+    for index in range(5):
+        controller.check_rate("10.0.0.1", f"learner-{index}", default)
+
+    with pytest.raises(AdmissionRejectedError):
+        controller.check_rate("10.0.0.1", "learner-new", default)
+    controller.check_rate("10.0.0.2", "learner-new", default)
+
+
+def test_rejection_by_the_learner_bucket_refunds_the_address() -> None:
+    controller = _controller(rate_per_second=0.001, burst=1, address_rate_per_second=0.001, address_burst=2)
+    default = controller.classes["default"]
+    controller.check_rate("10.0.0.1", "alice", default)
+    for _ in range(3):
+        with pytest.raises(AdmissionRejectedError):
+            controller.check_rate("10.0.0.1", "alice", default)
+
+    controller.check_rate("10.0.0.1", "bob", default)
+
+
+def test_admission_is_off_unless_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("RMF_ADMISSION", raising=False)
+    assert admission_controller_from_env() is None
+
+    monkeypatch.setenv("RMF_ADMISSION", "on")
+    assert isinstance(admission_controller_from_env(), AdmissionController)
+
+
+def _middleware(*trusted_proxies: str) -> AdmissionMiddleware:
+    return AdmissionMiddleware(None, _controller(), "X-Learner-Id", "rmf_learner", trusted_proxies=trusted_proxies)
+
+
+def _scope(peer: str, *forwarded_for: str) -> dict:
+    headers = [(b"x-learner-id", b"alice")] + [(b"x-forwarded-for", value.encode()) for value in forwarded_for]
+    return {"type": "http", "client": (peer, 50000), "headers": headers}
+
+
+def test_forwarded_for_is_only_read_from_trusted_proxies() -> None:
+    assert _middleware()._client(_scope("10.0.0.9", "203.0.113.5")) == ("10.0.0.9", "alice")
+    assert _middleware("10.0.0.9")._client(_scope("10.0.0.9", "203.0.113.5")) == ("203.0.113.5", "alice")
+
+
+def test_forwarded_for_skips_trusted_hops_but_not_client_supplied_ones() -> None:
+    middleware = _middleware("10.0.0.9", "10.0.0.8")
+
+    assert middleware._client(_scope("10.0.0.9", "198.51.100.1, 203.0.113.5, 10.0.0.8")) == ("203.0.113.5", "alice")
+    assert middleware._client(_scope("10.0.0.9", "198.51.100.1", "203.0.113.5")) == ("203.0.113.5", "alice")
+    assert middleware._client(_scope("10.0.0.9")) == ("10.0.0.9", "alice")
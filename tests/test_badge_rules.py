@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from server.services.badge_rules import COUNTERS_KEY, STATIC_RULES, BadgeEngine, BadgeRule, course_rules
+from server.services.progress_events import ProgressEventBroker
+from server.services.progress_store import FileProgressBackend, ProgressStore
+
+MODULES = [
+    {"id": "module-1", "badge": {"id": "risk-framer", "name": "Risk Framer"}},
+    {"id": "module-2", "badge": {"id": "lifecycle-expert", "name": "Lifecycle Expert"}},
+]
+
+
+def _engine() -> BadgeEngine:
+    return BadgeEngine((*STATIC_RULES, *course_rules(MODULES)))
+
+
+def _status(module_id: str, status: str) -> dict[str, str]:
+    return {"moduleId": module_id, "status": status}
+
+
+def test_quiz_badges_are_awarded_once() -> None:
+    engine, progress = _engine(), {}
+    quiz = {"moduleId": "module-1", "quizId": "quiz-1", "score": 100, "passed": True}
+
+    assert sorted(engine.evaluate(progress, "quiz.recorded", quiz)) == ["perfect-score", "risk-framer"]
+    assert engine.evaluate(progress, "quiz.recorded", quiz) == []
+    assert engine.evaluate(progress, "quiz.recorded", {**quiz, "moduleId": "module-2", "score": 60}) == [
+        "lifecycle-expert"
+    ]
+
+
+def test_completionist_counts_distinct_completed_modules() -> None:
+    engine, progress = _engine(), {}
+
+    assert engine.evaluate(progress, "module.status", _status("module-1", "completed")) == []
+    assert engine.evaluate(progress, "module.status", _status("module-1", "completed")) == []
+    assert progress[COUNTERS_KEY] == {"completionist": ["module-1"]}
+
+    # A module that drops back out of "completed" no longer counts.
+    engine.evaluate(progress, "module.status", _status("module-1", "in_progress"))
+    assert engine.evaluate(progress, "module.status", _status("module-2", "completed")) == []
+    assert engine.evaluate(progress, "module.status", _status("module-1", "completed")) == ["completionist"]
+
+
+def test_counters_are_seeded_from_learners_who_predate_the_rule() -> None:
+    engine = _engine()
+    progress = {"modules": {"module-1": {"status": "completed"}, "module-2": {"status": "in_progress"}}}
+
+    assert engine.evaluate(progress, "module.status", _status("module-2", "completed")) == ["completionist"]
+
+
+def test_counters_are_stored_but_not_sent_to_clients(tmp_path) -> None:
+    engine = BadgeEngine([BadgeRule("explorer", "lesson.completed", distinct="lessonId", target=2)])
+    store = ProgressStore(
+        events=ProgressEventBroker(),
+        progress_dir=tmp_path,
+        backend=FileProgressBackend(tmp_path, shard_count=4),
+        badges=engine,
+    )
+
+    first = store.mark_lesson_complete("module-1", "lesson-1", learner_id="alice")
+    second = store.mark_lesson_complete("module-1", "lesson-2", learner_id="alice")
+
+    assert (first["newBadges"], second["newBadges"]) == ([], ["explorer"])
+    assert COUNTERS_KEY not in first["progress"]
+    assert COUNTERS_KEY not in store.get_progress(learner_id="alice")
+    assert store.backend.read("alice")[COUNTERS_KEY] == {"explorer": ["lesson-1", "lesson-2"]}
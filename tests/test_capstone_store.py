@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from server.services.capstone_store import CapstoneDraftError, CapstoneStore
+from server.services.progress_events import ProgressEventBroker
+
+
+def _store(progress_store) -> CapstoneStore:
+    return CapstoneStore(progress=progress_store, events=ProgressEventBroker())
+
+
+def test_patch_bumps_the_version(progress_store) -> None:
+    store = _store(progress_store)
+
+    result = store.patch(learner_id="alice", base_version=0, fields={"/responses/q1": "first"})
+
+    assert result["version"] == 1
+    assert store.get(learner_id="alice") == {
+        "version": 1,
+        "capstone": {"started": False, "currentStep": None, "selectedSystem": None, "responses": {"q1": "first"}},
+    }
+
+
+def test_stale_base_version_conflicts(progress_store) -> None:
+    store = _store(progress_store)
+    store.patch(learner_id="alice", base_version=0, fields={"/responses/q1": "first"})
+
+    with pytest.raises(CapstoneDraftError) as error:
+        store.patch(learner_id="alice", base_version=0, fields={"/responses/q1": "stale"})
+
+    assert error.value.status_code == 409
+    assert store.get(learner_id="alice")["capstone"]["responses"] == {"q1": "first"}
+
+
+def test_workers_sharing_a_backend_see_each_others_versions(progress_store) -> None:
+    first, second = _store(progress_store), _store(progress_store)
+    first.patch(learner_id="alice", base_version=0, fields={"/responses/q1": "from first"})
+
+    with pytest.raises(CapstoneDraftError) as error:
+        second.patch(learner_id="alice", base_version=0, fields={"/responses/q1": "from second"})
+    assert error.value.status_code == 409
+
+    result = second.patch(learner_id="alice", base_version=1, fields={"/responses/q2": "from second"})
+    assert result["version"] == 2
+    assert first.get(learner_id="alice")["capstone"]["responses"] == {"q1": "from first", "q2": "from second"}
+
+
+def test_failed_test_operation_leaves_the_draft_alone(progress_store) -> None:
+    store = _store(progress_store)
+    store.patch(learner_id="alice", base_version=0, fields={"/selectedSystem": "chatbot"})
+
+    with pytest.raises(CapstoneDraftError) as error:
+        store.patch(
+            learner_id="alice",
+            base_version=1,
+            operations=[
+                {"op": "replace", "path": "/currentStep", "value": 2},
+                {"op": "test", "path": "/selectedSystem", "value": "scoring"},
+            ],
+        )
+
+    assert error.value.status_code == 409
+    assert store.get(learner_id="alice")["version"] == 1
+    assert store.get(learner_id="alice")["capstone"]["currentStep"] is None
+
+
+def test_reset_keeps_counting_versions(progress_store) -> None:
+    store = _store(progress_store)
+    store.patch(learner_id="alice", base_version=0, fields={"/responses/q1": "first"})
+    store.reset(learner_id="alice")
+
+    with pytest.raises(CapstoneDraftError) as error:
+        store.patch(learner_id="alice", base_version=1, fields={"/responses/q2": "after reset"})
+
+    assert error.value.status_code == 409
+    assert store.get(learner_id="alice") == {
+        "version": 2,
+        "capstone": {"started": False, "currentStep": None, "selectedSystem": None, "responses": {}},
+    }
+
+
+def test_concurrent_unversioned_patches_are_all_kept(progress_store) -> None:
+    store = _store(progress_store)
+
+    def save(index: int) -> None:
+        store.patch(learner_id="alice", base_version=None, fields={f"/responses/q{index}": index})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(save, range(40)))
+
+    draft = store.get(learner_id="alice")
+    assert draft["version"] == 40
+    assert draft["capstone"]["responses"] == {f"q{index}": index for index in range(40)}
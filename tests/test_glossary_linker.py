@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from server.services.glossary_linker import GlossaryMatcher, annotate_lessons, term_aliases
+
+TERMS = [
+    {"term": "AI"},
+    {"term": "AI risk"},
+    {"term": "Bias"},
+    {"term": "Policy"},
+    {"term": "Reliability"},
+    {"term": "TEVV"},
+    {"term": "Impact (harm)"},
+]
+
+
+def _matched(matcher: GlossaryMatcher, text: str) -> list[tuple[str, str]]:
+    return [(text[start:end], matcher.terms[term]) for start, end, term in matcher.find(text)]
+
+
+def test_aliases_follow_english_plural_rules() -> None:
+    assert term_aliases({"term": "Bias"}) == ["bias", "biases"]
+    assert term_aliases({"term": "Policy"}) == ["policy", "policies"]
+    assert term_aliases({"term": "Risk analysis"}) == ["risk analysis", "risk analyses"]
+    assert term_aliases({"term": "AI actors"}) == ["ai actors"]
+    assert term_aliases({"term": "Reliability"}) == ["reliability"]
+    assert term_aliases({"term": "TEVV"}) == ["tevv"]
+
+
+def test_aliases_include_the_term_without_its_qualifier() -> None:
+    assert term_aliases({"term": "Impact (harm)", "aliases": ["effect"]}) == [
+        "impact (harm)",
+        "impact",
+        "impacts",
+        "effect",
+        "effects",
+    ]
+
+
+def test_find_prefers_the_leftmost_longest_match() -> None:
+    matcher = GlossaryMatcher(TERMS)
+
+    assert _matched(matcher, "AI risk and AI policies") == [("AI risk", "AI risk"), ("AI", "AI"), ("policies", "Policy")]
+
+
+def test_find_matches_whole_words_in_any_case() -> None:
+    matcher = GlossaryMatcher(TERMS)
+
+    assert _matched(matcher, "BIASES are not biased; see impacts.") == [("BIASES", "Bias"), ("impacts", "Impact (harm)")]
+    assert _matched(matcher, "Fair tevv-based reliability") == [("tevv", "TEVV"), ("reliability", "Reliability")]
+
+
+def test_find_keeps_offsets_when_case_folding_changes_length() -> None:
+    matcher = GlossaryMatcher(TERMS)
+    # "İ".lower() is two code points; the matcher must not shift later offsets.
+    text = "İ bias"
+
+    assert _matched(matcher, text) == [("bias", "Bias")]
+
+
+def test_annotations_use_utf16_offsets_and_a_local_term_table() -> None:
+    matcher = GlossaryMatcher(TERMS)
+    lessons = {
+        "lessons": [
+            {"id": "lesson-1", "sections": [{"type": "text", "content": "😀 bias, then policy"}, {"type": "quiz"}]},
+        ]
+    }
+
+    annotated = annotate_lessons(lessons, matcher)
+
+    section, untouched = annotated["lessons"][0]["sections"]
+    # The emoji is one code point but two UTF-16 code units.
+    assert section["glossaryLinks"] == {"starts": [3, 14], "ends": [7, 20], "terms": [0, 1]}
+    assert annotated["glossaryTerms"] == ["Bias", "Policy"]
+    assert untouched == {"type": "quiz"}
+    assert "glossaryLinks" not in lessons["lessons"][0]["sections"][0]
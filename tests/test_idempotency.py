@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from server.services.idempotency import IdempotencyCache, IdempotencyError
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self) -> dict[str, int]:
+        self.calls += 1
+        return {"call": self.calls}
+
+
+def test_retry_replays_the_stored_result() -> None:
+    cache = IdempotencyCache()
+    compute = _Counter()
+
+    first = cache.run("alice", "key-1", "POST /quiz {}", compute)
+    second = cache.run("alice", "key-1", "POST /quiz {}", compute)
+
+    assert first == ({"call": 1}, False)
+    assert second == ({"call": 1}, True)
+    assert compute.calls == 1
+    assert cache.replays == 1
+
+
+def test_key_reused_for_another_request_is_rejected() -> None:
+    cache = IdempotencyCache()
+    compute = _Counter()
+    cache.run("alice", "key-1", "POST /quiz {\"a\":1}", compute)
+
+    with pytest.raises(IdempotencyError) as error:
+        cache.run("alice", "key-1", "POST /quiz {\"a\":2}", compute)
+
+    assert error.value.status_code == 422
+    assert compute.calls == 1
+
+
+def test_keys_are_per_learner() -> None:
+    cache = IdempotencyCache()
+    compute = _Counter()
+
+    cache.run("alice", "key-1", "POST /quiz {}", compute)
+    result, replayed = cache.run("bob", "key-1", "POST /quiz {}", compute)
+
+    assert (result, replayed) == ({"call": 2}, False)
+
+
+def test_requests_without_a_key_always_run() -> None:
+    cache = IdempotencyCache()
+    compute = _Counter()
+
+    cache.run("alice", None, "POST /quiz {}", compute)
+    cache.run("alice", None, "POST /quiz {}", compute)
+
+    assert compute.calls == 2
+    assert cache.replays == 0
+
+
+def test_failed_requests_are_not_stored() -> None:
+    cache = IdempotencyCache()
+    compute = _Counter()
+
+    def fail() -> None:
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        cache.run("alice", "key-1", "POST /quiz {}", fail)
+
+    assert cache.run("alice", "key-1", "POST /quiz {}", compute) == ({"call": 1}, False)
+
+
+def test_retry_during_the_first_request_waits_for_its_result() -> None:
+    cache = IdempotencyCache()
+    started, release = threading.Event(), threading.Event()
+    results: list[tuple[object, bool]] = []
+
+    def slow() -> str:
+        started.set()
+        release.wait(5)
+        return "saved"
+
+    first = threading.Thread(target=lambda: results.append(cache.run("alice", "key-1", "POST /quiz {}", slow)))
+    first.start()
+    started.wait(5)
+    retry = threading.Thread(
+        target=lambda: results.append(cache.run("alice", "key-1", "POST /quiz {}", lambda: "ran twice"))
+    )
+    retry.start()
+    release.set()
+    first.join(5)
+    retry.join(5)
+
+    assert sorted(results, key=lambda result: result[1]) == [("saved", False), ("saved", True)]
+
+
+def test_retry_gives_up_waiting_for_a_slow_first_request() -> None:
+    cache = IdempotencyCache(wait_seconds=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow() -> str:
+        started.set()
+        release.wait(5)
+        return "saved"
+
+    first = threading.Thread(target=cache.run, args=("alice", "key-1", "POST /quiz {}", slow))
+    first.start()
+    started.wait(5)
+    try:
+        with pytest.raises(IdempotencyError) as error:
+            cache.run("alice", "key-1", "POST /quiz {}", lambda: "ran twice")
+    finally:
+        release.set()
+        first.join(5)
+
+    assert error.value.status_code == 409
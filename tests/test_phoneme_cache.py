@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from server.services.phoneme_cache import PhonemeCache
+
+PHONEMES = ("həlˈoʊ", "wˈɜːld")
+
+
+def test_entries_survive_a_restart(tmp_path) -> None:
+    PhonemeCache(tmp_path).put("a", "Hello world", PHONEMES)
+
+    cache = PhonemeCache(tmp_path)
+
+    assert cache.get("a", "Hello world") == PHONEMES
+    assert cache.get("a", "Hello world") == PHONEMES
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_keys_include_namespace_and_language(tmp_path) -> None:
+    PhonemeCache(tmp_path, namespace="g2p-1").put("a", "Hello world", PHONEMES)
+
+    assert PhonemeCache(tmp_path, namespace="g2p-2").get("a", "Hello world") is None
+    assert PhonemeCache(tmp_path, namespace="g2p-1").get("b", "Hello world") is None
+    assert PhonemeCache(tmp_path, namespace="g2p-1").get("a", "hello world") is None
+
+
+def test_torn_or_foreign_files_are_misses(tmp_path) -> None:
+    PhonemeCache(tmp_path).put("a", "Hello world", PHONEMES)
+    (cache_file,) = tmp_path.rglob("*.json")
+
+    cache_file.write_text('{"namespace": "", "lang": "a", "te')
+    assert PhonemeCache(tmp_path).get("a", "Hello world") is None
+
+    cache_file.write_text('{"namespace": "", "lang": "a", "text": "Other text", "phonemes": ["x"]}')
+    cache = PhonemeCache(tmp_path)
+    assert cache.get("a", "Hello world") is None
+    assert cache.misses == 1
+
+
+def test_memory_tier_is_bounded_and_falls_back_to_disk(tmp_path) -> None:
+    cache = PhonemeCache(tmp_path, max_entries=2)
+    for index in range(3):
+        cache.put("a", f"segment {index}", (str(index),))
+
+    for cache_file in tmp_path.rglob("*.json"):
+        cache_file.unlink()
+
+    assert cache.get("a", "segment 0") is None
+    assert cache.get("a", "segment 1") == ("1",)
+    assert cache.get("a", "segment 2") == ("2",)
+
+
+def test_unwritable_directory_still_serves_from_memory(tmp_path) -> None:
+    blocker = tmp_path / "blocked"
+    blocker.write_text("not a directory")
+    cache = PhonemeCache(blocker / "phonemes")
+
+    cache.put("a", "Hello world", PHONEMES)
+
+    assert cache.get("a", "Hello world") == PHONEMES
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from server.services.progress_events import ProgressEventBroker
+
+
+def test_events_reach_only_the_learners_subscribers() -> None:
+    async def scenario() -> None:
+        broker = ProgressEventBroker()
+        alice, bob = broker.subscribe("alice"), broker.subscribe("bob")
+
+        broker.publish("lesson.completed", "alice", moduleId="module-1", lessonId="lesson-1")
+
+        events = await alice.next_events(timeout=1)
+        assert [(event["type"], event["lessonId"]) for event in events] == [("lesson.completed", "lesson-1")]
+        assert await bob.next_events(timeout=0.01) == []
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_keeps_the_newest_events() -> None:
+    async def scenario() -> None:
+        broker = ProgressEventBroker(max_queue_size=3)
+        subscription = broker.subscribe("alice")
+
+        for index in range(5):
+            broker.publish("quiz.recorded", "alice", score=index)
+
+        events = await subscription.next_events(timeout=1)
+        assert [event["score"] for event in events] == [2, 3, 4]
+        assert subscription.dropped == 2
+        assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_a_worker_thread_wakes_the_stream() -> None:
+    async def scenario() -> None:
+        broker = ProgressEventBroker()
+        subscription = broker.subscribe("alice")
+        waiting = asyncio.ensure_future(subscription.next_events(timeout=5))
+        await asyncio.sleep(0)
+
+        thread = threading.Thread(target=broker.publish, args=("progress.reset", "alice"))
+        thread.start()
+        events = await asyncio.wait_for(waiting, 1)
+        thread.join()
+
+        assert [event["type"] for event in events] == ["progress.reset"]
+
+    asyncio.run(scenario())
+
+
+def test_unsubscribe_stops_delivery() -> None:
+    async def scenario() -> None:
+        broker = ProgressEventBroker()
+        subscription = broker.subscribe("alice")
+        broker.unsubscribe("alice", subscription)
+
+        broker.publish("progress.reset", "alice")
+
+        assert broker.subscriber_count == 0
+        assert await subscription.next_events(timeout=0.01) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from server.services.progress_store import (
+    DEFAULT_LEARNER_ID,
+    FileProgressBackend,
+    InvalidLearnerIdError,
+    learner_shard,
+)
+
+
+def _increment(stored: dict[str, Any] | None) -> tuple[dict[str, Any], None]:
+    progress = dict(stored or {})
+    progress["count"] = progress.get("count", 0) + 1
+    return progress, None
+
+
+def _increment_many(progress_dir: str, learner_id: str, times: int) -> None:
+    backend = FileProgressBackend(Path(progress_dir), shard_count=4)
+    for _ in range(times):
+        backend.update(learner_id, _increment)
+
+
+def test_learners_are_stored_in_their_shard(tmp_path) -> None:
+    backend = FileProgressBackend(tmp_path, shard_count=4)
+
+    backend.update("alice", _increment)
+
+    shard = learner_shard("alice", 4)
+    assert json.loads((tmp_path / f"shard-{shard:03d}" / "alice.json").read_text()) == {"count": 1}
+    assert backend.read("alice") == {"count": 1}
+    assert backend.read("bob") is None
+
+
+@pytest.mark.parametrize("learner_id", ["", "../alice", "alice/bob", ".hidden", "a" * 65])
+def test_unsafe_learner_ids_are_rejected(tmp_path, learner_id: str) -> None:
+    backend = FileProgressBackend(tmp_path, shard_count=4)
+
+    with pytest.raises(InvalidLearnerIdError):
+        backend.update(learner_id, _increment)
+    assert not any(tmp_path.rglob("*.json"))
+
+
+def test_concurrent_threads_lose_no_updates(tmp_path) -> None:
+    backends = [FileProgressBackend(tmp_path, shard_count=4) for _ in range(2)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda index: backends[index % 2].update("alice", _increment), range(200)))
+
+    assert backends[0].read("alice") == {"count": 200}
+
+
+def test_concurrent_processes_lose_no_updates(tmp_path) -> None:
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        list(pool.map(_increment_many, [str(tmp_path)] * 3, ["alice"] * 3, [40] * 3))
+
+    assert FileProgressBackend(tmp_path, shard_count=4).read("alice") == {"count": 120}
+
+
+def test_stamp_changes_with_every_write(tmp_path) -> None:
+    backend = FileProgressBackend(tmp_path, shard_count=4)
+    assert backend.stamp("alice") is None
+
+    _, first = backend.update("alice", _increment)
+    _, second = backend.update("alice", _increment)
+    _, unchanged = backend.update("alice", lambda stored: (None, None))
+
+    assert first != second == unchanged == backend.stamp("alice")
+
+
+def test_update_many_writes_what_mutate_returns(tmp_path) -> None:
+    backend = FileProgressBackend(tmp_path, shard_count=4)
+    backend.update("carol", _increment)
+
+    written = backend.update_many(
+        ["alice", "bob", "carol"],
+        lambda learner_id, stored: None if stored is not None else {"name": learner_id},
+    )
+
+    assert sorted(learner_id for learner_id, _ in written) == ["alice", "bob"]
+    assert sorted(backend.iter_progress()) == [
+        ("alice", {"name": "alice"}),
+        ("bob", {"name": "bob"}),
+        ("carol", {"count": 1}),
+    ]
+
+
+def test_legacy_progress_belongs_to_the_local_learner_until_rewritten(tmp_path) -> None:
+    legacy_path = tmp_path / "progress.json"
+    legacy_path.write_text(json.dumps({"count": 5}))
+    backend = FileProgressBackend(tmp_path / "progress", shard_count=4, legacy_progress_path=legacy_path)
+
+    assert backend.read(DEFAULT_LEARNER_ID) == {"count": 5}
+    assert list(backend.iter_progress()) == [(DEFAULT_LEARNER_ID, {"count": 5})]
+
+    backend.update(DEFAULT_LEARNER_ID, _increment)
+
+    assert backend.read(DEFAULT_LEARNER_ID) == {"count": 6}
+    assert list(backend.iter_progress()) == [(DEFAULT_LEARNER_ID, {"count": 6})]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import pytest
+
+from server.services.progress_store import ProgressStore
+from server.services.progress_transfer import (
+    ProgressImportError,
+    export_chunks,
+    import_ndjson,
+    parse_import_line,
+    xapi_statements,
+)
+
+
+def _line(learner_id: object, progress: object) -> bytes:
+    return json.dumps({"learnerId": learner_id, "progress": progress}).encode("utf-8")
+
+
+async def _chunks(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def _import(store: ProgressStore, *chunks: bytes, **options) -> dict:
+    return asyncio.run(import_ndjson(store, _chunks(*chunks), **options))
+
+
+def test_parse_import_line_accepts_exported_records() -> None:
+    assert parse_import_line(_line("alice", {"badges": ["first"]})) == ("alice", {"badges": ["first"]})
+
+
+@pytest.mark.parametrize(
+    ("line", "error"),
+    [
+        (b"{not json", "invalid JSON"),
+        (b"\xff\xfe", "invalid JSON"),
+        (b"[1, 2]", "not a JSON object"),
+        (_line("../alice", {}), "invalid learnerId"),
+        (_line("alice", []), "progress must be an object"),
+        (_line("alice", {"modules": []}), "progress.modules must be an object"),
+        (_line("alice", {"badges": {}}), "progress.badges must be a list"),
+    ],
+)
+def test_parse_import_line_rejects_bad_records(line: bytes, error: str) -> None:
+    with pytest.raises(ValueError, match=error):
+        parse_import_line(line)
+
+
+def test_import_counts_imported_skipped_and_rejected(progress_store: ProgressStore) -> None:
+    progress_store.import_progress([("alice", {"badges": ["kept"]})])
+    body = b"\n".join(
+        [
+            _line("alice", {"badges": ["replaced"]}),
+            b"",
+            b"{broken",
+            _line("bob", {"badges": ["new"]}),
+            _line("carol/..", {}),
+        ]
+    )
+
+    # Lines split across chunks are reassembled before parsing.
+    summary = _import(progress_store, body[:10], body[10:], overwrite=False, batch_size=1)
+
+    assert summary["imported"] == 1
+    assert summary["skipped"] == 1
+    assert summary["rejected"] == 2
+    assert [error["line"] for error in summary["errors"]] == [3, 5]
+    assert progress_store.get_progress(learner_id="alice")["badges"] == ["kept"]
+    assert progress_store.get_progress(learner_id="bob")["badges"] == ["new"]
+
+
+def test_import_overwrites_by_default(progress_store: ProgressStore) -> None:
+    progress_store.import_progress([("alice", {"badges": ["old"]})])
+
+    summary = _import(progress_store, _line("alice", {"badges": ["new"]}) + b"\n")
+
+    assert summary == {"imported": 1, "skipped": 0, "rejected": 0, "errors": []}
+    assert progress_store.get_progress(learner_id="alice")["badges"] == ["new"]
+
+
+def test_oversized_lines_are_refused(progress_store: ProgressStore, monkeypatch) -> None:
+    monkeypatch.setattr("server.services.progress_transfer.MAX_IMPORT_LINE_BYTES", 16)
+
+    with pytest.raises(ProgressImportError) as raised:
+        _import(progress_store, _line("alice", {"badges": ["too long for one line"]}))
+    assert raised.value.status_code == 413
+
+
+def test_ndjson_export_round_trips(progress_store: ProgressStore) -> None:
+    progress_store.import_progress([(f"learner-{index}", {"badges": [str(index)]}) for index in range(5)])
+
+    exported = b"".join(export_chunks(progress_store, "ndjson"))
+
+    assert len(exported.splitlines()) == 5
+    summary = _import(progress_store, exported, overwrite=False)
+    assert summary["skipped"] == 5
+    assert summary["rejected"] == 0
+
+
+def test_xapi_statement_ids_are_stable() -> None:
+    progress = {
+        "user": {"lastActiveAt": "2026-01-01T00:00:00Z"},
+        "modules": {"m1": {"lessonsCompleted": ["l1"], "quizScore": 80, "quizPassed": True, "status": "completed"}},
+        "badges": ["first"],
+    }
+
+    statements = list(xapi_statements("alice", progress, "https://example.test"))
+
+    assert [statement["verb"]["display"]["en-US"] for statement in statements] == [
+        "completed",
+        "passed",
+        "completed",
+        "earned",
+    ]
+    assert statements[1]["result"]["score"]["scaled"] == 0.8
+    assert [statement["id"] for statement in xapi_statements("alice", progress, "https://example.test")] == [
+        statement["id"] for statement in statements
+    ]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+
+from server.services.counter_store import CounterStore
+from server.services.quiz_analytics import QuizItemAnalytics
+
+QUESTIONS = [
+    {"id": "q1", "type": "multiple_choice", "options": ["a", "b", "c"], "correctIndex": 0},
+    {"id": "q2", "type": "true_false", "correctAnswer": True},
+]
+
+
+class _FlakyStore(CounterStore):
+    def __init__(self, directory) -> None:
+        super().__init__(directory)
+        self.failures = 0
+
+    def merge(self, key, layout, deltas) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().merge(key, layout, deltas)
+
+
+def _submit(analytics: QuizItemAnalytics, first: int, second: bool) -> None:
+    results = [{"correct": first == 0}, {"correct": second is True}]
+    analytics.record("quiz-1", QUESTIONS, {"q1": first, "q2": second}, results)
+
+
+def _analytics(store: CounterStore) -> QuizItemAnalytics:
+    return QuizItemAnalytics(store, flush_every=1_000, flush_interval=3_600)
+
+
+def test_statistics_combine_memory_and_store(tmp_path) -> None:
+    analytics = _analytics(CounterStore(tmp_path))
+    _submit(analytics, 0, True)
+    analytics.flush()
+    _submit(analytics, 2, False)
+
+    stats = analytics.statistics("quiz-1", QUESTIONS)
+
+    assert stats["submissions"] == 2
+    assert stats["meanCorrect"] == 1.0
+    assert [question["difficulty"] for question in stats["questions"]] == [0.5, 0.5]
+    assert [option["selected"] for option in stats["questions"][0]["options"]] == [1, 0, 1]
+
+
+def test_failed_merge_keeps_the_submissions(tmp_path) -> None:
+    store = _FlakyStore(tmp_path)
+    analytics = _analytics(store)
+    _submit(analytics, 0, True)
+    store.failures = 1
+
+    with pytest.raises(OSError):
+        analytics.flush()
+    assert analytics.statistics("quiz-1", QUESTIONS)["submissions"] == 1
+
+    analytics.flush()
+    assert analytics.statistics("quiz-1", QUESTIONS)["submissions"] == 1
+    # Everything is in the store now; a fresh process sees it.
+    assert _analytics(store).statistics("quiz-1", QUESTIONS)["submissions"] == 1
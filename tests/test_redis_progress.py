@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from server.services import redis_progress
+from server.services.redis_progress import MemoryRedis, RedisProgressBackend, RedisProgressError
+
+
+def _completed(progress: dict[str, Any] | None, module_id: str) -> dict[str, Any]:
+    progress = dict(progress or {})
+    progress["modules"] = {**progress.get("modules", {}), module_id: {"status": "completed"}}
+    return progress
+
+
+def test_update_retries_after_a_concurrent_write() -> None:
+    client = MemoryRedis()
+    backend = RedisProgressBackend(client, shard_count=4)
+    # A second node writing through its own connection.
+    other = RedisProgressBackend(client, shard_count=4)
+    seen: list[dict[str, Any] | None] = []
+
+    def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any], str]:
+        seen.append(stored)
+        if len(seen) == 1:
+            other.update("alice", lambda stored: (_completed(stored, "module-1"), None))
+        return _completed(stored, "module-2"), "done"
+
+    result, rev = backend.update("alice", mutate)
+
+    assert result == "done"
+    assert len(seen) == 2
+    assert seen[0] is None
+    assert seen[1]["modules"] == {"module-1": {"status": "completed"}}
+    assert rev == backend.stamp("alice")
+    assert backend.read("alice")["modules"] == {
+        "module-1": {"status": "completed"},
+        "module-2": {"status": "completed"},
+    }
+    # The cohort counters only saw the write that landed.
+    rollups = backend.rollups()
+    assert sum(rollup["learnerCount"] for rollup in rollups) == 1
+    assert sum(rollup["moduleStatus"].get("module-1", {}).get("completed", 0) for rollup in rollups) == 1
+    assert sum(rollup["moduleStatus"].get("module-2", {}).get("completed", 0) for rollup in rollups) == 1
+
+
+def test_update_gives_up_after_repeated_conflicts(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(redis_progress, "MAX_TRANSACTION_ATTEMPTS", 3)
+    client = MemoryRedis()
+    backend = RedisProgressBackend(client, shard_count=4)
+    other = RedisProgressBackend(client, shard_count=4)
+    calls = 0
+
+    def mutate(stored: dict[str, Any] | None) -> tuple[dict[str, Any], None]:
+        nonlocal calls
+        calls += 1
+        other.update("alice", lambda stored: (_completed(stored, f"module-{calls}"), None))
+        return _completed(stored, "never"), None
+
+    with pytest.raises(RedisProgressError):
+        backend.update("alice", mutate)
+
+    assert calls == 3
+    assert "never" not in backend.read("alice")["modules"]
+
+
+def test_update_without_a_change_writes_nothing() -> None:
+    client = MemoryRedis()
+    backend = RedisProgressBackend(client, shard_count=4)
+    backend.update("alice", lambda stored: (_completed(stored, "module-1"), None))
+    rev = backend.stamp("alice")
+
+    result, stamp = backend.update("alice", lambda stored: (None, stored["modules"]))
+
+    assert result == {"module-1": {"status": "completed"}}
+    assert stamp == rev == backend.stamp("alice")
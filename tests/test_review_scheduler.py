@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from server.services.review_scheduler import ReviewScheduler, quiz_item_id
+from server.services.spaced_repetition import DAY_SECONDS
+
+NOW = 1_700_000_000
+RESULTS = [{"questionId": "q1", "correct": False}, {"questionId": "q2", "correct": True}]
+
+
+def test_missed_quiz_questions_are_scheduled_outside_the_progress_document(progress_store) -> None:
+    scheduler = ReviewScheduler(progress_store)
+    progress_store.mark_lesson_complete("module-1", "lesson-1", learner_id="alice")
+
+    grades = [(quiz_item_id("quiz-1", "q1"), 1), (quiz_item_id("quiz-1", "q2"), 4)]
+    changed = scheduler.grade(grades, add_passed=False, now=NOW, learner_id="alice")
+
+    assert list(changed) == ["quiz:quiz-1:q1"]
+    assert "review" not in progress_store.backend.read("alice")
+    assert scheduler.next_due(10, now=NOW + DAY_SECONDS, learner_id="alice") == (
+        [(NOW + DAY_SECONDS, "quiz:quiz-1:q1")],
+        None,
+    )
+
+
+def test_record_quiz_does_not_write_progress(progress_store) -> None:
+    scheduler = ReviewScheduler(progress_store)
+    progress_store.mark_lesson_complete("module-1", "lesson-1", learner_id="alice")
+    stamp = progress_store.backend.stamp("alice")
+
+    scheduler.record_quiz("quiz-1", RESULTS, learner_id="alice")
+
+    assert progress_store.backend.stamp("alice") == stamp
+
+
+def test_grades_from_another_worker_are_picked_up(progress_store) -> None:
+    first, second = ReviewScheduler(progress_store), ReviewScheduler(progress_store)
+    first.grade([("term:govern", None)], now=NOW, learner_id="alice")
+    assert first.next_due(10, now=NOW, learner_id="alice")[0] == [(NOW, "term:govern")]
+
+    second.grade([("term:govern", 5)], now=NOW, learner_id="alice")
+
+    assert first.next_due(10, now=NOW, learner_id="alice") == ([], NOW + DAY_SECONDS)
+
+
+def test_legacy_schedules_move_out_of_the_progress_document(progress_store) -> None:
+    legacy = {"rev": "0000aaaa", "items": {"term:govern": [NOW, 1, 250, 1]}}
+    progress_store.backend.update("alice", lambda _stored: ({"modules": {}, "review": legacy}, None))
+    scheduler = ReviewScheduler(progress_store)
+
+    assert "review" not in progress_store.get_progress(learner_id="alice")
+    assert scheduler.next_due(10, now=NOW, learner_id="alice")[0] == [(NOW, "term:govern")]
+
+    scheduler.grade([("term:map", None)], now=NOW, learner_id="alice")
+
+    assert "review" not in progress_store.backend.read("alice")
+    assert [item_id for _, item_id in scheduler.next_due(10, now=NOW, learner_id="alice")[0]] == [
+        "term:govern",
+        "term:map",
+    ]
+
+
+def test_reset_clears_the_schedule(progress_store) -> None:
+    scheduler = ReviewScheduler(progress_store)
+    scheduler.grade([("term:govern", None)], now=NOW, learner_id="alice")
+
+    scheduler.reset(learner_id="alice")
+
+    assert scheduler.next_due(10, now=NOW, learner_id="alice") == ([], None)
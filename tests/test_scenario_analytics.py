@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from server.services.counter_store import CounterStore
+from server.services.scenario_analytics import ScenarioPathAnalytics
+
+SCENARIO = {
+    "steps": [
+        {"id": "start", "choices": ["wait", "act"]},
+        {"id": "follow-up", "choices": ["escalate", "close", "ignore"]},
+    ]
+}
+
+
+class _FlakyStore(CounterStore):
+    def __init__(self, directory) -> None:
+        super().__init__(directory)
+        self.failures = 0
+
+    def merge(self, key, layout, deltas) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().merge(key, layout, deltas)
+
+
+def _analytics(store: CounterStore) -> ScenarioPathAnalytics:
+    return ScenarioPathAnalytics(store, flush_every=1_000, flush_interval=3_600)
+
+
+def test_heatmap_counts_choices_and_transitions(tmp_path) -> None:
+    analytics = _analytics(CounterStore(tmp_path))
+    analytics.record("s1", SCENARIO, "start", 1, "follow-up")
+    analytics.record("s1", SCENARIO, "start", 0, None)
+    analytics.record("s1", SCENARIO, "follow-up", 2, None)
+
+    heatmap = analytics.heatmap("s1", SCENARIO)
+
+    assert heatmap["visits"] == [2, 1]
+    assert heatmap["choiceCounts"] == [[1, 1, 0], [0, 0, 1]]
+    assert heatmap["transitions"]["to"] == ["start", "follow-up", "end"]
+    assert heatmap["transitions"]["counts"] == [[0, 1, 1], [0, 0, 1]]
+
+
+def test_unknown_steps_and_choices_are_ignored(tmp_path) -> None:
+    analytics = _analytics(CounterStore(tmp_path))
+    analytics.record("s1", SCENARIO, "missing", 0, None)
+    analytics.record("s1", SCENARIO, "start", 5, None)
+    analytics.record("s1", SCENARIO, "start", 0, "missing")
+
+    assert analytics.heatmap("s1", SCENARIO)["visits"] == [0, 0]
+
+
+def test_counts_from_every_thread_are_flushed_once(tmp_path) -> None:
+    store = CounterStore(tmp_path)
+    analytics = _analytics(store)
+
+    def record_many() -> None:
+        for _ in range(50):
+            analytics.record("s1", SCENARIO, "start", 1, "follow-up")
+
+    threads = [threading.Thread(target=record_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    analytics.flush()
+    analytics.flush()
+
+    assert analytics.heatmap("s1", SCENARIO)["visits"] == [200, 0]
+    # Everything is in the store now; a fresh process sees it.
+    assert _analytics(store).heatmap("s1", SCENARIO)["visits"] == [200, 0]
+
+
+def test_failed_merge_keeps_the_choices(tmp_path) -> None:
+    store = _FlakyStore(tmp_path)
+    analytics = _analytics(store)
+    analytics.record("s1", SCENARIO, "start", 0, "follow-up")
+    store.failures = 1
+
+    with pytest.raises(OSError):
+        analytics.flush()
+    assert analytics.heatmap("s1", SCENARIO)["visits"] == [1, 0]
+
+    analytics.flush()
+    assert analytics.heatmap("s1", SCENARIO)["visits"] == [1, 0]
+    assert _analytics(store).heatmap("s1", SCENARIO)["visits"] == [1, 0]
+
+
+def test_changed_scenarios_start_from_zero(tmp_path) -> None:
+    store = CounterStore(tmp_path)
+    analytics = _analytics(store)
+    analytics.record("s1", SCENARIO, "start", 0, None)
+    analytics.flush()
+
+    edited = {"steps": [*SCENARIO["steps"], {"id": "debrief", "choices": ["done"]}]}
+
+    assert _analytics(store).heatmap("s1", edited)["visits"] == [0, 0, 0]
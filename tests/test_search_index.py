@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from server.services.search_index import MAX_PREFIX_EXPANSIONS, SearchIndex, tokenize
+
+
+def _document(doc_id: str, title: str, text: str, kind: str = "lesson") -> dict[str, str]:
+    return {"kind": kind, "id": doc_id, "title": title, "text": text}
+
+
+DOCUMENTS = [
+    _document("govern", "Govern", "Governance sets policies for managing AI risk."),
+    _document("map", "Map", "Mapping establishes the context to frame risks."),
+    _document("measure", "Measure", "Measurement of risk uses metrics and testing."),
+    _document("bias", "Bias", "Harmful bias can be managed.", kind="glossary"),
+    _document("rare", "Rare", "A riskier edge case."),
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation() -> None:
+    assert tokenize("The Risk-Management of AI, for **everyone**") == ["risk", "management", "ai", "everyone"]
+
+
+def test_exact_terms_rank_title_matches_first() -> None:
+    results = SearchIndex(DOCUMENTS).search("measure", prefix=False)["results"]
+
+    assert [result["id"] for result in results] == ["measure"]
+    assert "text" not in results[0]
+
+
+def test_prefix_expansions_are_ranked_by_document_frequency() -> None:
+    index = SearchIndex(DOCUMENTS)
+
+    # "risk" is in three documents, "risks" and "riskier" in one each.
+    assert index.suggest("ris", limit=2) == ["risk", "riskier"]
+    assert index.suggest("manage ris", limit=1) == ["manage risk"]
+    assert len(index._expand_prefix("", limit=MAX_PREFIX_EXPANSIONS)) <= MAX_PREFIX_EXPANSIONS
+
+
+def test_prefix_search_matches_every_expansion() -> None:
+    search = SearchIndex(DOCUMENTS).search("risk", kind="lesson")
+
+    assert {result["id"] for result in search["results"]} == {"govern", "map", "measure", "rare"}
+    assert search["total"] == 4
+
+
+def test_kind_filter_and_limit() -> None:
+    index = SearchIndex(DOCUMENTS)
+
+    assert [result["id"] for result in index.search("manag", kind="glossary")["results"]] == ["bias"]
+    assert len(index.search("risk", limit=2)["results"]) == 2
+
+
+def test_highlights_point_at_the_matched_words_in_the_snippet() -> None:
+    long_text = "Filler words come first. " * 20 + "Then the governance section starts."
+    index = SearchIndex([_document("long", "Long", long_text)])
+
+    result = index.search("governance", prefix=False)["results"][0]
+
+    assert result["snippet"].startswith("…")
+    assert [result["snippet"][start:end] for start, end in result["highlights"]] == ["governance"]
+
+
+def test_unknown_terms_match_nothing() -> None:
+    assert SearchIndex(DOCUMENTS).search("zzz") == {"query": "zzz", "total": 0, "results": []}
+    assert SearchIndex(DOCUMENTS).suggest("the") == []
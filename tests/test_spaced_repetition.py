@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from server.services.spaced_repetition import (
+    DAY_SECONDS,
+    DEFAULT_EASE,
+    EASE,
+    INTERVAL,
+    MIN_EASE,
+    REPS,
+    apply_grades,
+    new_item,
+    sm2,
+)
+
+NOW = 1_700_000_000
+
+
+def test_passing_reviews_space_out_by_ease() -> None:
+    state = new_item()
+    intervals = []
+    for _ in range(4):
+        state = sm2(state, 4, NOW)
+        intervals.append(state[INTERVAL])
+
+    assert intervals == [1, 6, 15, 38]
+    assert state[EASE] == DEFAULT_EASE
+    assert state[REPS] == 4
+    assert state[0] == NOW + 38 * DAY_SECONDS
+
+
+def test_quality_moves_the_ease() -> None:
+    assert sm2(new_item(), 5, NOW)[EASE] == DEFAULT_EASE + 10
+    assert sm2(new_item(), 3, NOW)[EASE] == DEFAULT_EASE - 14
+    assert sm2(new_item(), 0, NOW)[EASE] == DEFAULT_EASE - 80
+
+
+def test_a_lapse_restarts_the_schedule() -> None:
+    state = sm2(sm2(sm2(new_item(), 5, NOW), 5, NOW), 5, NOW)
+
+    lapsed = sm2(state, 1, NOW)
+
+    assert lapsed[INTERVAL] == 1
+    assert lapsed[REPS] == 0
+    assert sm2(lapsed, 4, NOW)[INTERVAL] == 1
+
+
+def test_ease_never_drops_below_the_floor() -> None:
+    state = new_item()
+    for _ in range(5):
+        state = sm2(state, 0, NOW)
+
+    assert state[EASE] == MIN_EASE
+    assert sm2(state, 9, NOW)[EASE] == MIN_EASE + 10
+
+
+def test_apply_grades_adds_and_updates_items() -> None:
+    review: dict = {}
+
+    previous, rev, changed = apply_grades(review, [("a", 4), ("b", 1)], NOW)
+
+    assert previous is None
+    assert rev == review["rev"]
+    assert set(changed) == set(review["items"]) == {"a", "b"}
+
+    again, next_rev, changed = apply_grades(review, [("a", 4)], NOW)
+
+    assert again == rev != next_rev
+    assert changed["a"][INTERVAL] == 6
+
+
+def test_missed_answers_start_a_schedule_without_add_passed() -> None:
+    review: dict = {"items": {"known": sm2(new_item(), 4, NOW)}}
+
+    _, _, changed = apply_grades(review, [("passed", 5), ("missed", 2), ("known", 4)], NOW, add_passed=False)
+
+    assert set(changed) == {"missed", "known"}
+    assert "passed" not in review["items"]
+
+
+def test_introduced_items_are_due_now_and_known_ones_untouched() -> None:
+    known = sm2(new_item(), 4, NOW)
+    review: dict = {"rev": "r1", "items": {"known": list(known)}}
+
+    previous, rev, changed = apply_grades(review, [("new", None), ("known", None)], NOW)
+
+    assert changed == {"new": [NOW, 0, DEFAULT_EASE, 0]}
+    assert review["items"]["known"] == known
+    assert previous == "r1" != rev
+
+    _, unchanged_rev, changed = apply_grades(review, [("known", None)], NOW)
+    assert changed == {}
+    assert unchanged_rev == rev
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from server.services.time_stretch import STRETCH_QUALITIES, stretch_pcm, wsola
+
+SAMPLE_RATE = 24_000
+RATES = [0.5, 0.7, 0.85, 1.15, 1.4, 2.0]
+
+
+def _tone(seconds: float, frequency: float = 220.0) -> np.ndarray:
+    time = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * frequency * time)).astype(np.float32)
+
+
+def _dominant_frequency(samples: np.ndarray) -> float:
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(samples.size)))
+    return float(np.fft.rfftfreq(samples.size, 1 / SAMPLE_RATE)[np.argmax(spectrum)])
+
+
+@pytest.mark.parametrize("quality", sorted(STRETCH_QUALITIES))
+@pytest.mark.parametrize("rate", RATES)
+def test_output_length_follows_the_rate(rate: float, quality: str) -> None:
+    samples = _tone(1.0)
+
+    stretched = wsola(samples, rate, SAMPLE_RATE, quality)
+
+    assert stretched.dtype == np.float32
+    assert stretched.size == round(samples.size / rate)
+    assert np.isfinite(stretched).all()
+
+
+@pytest.mark.parametrize("quality", sorted(STRETCH_QUALITIES))
+@pytest.mark.parametrize("rate", [0.7, 1.4])
+def test_pitch_is_preserved(rate: float, quality: str) -> None:
+    stretched = wsola(_tone(1.0), rate, SAMPLE_RATE, quality)
+
+    assert _dominant_frequency(stretched) == pytest.approx(220.0, abs=3.0)
+
+
+def test_unit_rate_and_empty_input_are_copied() -> None:
+    samples = _tone(0.1)
+
+    unchanged = wsola(samples, 1.0, SAMPLE_RATE)
+
+    assert unchanged is not samples
+    np.testing.assert_array_equal(unchanged, samples)
+    assert wsola(np.zeros(0, dtype=np.float32), 1.5, SAMPLE_RATE).size == 0
+
+
+def test_short_input_is_still_stretched() -> None:
+    assert wsola(_tone(0.005), 0.5, SAMPLE_RATE).size == round(SAMPLE_RATE * 0.005 / 0.5)
+
+
+def test_unknown_quality_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown stretch quality"):
+        wsola(_tone(0.1), 1.2, SAMPLE_RATE, "ultra")
+
+
+def test_stretch_pcm_returns_clipped_16_bit_audio() -> None:
+    pcm = (np.sign(_tone(0.5)) * 32767).astype(np.int16)
+
+    stretched = stretch_pcm(pcm, 1.25, SAMPLE_RATE)
+
+    assert stretched.dtype == np.int16
+    assert stretched.size == round(pcm.size / 1.25)
+    assert np.abs(stretched.astype(np.int32)).max() <= 32767